@@ -0,0 +1,79 @@
+"""
+Throughput benchmark: threads engine vs asyncio engine.
+
+Starts bench/fixture_server.py, writes an input CSV spread over several
+loopback hosts, runs main.py once per engine and prints pages/sec as JSON.
+
+    python bench/bench_engines.py --urls 2000 --hosts 4 --delay-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_input(path: Path, urls: int, hosts: int, port: int) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        f.write("url\n")
+        for n in range(urls):
+            f.write(f"http://127.0.0.{n % hosts + 1}:{port}/page/{n}\n")
+
+
+def run_engine(engine: str, workers: int, per_host: int, input_csv: Path, out_dir: Path) -> float:
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    cmd = [
+        sys.executable, str(ROOT / "src" / "scraper" / "main.py"),
+        "--input", str(input_csv), "--output", str(out_dir),
+        "--engine", engine, "--workers", str(workers), "--per-host", str(per_host),
+        "--pool-size", str(per_host), "--rate", "0", "--format", "csv",
+    ]
+    start = time.perf_counter()
+    subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--delay-ms", type=float, default=50)
+    parser.add_argument("--thread-workers", type=int, default=64)
+    parser.add_argument("--async-workers", type=int, default=1000)
+    parser.add_argument("--per-host", type=int, default=250)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "bench" / "fixture_server.py"),
+         "--hosts", str(args.hosts), "--port", str(args.port), "--delay-ms", str(args.delay_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        server.stdout.readline()  # espera o "serving ..."
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            input_csv = tmp_path / "input.csv"
+            write_input(input_csv, args.urls, args.hosts, args.port)
+
+            results = {}
+            for engine, workers in (("threads", args.thread_workers), ("async", args.async_workers)):
+                elapsed = run_engine(engine, workers, args.per_host, input_csv, tmp_path / engine)
+                results[engine] = {
+                    "workers": workers,
+                    "seconds": round(elapsed, 3),
+                    "pages_per_sec": round(args.urls / elapsed, 1),
+                }
+            print(json.dumps({"urls": args.urls, "hosts": args.hosts, "delay_ms": args.delay_ms, "results": results}, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
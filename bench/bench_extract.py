@@ -0,0 +1,122 @@
+"""
+GenericHtmlExtractor parse benchmark + golden-file check.
+
+Checks that the lxml single-pass parser produces exactly the golden
+output stored next to each page in bench/corpus (<name>.json), then
+times both parser backends on the corpus plus a large generated
+article page. Goldens come from html.parser and every field is compared
+against them; a field listed in KNOWN_DIFFERENCES for its page (the
+documented libxml2 differences, see html_scan.PageScan) is reported
+instead of failing the check.
+
+    python bench/bench_extract.py                 # check + benchmark
+    python bench/bench_extract.py --update-golden # regenerate goldens (html.parser)
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from scraper.sites.generic import GenericHtmlExtractor  # noqa: E402
+
+CORPUS = ROOT / "bench" / "corpus"
+BASE_URL = "https://example.com/dir/"
+
+# página -> campo -> motivo (as diferenças documentadas em html_scan.PageScan)
+KNOWN_DIFFERENCES = {
+    "divergent.html": {
+        "description": "libxml2 closes <p> at the next <p>",
+        "text_preview": "libxml2 keeps markup inside <textarea> as text",
+    },
+}
+
+
+def big_article(sections: int = 400) -> str:
+    """Wikipedia-sized page: long head, many paragraphs, links, images and tables."""
+    head = [
+        "<!doctype html><html><head><meta charset='utf-8'><title>Large article</title>",
+        "<meta name='description' content='Generated large article'>",
+        "<link rel='canonical' href='/wiki/Large_article'>",
+    ]
+    head += [f"<link rel='stylesheet' href='/s/{i}.css'>" for i in range(40)]
+    head += [f"<script>var x{i} = {i};</script>" for i in range(40)]
+    body = ["</head><body><h1>Large <i>article</i></h1>"]
+    for i in range(sections):
+        body.append(f"<h2 id='s{i}'>Section {i}</h2>")
+        body.append(
+            f"<p>Paragraph {i} with <a href='/wiki/Link_{i}'>a link</a>, "
+            f"<b>bold</b> and <sup><a href='#cite-{i}'>[{i}]</a></sup> text. " + "Lorem ipsum dolor sit amet. " * 12 + "</p>"
+        )
+        body.append(f"<div class='thumb'><img src='/img/{i}.jpg' alt='img {i}'></div>")
+        body.append("<table>" + "".join(f"<tr><td>r{r}</td><td>v{r}</td></tr>" for r in range(5)) + "</table>")
+    body.append("</body></html>")
+    return "\n".join(head + body)
+
+
+def corpus_pages():
+    for path in sorted(CORPUS.glob("*.html")):
+        yield path, path.read_text(encoding="utf-8")
+
+
+def time_parse(extractor: GenericHtmlExtractor, url: str, html: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extractor.parse(url, html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fast = GenericHtmlExtractor(parser="lxml")
+    reference = GenericHtmlExtractor(parser="html.parser")
+
+    failures = 0
+    for path, html in corpus_pages():
+        golden_path = path.with_suffix(".json")
+        if args.update_golden:
+            golden = asdict(reference.parse(BASE_URL + path.name, html))
+            golden_path.write_text(json.dumps(golden, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+            continue
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+        got = asdict(fast.parse(BASE_URL + path.name, html))
+        known = KNOWN_DIFFERENCES.get(path.name, {})
+        diff = [k for k in golden if golden[k] != got.get(k) and k not in known]
+        print(f"golden {path.name}: {'ok' if not diff else 'DIFF ' + ', '.join(diff)}")
+        for k, reason in known.items():
+            if golden.get(k) != got.get(k):
+                print(f"  known difference {k}: {got.get(k)!r} (html.parser: {golden.get(k)!r}; {reason})")
+        failures += bool(diff)
+    if args.update_golden:
+        print(f"golden files updated in {CORPUS}")
+        return
+
+    pages = [(p.name, html) for p, html in corpus_pages()]
+    pages.append(("big_article (generated)", big_article()))
+    same = asdict(fast.parse(BASE_URL, pages[-1][1])) == asdict(reference.parse(BASE_URL, pages[-1][1]))
+
+    results = []
+    for name, html in pages:
+        bs_s = time_parse(reference, BASE_URL, html, args.repeat)
+        lxml_s = time_parse(fast, BASE_URL, html, args.repeat)
+        results.append({
+            "page": name,
+            "kb": round(len(html.encode("utf-8")) / 1024, 1),
+            "html.parser_ms": round(bs_s * 1000, 3),
+            "lxml_ms": round(lxml_s * 1000, 3),
+            "speedup": round(bs_s / lxml_s, 1),
+        })
+    print(json.dumps({"big_article_identical": same, "results": results}, indent=2))
+    sys.exit(1 if failures or not same else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Memory benchmark: peak RSS of a run as the input grows.
+
+Starts bench/fixture_server.py, then runs main.py (csv output, no images)
+on inputs of increasing size with the same concurrency and prints the
+peak RSS of each run as JSON. With streaming input and output the peak
+should stay flat instead of growing with the number of URLs.
+
+    python bench/bench_memory.py --sizes 1000 10000 50000 --workers 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_engines import ROOT, write_input
+
+
+def run_once(input_csv: Path, out_dir: Path, engine: str, workers: int, per_host: int) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    cmd = [
+        sys.executable, str(ROOT / "src" / "scraper" / "main.py"),
+        "--input", str(input_csv), "--output", str(out_dir),
+        "--engine", engine, "--workers", str(workers), "--per-host", str(per_host),
+        "--pool-size", str(per_host), "--rate", "0", "--format", "csv", "--max-images", "0",
+    ]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    # wait4 devolve o rusage só deste filho (RUSAGE_CHILDREN acumularia o máximo)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise SystemExit(f"main.py exited with {proc.returncode}")
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),  # Linux: ru_maxrss em KB
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    parser.add_argument("--engine", choices=["threads", "async"], default="async")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--per-host", type=int, default=16)
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "bench" / "fixture_server.py"), "--hosts", str(args.hosts),
+         "--port", str(args.port), "--delay-ms", str(args.delay_ms), "--images", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        server.stdout.readline()  # espera o "serving ..."
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            for size in args.sizes:
+                input_csv = tmp_path / f"input_{size}.csv"
+                write_input(input_csv, size, args.hosts, args.port)
+                res = run_once(input_csv, tmp_path / f"out_{size}", args.engine, args.workers, args.per_host)
+                results.append({"urls": size, **res})
+        print(json.dumps({"engine": args.engine, "workers": args.workers, "results": results}, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+End-to-end benchmark suite with regression comparison.
+
+Starts bench/fixture_server.py and runs main.py (the whole pipeline:
+fetch, extract, images, data.json/data.csv, report) once per scenario and
+engine:
+
+    small      small pages with a few images
+    huge       multi-megabyte HTML pages
+    images     pages with many images each
+    slow       hosts answering after an extra delay
+    flaky      about one request in five is a 503 (retried)
+    limited    hosts answering 429 + Retry-After over a request budget
+    redirects  every URL redirects once
+
+For each run it reports pages/sec, p50/p99 per-URL latency (from
+metrics.json), peak RSS and bytes written. It then times
+GenericHtmlExtractor.extract, downloader.download_images and the data.csv,
+data.jsonl and data.parquet writers in-process against the same server.
+
+Results are printed as JSON; --save keeps them and --compare checks them
+against an earlier file, exiting with 1 when something got worse by more
+than --tolerance:
+
+    python bench/bench_suite.py --save bench/results/base.json
+    python bench/bench_suite.py --compare bench/results/base.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from bench_engines import ROOT
+
+sys.path.insert(0, str(ROOT / "src"))
+
+from scraper import downloader  # noqa: E402
+from scraper.exporter import DataCsvWriter, JsonlWriter, ParquetWriter  # noqa: E402
+from scraper.main import build_payload  # noqa: E402
+from scraper.metrics import Histogram  # noqa: E402
+from scraper.sites.generic import GenericHtmlExtractor  # noqa: E402
+
+# cenário -> (rota do fixture server, fração de --urls, argumentos extras do main.py)
+SCENARIOS = {
+    "small": ("page", 1.0, []),
+    "huge": ("huge", 0.05, ["--max-images", "0"]),
+    "images": ("many", 0.1, ["--max-images", "100"]),
+    "slow": ("slow", 0.5, []),
+    "flaky": ("flaky", 0.5, ["--retry-backoff", "0.05"]),
+    "limited": ("limited", 0.5, []),
+    "redirects": ("redirect", 1.0, []),
+}
+
+# métricas comparadas com --compare e o sentido em que elas melhoram
+HIGHER_IS_BETTER = {"pages_per_sec", "images_per_sec", "rows_per_sec", "mb_per_sec"}
+LOWER_IS_BETTER = {"p50_s", "p99_s", "peak_rss_mb", "ms_p50", "ms_p99"}
+
+
+def write_input(path: Path, route: str, urls: int, hosts: int, port: int) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        f.write("url\n")
+        for n in range(urls):
+            f.write(f"http://127.0.0.{n % hosts + 1}:{port}/{route}/{n}\n")
+
+
+def bytes_written(out_dir: Path) -> Dict[str, int]:
+    """Size of everything the run left in out_dir; hardlinked images count once."""
+    seen = set()
+    total = files = 0
+    for dirpath, _, names in os.walk(out_dir):
+        for name in names:
+            st = os.stat(os.path.join(dirpath, name))
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            total += st.st_size
+            files += 1
+    return {"bytes_written": total, "files_written": files}
+
+
+def run_main(input_csv: Path, out_dir: Path, engine: str, workers: int, per_host: int, extra: List[str]) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    cmd = [
+        sys.executable, str(ROOT / "src" / "scraper" / "main.py"),
+        "--input", str(input_csv), "--output", str(out_dir),
+        "--engine", engine, "--workers", str(workers), "--per-host", str(per_host),
+        "--pool-size", str(per_host), "--rate", "0", "--format", "both", *extra,
+    ]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    # wait4 devolve o rusage só deste filho (RUSAGE_CHILDREN acumularia o máximo)
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise SystemExit(f"main.py exited with {os.waitstatus_to_exitcode(status)}: {' '.join(cmd)}")
+
+    summary = json.loads((out_dir / "metrics.json").read_text(encoding="utf-8"))
+    total = summary["timings_s"].get("total", {})
+    statuses = summary["statuses"]
+    return {
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(statuses.get("ok", 0) / seconds, 1),
+        "p50_s": total.get("p50", 0.0),
+        "p99_s": total.get("p99", 0.0),
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),  # Linux: ru_maxrss em KB
+        "statuses": statuses,
+        **bytes_written(out_dir),
+    }
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    hist = Histogram()
+    for s in samples:
+        hist.add(s)
+    return {"ms_p50": round(hist.quantile(0.5) * 1000, 3), "ms_p99": round(hist.quantile(0.99) * 1000, 3)}
+
+
+def bench_extract(base: str, pages: int) -> dict:
+    extractor = GenericHtmlExtractor()
+    out = {}
+    for route, count in (("page", pages), ("huge", max(1, pages // 20))):
+        samples = []
+        start = time.perf_counter()
+        for n in range(count):
+            t = time.perf_counter()
+            extractor.extract(f"{base}/{route}/{n}")
+            samples.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        out[route] = {"pages": count, "pages_per_sec": round(count / elapsed, 1), **latency_summary(samples)}
+    return out
+
+
+def bench_images(base: str, pages: int, images: int, tmp: Path) -> dict:
+    downloader.configure()
+    samples = []
+    size = 0
+    start = time.perf_counter()
+    for n in range(pages):
+        out_dir = tmp / f"images_{n}"
+        t = time.perf_counter()
+        saved = downloader.download_images([f"{base}/img/{n}-{k}.png" for k in range(images)], out_dir)
+        samples.append(time.perf_counter() - t)
+        size += sum(os.path.getsize(s.path) for s in saved)
+    elapsed = time.perf_counter() - start
+    return {
+        "images": pages * images,
+        "images_per_sec": round(pages * images / elapsed, 1),
+        "mb_per_sec": round(size / elapsed / 1e6, 2),
+        **latency_summary(samples),
+    }
+
+
+def bench_exporters(base: str, rows: int, tmp: Path) -> dict:
+    item = GenericHtmlExtractor().extract(f"{base}/page/0")
+    payload = build_payload(item.url, item, [])
+    out = {}
+    for name, writer_cls in (("data_csv", DataCsvWriter), ("data_jsonl", JsonlWriter), ("data_parquet", ParquetWriter)):
+        path = tmp / name
+        start = time.perf_counter()
+        try:
+            writer = writer_cls(path)
+        except ImportError:  # pyarrow é opcional
+            continue
+        with writer:
+            for _ in range(rows):
+                writer.write(payload)
+        elapsed = time.perf_counter() - start
+        out[name] = {
+            "rows": rows,
+            "rows_per_sec": round(rows / elapsed, 1),
+            "mb_per_sec": round(path.stat().st_size / elapsed / 1e6, 2),
+            "bytes_written": path.stat().st_size,
+        }
+    return out
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """scenarios.small.threads.p99_s -> value, for the metrics --compare knows about."""
+    out = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            out.update(flatten(value, path))
+        elif key in HIGHER_IS_BETTER or key in LOWER_IS_BETTER:
+            out[path] = value
+    return out
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[dict]:
+    cur = flatten({"scenarios": current["scenarios"], "micro": current["micro"]})
+    base = flatten({"scenarios": baseline.get("scenarios", {}), "micro": baseline.get("micro", {})})
+    rows = []
+    for path in sorted(cur.keys() & base.keys()):
+        old, new = base[path], cur[path]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if path.rsplit(".", 1)[1] in HIGHER_IS_BETTER else change
+        rows.append({"metric": path, "baseline": old, "current": new, "change_pct": round(change * 100, 1),
+                     "regression": worse > tolerance})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--urls", type=int, default=400, help="URLs of the small scenario (others are scaled from it)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--engines", nargs="+", choices=["threads", "async"], default=["threads", "async"])
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8910)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--thread-workers", type=int, default=32)
+    parser.add_argument("--async-workers", type=int, default=256)
+    parser.add_argument("--per-host", type=int, default=16)
+    parser.add_argument("--micro-pages", type=int, default=100, help="Pages fetched by the in-process benchmarks")
+    parser.add_argument("--save", default="", help="Write the results JSON to this file")
+    parser.add_argument("--compare", default="", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change that counts as a regression")
+    args = parser.parse_args()
+
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "bench" / "fixture_server.py"), "--hosts", str(args.hosts),
+         "--port", str(args.port), "--delay-ms", str(args.delay_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        server.stdout.readline()  # espera o "serving ..."
+        workers = {"threads": args.thread_workers, "async": args.async_workers}
+        scenarios: Dict[str, Dict[str, dict]] = {}
+        micro: Dict[str, dict] = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            for name in args.scenarios:
+                route, scale, extra = SCENARIOS[name]
+                urls = max(1, int(args.urls * scale))
+                input_csv = tmp_path / f"{name}.csv"
+                write_input(input_csv, route, urls, args.hosts, args.port)
+                for engine in args.engines:
+                    res = run_main(input_csv, tmp_path / f"{name}_{engine}", engine, workers[engine], args.per_host, extra)
+                    scenarios.setdefault(name, {})[engine] = {"urls": urls, **res}
+                    print(f"{name:<10} {engine:<8} {res['pages_per_sec']:>8} pages/s  p99 {res['p99_s']:.3f}s  "
+                          f"rss {res['peak_rss_mb']} MB", file=sys.stderr, flush=True)
+
+            base = f"http://127.0.0.1:{args.port}"
+            micro["extract"] = bench_extract(base, args.micro_pages)
+            micro["download_images"] = bench_images(base, max(1, args.micro_pages // 10), 20, tmp_path)
+            micro["exporters"] = bench_exporters(base, args.micro_pages * 100, tmp_path)
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "tolerance")},
+        "scenarios": scenarios,
+        "micro": micro,
+    }
+    exit_code = 0
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare(results, baseline, args.tolerance)
+        results["comparison"] = {"baseline": args.compare, "baseline_revision": baseline.get("revision", ""), "metrics": rows}
+        regressions = [r for r in rows if r["regression"]]
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']} -> {r['current']} ({r['change_pct']:+}%)", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
+    if args.save:
+        save_path = Path(args.save)
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(results, indent=2))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Local HTTP fixture server for benchmarks.
+
+Serves a synthetic site on several loopback addresses (127.0.0.1,
+127.0.0.2, ...) so each address behaves as a distinct host:
+
+    /page/<n>          small HTML page linking to a few images
+    /img/<n>-<k>.png   small 64x64 PNG
+    /img/pixel.gif     1x1 tracking pixel
+    /huge/<n>          --huge-kb of HTML (long article, many links/images)
+    /many/<n>          small page with --many-images images, plus a pixel and a data: URI
+    /slow/<n>          small page, answered after an extra --slow-ms
+    /flaky/<n>         503 for about one request in --flaky-every
+    /limited/<n>       429 + Retry-After once a host gets over --limit-rps
+    /redirect/<n>      302 to /page/<n>
+
+Every response is delayed by --delay-ms to simulate network latency.
+
+    python bench/fixture_server.py --hosts 4 --port 8900 --delay-ms 50
+"""
+import argparse
+import asyncio
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Tuple
+
+from aiohttp import web
+
+PAGE_TEMPLATE = """<!doctype html>
+<html><head>
+<title>Fixture page {n}</title>
+<meta name="description" content="Synthetic page {n} for benchmarks">
+<meta property="og:title" content="Fixture {n}">
+<meta property="og:image" content="/img/{n}-0.png">
+<link rel="canonical" href="/page/{n}">
+</head><body>
+<h1>Fixture page {n}</h1>
+<p>{text}</p>
+{images}
+{links}
+</body></html>
+"""
+
+
+def _png(width: int, height: int, pixels: bytes) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    stride = width * 3
+    rows = b"".join(b"\x00" + pixels[y * stride:(y + 1) * stride] for y in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+# PNG válido (passa pelo filtro de imagens do scraper); ruído: ~12 KB mesmo comprimido
+IMAGE_BYTES = _png(64, 64, os.urandom(64 * 64 * 3))
+PIXEL_BYTES = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+DATA_URI = "data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEAAAICRAEAOw=="
+
+
+def render_page(n: int, images: int, paragraphs: int = 1, junk_images: bool = False) -> str:
+    tags = [f'<img src="/img/{n}-{k}.png">' for k in range(images)]
+    if junk_images:
+        tags += ['<img src="/img/pixel.gif">', f'<img src="{DATA_URI}">']
+    return PAGE_TEMPLATE.format(
+        n=n,
+        text="</p><p>".join(["Lorem ipsum dolor sit amet. " * 40] * paragraphs),
+        images="\n".join(tags),
+        links="\n".join(f'<a href="/page/{n + k}">next {k}</a>' for k in range(1, 11)),
+    )
+
+
+def build_app(
+    delay_s: float,
+    images_per_page: int,
+    huge_kb: int = 2048,
+    many_images: int = 100,
+    slow_s: float = 0.5,
+    limit_rps: float = 20,
+    flaky_every: int = 5,
+) -> web.Application:
+    # ~1,1 KB por parágrafo
+    huge_paragraphs = max(1, huge_kb * 1024 // 1150)
+    flaky_hits: Dict[str, int] = {}
+    limit_windows: Dict[str, Tuple[int, int]] = {}  # host -> (segundo, requisições nele)
+
+    async def page(request: web.Request) -> web.Response:
+        n = int(request.match_info["n"])
+        await asyncio.sleep(delay_s)
+        return web.Response(text=render_page(n, images_per_page), content_type="text/html")
+
+    async def huge(request: web.Request) -> web.Response:
+        n = int(request.match_info["n"])
+        await asyncio.sleep(delay_s)
+        return web.Response(text=render_page(n, images_per_page, huge_paragraphs), content_type="text/html")
+
+    async def many(request: web.Request) -> web.Response:
+        n = int(request.match_info["n"])
+        await asyncio.sleep(delay_s)
+        return web.Response(text=render_page(n, many_images, junk_images=True), content_type="text/html")
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(slow_s)
+        return await page(request)
+
+    async def flaky(request: web.Request) -> web.Response:
+        # falhas espalhadas (não a primeira onda inteira, que abriria o disjuntor)
+        # e determinísticas: mesma sequência a cada servidor novo
+        hits = flaky_hits[request.path] = flaky_hits.get(request.path, 0) + 1
+        if zlib.crc32(f"{request.path}#{hits}".encode()) % flaky_every == 0:
+            await asyncio.sleep(delay_s)
+            return web.Response(status=503, text="try again")
+        return await page(request)
+
+    async def limited(request: web.Request) -> web.Response:
+        second = int(time.monotonic())
+        start, seen = limit_windows.get(request.host, (second, 0))
+        if start != second:
+            start, seen = second, 0
+        limit_windows[request.host] = (start, seen + 1)
+        if seen >= limit_rps:
+            await asyncio.sleep(delay_s)
+            return web.Response(status=429, text="slow down", headers={"Retry-After": "1"})
+        return await page(request)
+
+    async def redirect(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay_s)
+        raise web.HTTPFound(f"/page/{request.match_info['n']}")
+
+    async def image(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay_s)
+        if request.match_info["name"] == "pixel.gif":
+            return web.Response(body=PIXEL_BYTES, content_type="image/gif")
+        return web.Response(body=IMAGE_BYTES, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/page/{n}", page)
+    app.router.add_get("/img/{name}", image)
+    app.router.add_get("/huge/{n}", huge)
+    app.router.add_get("/many/{n}", many)
+    app.router.add_get("/slow/{n}", slow)
+    app.router.add_get("/flaky/{n}", flaky)
+    app.router.add_get("/limited/{n}", limited)
+    app.router.add_get("/redirect/{n}", redirect)
+    return app
+
+
+async def serve(hosts: int, port: int, app: web.Application) -> None:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    for i in range(1, hosts + 1):
+        await web.TCPSite(runner, f"127.0.0.{i}", port, backlog=4096).start()
+    print(f"serving {hosts} host(s) on port {port}", flush=True)
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--delay-ms", type=float, default=50)
+    parser.add_argument("--images", type=int, default=3, help="Images per page")
+    parser.add_argument("--huge-kb", type=int, default=2048, help="Size of the /huge pages")
+    parser.add_argument("--many-images", type=int, default=100, help="Images per /many page")
+    parser.add_argument("--slow-ms", type=float, default=500, help="Extra delay of the /slow pages")
+    parser.add_argument("--limit-rps", type=float, default=20, help="Requests/s per host before /limited answers 429")
+    parser.add_argument("--flaky-every", type=int, default=5, help="/flaky answers 503 to about 1 in this many requests")
+    args = parser.parse_args()
+    app = build_app(
+        args.delay_ms / 1000, args.images,
+        huge_kb=args.huge_kb, many_images=args.many_images, slow_s=args.slow_ms / 1000,
+        limit_rps=args.limit_rps, flaky_every=args.flaky_every,
+    )
+    asyncio.run(serve(args.hosts, args.port, app))
+
+
+if __name__ == "__main__":
+    main()
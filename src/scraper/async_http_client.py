@@ -0,0 +1,335 @@
+import asyncio
+import socket
+import ssl
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Mapping, Optional, Union
+
+import aiohttp
+import certifi
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from scraper import dns_cache, metrics
+from scraper.http_cache import CacheBodyWriter, CacheEntry, HttpCache
+from scraper.http_client import DEFAULT_HEADERS, DEFAULT_POOL_SIZE
+from scraper.rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    from scraper.retries import CircuitBreaker
+
+DEFAULT_LIMIT = 1000        # sockets abertos no total
+
+RETRYABLE_EXCEPTIONS = (
+    asyncio.TimeoutError,
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+)
+
+
+async def _on_dns_start(session, ctx, params) -> None:
+    ctx.dns_start = time.perf_counter()
+
+
+async def _on_dns_end(session, ctx, params) -> None:
+    ctx.dns_s = time.perf_counter() - ctx.dns_start
+    metrics.add("dns", ctx.dns_s, ctx.dns_start)
+
+
+async def _on_connect_start(session, ctx, params) -> None:
+    ctx.connect_start = time.perf_counter()
+    ctx.dns_s = 0.0
+
+
+async def _on_connect_end(session, ctx, params) -> None:
+    # a criação da conexão inclui a resolução DNS, medida à parte
+    start = ctx.connect_start + ctx.dns_s
+    metrics.add("connect", time.perf_counter() - start, start)
+
+
+def _timing_trace() -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+    trace.on_dns_resolvehost_start.append(_on_dns_start)
+    trace.on_dns_resolvehost_end.append(_on_dns_end)
+    trace.on_connection_create_start.append(_on_connect_start)
+    trace.on_connection_create_end.append(_on_connect_end)
+    return trace
+
+
+class _CachedResolver(aiohttp.abc.AbstractResolver):
+    """aiohttp resolver backed by the run's DnsCache (shared with the thread engine)."""
+
+    def __init__(self, cache: dns_cache.DnsCache):
+        self.cache = cache
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> list:
+        try:
+            addresses = await self.cache.addresses_async(host)
+        except dns_cache.HostUnresolvable as e:
+            raise OSError(str(e)) from e
+        return [
+            {"hostname": host, "host": ip, "port": port, "family": fam, "proto": 0, "flags": socket.AI_NUMERICHOST}
+            for fam, ip in addresses
+            if family in (socket.AF_UNSPEC, fam)
+        ]
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncHttpClient:
+    """
+    asyncio counterpart of http_client.HttpClient: a single aiohttp session
+    with a bounded connector, created lazily inside the running event loop.
+    """
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, pool_size: int = DEFAULT_POOL_SIZE):
+        self.limit = limit
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # uma sessão só vale no event loop em que foi criada
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._loop = loop
+            ssl_ctx = ssl.create_default_context(cafile=certifi.where())
+            dns = dns_cache.cache()
+            if dns is not None:
+                # o DnsCache já guarda as respostas (pelo TTL): sem o cache próprio do aiohttp
+                resolver = {"resolver": _CachedResolver(dns), "use_dns_cache": False}
+            else:
+                resolver = {"ttl_dns_cache": 300}
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.pool_size,
+                ssl=ssl_ctx,
+                **resolver,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=DEFAULT_HEADERS,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[_timing_trace()],
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_client = AsyncHttpClient()
+_cache: Optional[HttpCache] = None
+_limiter: Optional[RateLimiter] = None
+_breaker: Optional["CircuitBreaker"] = None
+
+
+def configure(
+    limit: int = DEFAULT_LIMIT,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    cache: Optional[HttpCache] = None,
+    limiter: Optional[RateLimiter] = None,
+    breaker: Optional["CircuitBreaker"] = None,
+) -> AsyncHttpClient:
+    """Replace the shared client (call before the event loop starts fetching)."""
+    global _client, _cache, _limiter, _breaker
+    _client = AsyncHttpClient(limit=limit, pool_size=pool_size)
+    _cache = cache
+    _limiter = limiter
+    _breaker = breaker
+    return _client
+
+
+def client() -> AsyncHttpClient:
+    return _client
+
+
+def _timeout(timeout_s: int) -> aiohttp.ClientTimeout:
+    # mesmo significado do timeout do requests: conexão e cada leitura
+    return aiohttp.ClientTimeout(sock_connect=timeout_s, sock_read=timeout_s)
+
+
+def _to_response(resp: aiohttp.ClientResponse, body: bytes) -> requests.Response:
+    """Wrap an aiohttp result in a requests.Response so callers get the same contract."""
+    out = requests.Response()
+    out.status_code = resp.status
+    out.reason = resp.reason or ""
+    out.url = str(resp.url)
+    out.headers = CaseInsensitiveDict(resp.headers)
+    out.encoding = get_encoding_from_headers(out.headers)
+    out._content = body
+    return out
+
+
+class _FileStream:
+    """Stand-in for aiohttp's StreamReader over a cached body file."""
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        with self._path.open("rb") as f:
+            while True:
+                chunk = f.read(n)
+                if not chunk:
+                    return
+                yield chunk
+
+
+class _CachedResponse:
+    def __init__(self, entry: CacheEntry):
+        self.status = 200
+        self.headers = entry.headers
+        self.content = _FileStream(entry.body_path)
+
+    def release(self) -> None:
+        pass
+
+
+class _TeeStream:
+    """Streams the response body while copying it into the HTTP cache."""
+
+    def __init__(self, content: aiohttp.StreamReader, writer: CacheBodyWriter, headers: Mapping[str, str]):
+        self._content = content
+        self._writer: Optional[CacheBodyWriter] = writer
+        self._headers = dict(headers)
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        async for chunk in self._content.iter_chunked(n):
+            if self._writer is not None:
+                self._writer.write(chunk)
+            yield chunk
+        if self._writer is not None:
+            self._writer.commit(self._headers)
+            self._writer = None
+
+    def discard(self) -> None:
+        if self._writer is not None:
+            self._writer.discard()  # corpo incompleto não vai para o cache
+            self._writer = None
+
+
+class _TeeResponse:
+    def __init__(self, resp: aiohttp.ClientResponse, writer: CacheBodyWriter):
+        self.status = resp.status
+        self.headers = resp.headers
+        self.content = _TeeStream(resp.content, writer, resp.headers)
+        self._resp = resp
+
+    def release(self) -> None:
+        self.content.discard()
+        self._resp.release()
+
+
+StreamResponse = Union[aiohttp.ClientResponse, _CachedResponse, _TeeResponse]
+
+
+def _observe(
+    url: str,
+    status: Optional[int],
+    latency_s: Optional[float] = None,
+    retry_after: Optional[str] = None,
+    timed_out: bool = False,
+) -> None:
+    if _limiter is not None and (status is not None or timed_out):
+        _limiter.feedback(url, status, latency_s, retry_after)
+    if _breaker is not None:
+        _breaker.record_status(url, status, retry_after)
+
+
+async def _request(url: str, timeout_s: int, headers: Optional[Mapping[str, str]], rate_limit: bool) -> aiohttp.ClientResponse:
+    """
+    One session.get behind the circuit breaker and the shared RateLimiter
+    (headers received; body still unread). Retries are up to the caller.
+    """
+    dns = dns_cache.cache()
+    if dns is not None:
+        with metrics.stage("dns"):
+            await dns.check_async(url)
+    probe = _breaker.check(url) if _breaker is not None else 0
+    try:
+        if _limiter is not None:
+            await _limiter.acquire_async(url, consume=rate_limit)
+        start = time.perf_counter()
+        try:
+            resp = await _client.session.get(url, timeout=_timeout(timeout_s), headers=headers)
+        except RETRYABLE_EXCEPTIONS as e:
+            _observe(url, None, timed_out=isinstance(e, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)))
+            raise
+        ttfb = time.perf_counter() - start
+        metrics.add("ttfb", ttfb, start)
+        _observe(url, resp.status, ttfb, resp.headers.get("Retry-After"))
+    finally:
+        # redirects demais, URL inválida, task cancelada...: o teste não fica preso
+        if probe:
+            _breaker.release(url, probe)
+    return resp
+
+
+async def get(url: str, timeout_s: int = 20, rate_limit: bool = True) -> requests.Response:
+    entry = _cache.lookup(url) if _cache is not None else None
+    if entry is not None and _cache.is_fresh(entry):
+        _cache.count("hit")
+        return _cache.response(entry)
+
+    headers = HttpCache.validators(entry) if entry is not None else None
+    async with await _request(url, timeout_s, headers, rate_limit) as resp:
+        if entry is not None and resp.status == 304:
+            _cache.refresh(entry, resp.headers)
+            _cache.count("revalidated")
+            return _cache.response(entry)
+        with metrics.stage("download"):
+            body = await resp.read()
+        out = _to_response(resp, body)
+    out.raise_for_status()
+
+    if _cache is not None:
+        _cache.count("miss")
+        if HttpCache.storable(out.headers):
+            _cache.store(url, out.headers, body)
+    return out
+
+
+async def _open(url: str, timeout_s: int, rate_limit: bool) -> StreamResponse:
+    entry = _cache.lookup(url) if _cache is not None else None
+    if entry is not None and _cache.is_fresh(entry):
+        _cache.count("hit")
+        return _CachedResponse(entry)
+
+    headers = HttpCache.validators(entry) if entry is not None else None
+    resp = await _request(url, timeout_s, headers, rate_limit)
+
+    if entry is not None and resp.status == 304:
+        resp.release()
+        _cache.refresh(entry, resp.headers)
+        _cache.count("revalidated")
+        return _CachedResponse(entry)
+
+    if resp.status >= 400:
+        resp.release()
+        _to_response(resp, b"").raise_for_status()
+
+    if _cache is not None:
+        _cache.count("miss")
+        if HttpCache.storable(resp.headers):
+            return _TeeResponse(resp, _cache.body_writer(url))
+    return resp
+
+
+@asynccontextmanager
+async def download(url: str, timeout_s: int = 25, rate_limit: bool = True) -> AsyncIterator[StreamResponse]:
+    """
+    Streaming download: `async with download(url) as resp`, then read
+    `resp.content.iter_chunked(...)`. The connection is released on exit.
+    """
+    resp = await _open(url, timeout_s, rate_limit)
+    try:
+        yield resp
+    finally:
+        resp.release()
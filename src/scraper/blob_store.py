@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class BlobWriter:
+    """Temp file that hashes (sha256) everything written to it."""
+
+    def __init__(self, tmp_dir: Path):
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        self.path = Path(tmp)
+        self._f = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._f.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def discard(self) -> None:
+        self._f.close()
+        self.path.unlink(missing_ok=True)
+
+
+class BlobStore:
+    """
+    Run-wide content-addressed store for downloaded images.
+
+    Blobs live at <root>/<sha[:2]>/<sha256>; <root>/index.jsonl maps each
+    image URL to its hash and is appended as downloads finish, so a URL is
+    fetched at most once per run (and once across runs when the previous
+    index is loaded). Item folders get hardlinks to the blobs.
+    """
+
+    packed = False  # True quando os blobs não existem como arquivos (pack.PackStore)
+
+    def __init__(self, root: Path, load_index: bool = False):
+        self.root = root
+        self.tmp_dir = root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = {"downloaded": 0, "reused": 0, "bytes_downloaded": 0}
+
+        self._by_url: Dict[str, str] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._open_index(load_index)
+
+    def _open_index(self, load: bool) -> None:
+        self.index_path = self.root / "index.jsonl"
+        if load and self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # linha truncada por um crash
+                    self._by_url[rec["url"]] = rec["sha256"]
+        self._index = self.index_path.open("a", encoding="utf-8")
+
+    def blob_path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha
+
+    def has_blob(self, sha: str) -> bool:
+        return self.blob_path(sha).exists()
+
+    def head(self, sha: str, n: int) -> bytes:
+        """First `n` bytes of a stored blob (b"" when it cannot be read)."""
+        try:
+            with self.blob_path(sha).open("rb") as f:
+                return f.read(n)
+        except OSError:
+            return b""
+
+    def lookup(self, url: str) -> Optional[str]:
+        with self._lock:
+            sha = self._by_url.get(url)
+        if sha and self.has_blob(sha):
+            return sha
+        return None
+
+    def _store(self, url: str, sha: str, writer: BlobWriter) -> None:
+        dest = self.blob_path(sha)
+        dest.parent.mkdir(exist_ok=True)
+        if dest.exists():
+            writer.path.unlink(missing_ok=True)  # mesmo conteúdo vindo de outra URL
+        else:
+            os.replace(writer.path, dest)
+
+    def _record(self, url: str, sha: str, size: int) -> None:
+        self._index.write(json.dumps({"url": url, "sha256": sha, "size": size}) + "\n")
+        self._index.flush()
+
+    def _commit(self, url: str, writer: BlobWriter) -> str:
+        writer.close()
+        sha = writer.hexdigest()
+        self._store(url, sha, writer)
+        with self._lock:
+            self._by_url[url] = sha
+            self._record(url, sha, writer.size)
+            self.stats["downloaded"] += 1
+            self.stats["bytes_downloaded"] += writer.size
+        return sha
+
+    def _claim(self, url: str) -> Tuple[bool, Future]:
+        with self._lock:
+            fut = self._inflight.get(url)
+            if fut is not None:
+                return False, fut
+            fut = self._inflight[url] = Future()
+            return True, fut
+
+    def _release(self, url: str) -> None:
+        with self._lock:
+            self._inflight.pop(url, None)
+
+    def _reused(self) -> None:
+        with self._lock:
+            self.stats["reused"] += 1
+
+    def get_or_fetch(self, url: str, fetch: Callable[[BlobWriter], None]) -> str:
+        """
+        Return the sha256 for `url`, calling fetch(writer) only if no earlier
+        or concurrent download of the same URL exists.
+        """
+        sha = self.lookup(url)
+        if sha:
+            self._reused()
+            return sha
+
+        owner, fut = self._claim(url)
+        if not owner:
+            sha = fut.result()
+            self._reused()
+            return sha
+
+        try:
+            sha = self.lookup(url)  # outro download pode ter terminado antes do claim
+            if sha:
+                fut.set_result(sha)
+                self._reused()
+                return sha
+            writer = BlobWriter(self.tmp_dir)
+            try:
+                fetch(writer)
+            except BaseException:
+                writer.discard()
+                raise
+            sha = self._commit(url, writer)
+            fut.set_result(sha)
+            return sha
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            self._release(url)
+
+    async def get_or_fetch_async(self, url: str, fetch: Callable[[BlobWriter], Awaitable[None]]) -> str:
+        sha = self.lookup(url)
+        if sha:
+            self._reused()
+            return sha
+
+        owner, fut = self._claim(url)
+        if not owner:
+            sha = await asyncio.wrap_future(fut)
+            self._reused()
+            return sha
+
+        try:
+            sha = self.lookup(url)
+            if sha:
+                fut.set_result(sha)
+                self._reused()
+                return sha
+            writer = BlobWriter(self.tmp_dir)
+            try:
+                await fetch(writer)
+            except BaseException:
+                writer.discard()
+                raise
+            sha = self._commit(url, writer)
+            fut.set_result(sha)
+            return sha
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            self._release(url)
+
+    def link(self, sha: str, dest: Path) -> str:
+        """Hardlink the blob to `dest` (copy when hardlinks are not supported); returns the path to record."""
+        src = self.blob_path(sha)
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.link")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        return str(dest)
+
+    def close(self) -> None:
+        self._index.close()
@@ -0,0 +1,147 @@
+import hashlib
+import math
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+INITIAL_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+GROWTH = 2  # cada fatia nova comporta o dobro da anterior
+TIGHTENING = 0.5  # ... com metade da taxa de falsos positivos: a soma fica abaixo de error_rate
+
+
+def _hashes(key: bytes) -> Tuple[int, int]:
+    # double hashing: h1 + i*h2 a partir de um único digest
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over byte keys: about 1.8 MB per million keys at
+    a 0.1% false-positive rate. Adding more keys than `capacity` keeps it
+    working, only with a higher false-positive rate.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0  # chaves novas adicionadas
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h1: int, h2: int):
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def _add(self, h1: int, h2: int) -> bool:
+        seen = True
+        bits = self._bits
+        for pos in self._positions(h1, h2):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                seen = False
+                bits[byte] |= mask
+        if not seen:
+            self.count += 1
+        return seen
+
+    def _has(self, h1: int, h2: int) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h1, h2))
+
+    def add(self, key: bytes) -> bool:
+        """Set the key's bits; returns True if they were all set already (maybe seen)."""
+        return self._add(*_hashes(key))
+
+    def __contains__(self, key: bytes) -> bool:
+        return self._has(*_hashes(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows with the keys instead of being sized up front:
+    it starts with one small slice and, whenever the newest slice reaches
+    its capacity, adds one GROWTH times larger with a TIGHTENING times
+    lower false-positive rate, so the overall rate stays under `error_rate`
+    and memory follows the number of keys actually added.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.error_rate = error_rate
+        self.slices: List[BloomFilter] = []
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int) -> None:
+        rate = self.error_rate * (1 - TIGHTENING) * TIGHTENING ** len(self.slices)
+        self.slices.append(BloomFilter(capacity, rate))
+
+    def add(self, key: bytes) -> bool:
+        """Set the key's bits; returns True if they were all set already (maybe seen)."""
+        h1, h2 = _hashes(key)
+        *older, current = self.slices
+        if any(s._has(h1, h2) for s in older) or current._add(h1, h2):
+            return True
+        if current.count >= current.capacity:
+            self._grow(current.capacity * GROWTH)
+        return False
+
+    def __contains__(self, key: bytes) -> bool:
+        h1, h2 = _hashes(key)
+        return any(s._has(h1, h2) for s in self.slices)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self.slices)
+
+
+class SeenSet:
+    """
+    Exact, memory-compact set of keys seen during a run. The Bloom filter
+    answers "never seen" in memory; only its "maybe seen" answers (real
+    duplicates plus the rare false positive) are confirmed against an
+    exact on-disk table in a private temporary SQLite database, so memory
+    stays at the filter size even for tens of millions of URLs. The filter
+    starts at `capacity` keys (default INITIAL_CAPACITY, about 200 KB) and
+    grows as keys are added, so small runs stay small.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: float = DEFAULT_ERROR_RATE):
+        self.bloom = ScalableBloomFilter(capacity or INITIAL_CAPACITY, error_rate)
+        self.stats = {"added": 0, "bloom_false_positives": 0}
+        # "" = banco temporário em disco, apagado no close()
+        self._db = sqlite3.connect("", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE seen (key BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def add(self, text: str) -> bool:
+        """Add a key; returns True if it had been added before."""
+        key = self._key(text)
+        with self._lock:
+            if self.bloom.add(key):
+                if self._db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone():
+                    return True
+                self.stats["bloom_false_positives"] += 1
+            self._db.execute("INSERT INTO seen (key) VALUES (?)", (key,))
+            self.stats["added"] += 1
+            return False
+
+    def __contains__(self, text: str) -> bool:
+        key = self._key(text)
+        with self._lock:
+            if key not in self.bloom:
+                return False
+            return self._db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone() is not None
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,310 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from scraper import metrics
+from scraper.scheduler import IDLE, host_of
+
+DEFAULT_TTL_S = 300.0         # teto do TTL; sem dnspython, o TTL de toda resposta
+DEFAULT_NEGATIVE_TTL_S = 60.0
+DEFAULT_TIMEOUT_S = 5.0
+DEFAULT_WORKERS = 16          # resoluções simultâneas
+DEFAULT_PREFETCH = 256        # URLs da entrada lidas à frente para resolver seus hosts
+DEFAULT_MAX_HOSTS = 100_000
+MIN_TTL_S = 5.0               # TTL 0/1 s não vira uma consulta por requisição
+
+Address = Tuple[int, str]  # (família, IP)
+
+# o nome não existe: tentar de novo não ajuda
+_PERMANENT_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+
+class HostUnresolvable(Exception):
+    """Raised instead of a request when the URL's host does not resolve (cached for a while)."""
+
+    def __init__(self, host: str, reason: str, temporary: bool, retry_in: float = 0.0):
+        super().__init__(f"host {host} does not resolve ({reason})")
+        self.host = host
+        self.reason = reason
+        self.temporary = temporary  # timeout / SERVFAIL: vale tentar depois
+        self.retry_in = retry_in
+
+
+@dataclass
+class _Entry:
+    addresses: List[Address]
+    expires: float
+    reason: str = ""         # vazio = resolvido
+    temporary: bool = False
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+def _dnspython_resolver() -> Optional[Any]:
+    try:
+        import dns.resolver
+    except ImportError:
+        return None
+    try:
+        return dns.resolver.Resolver()
+    except Exception:  # sem /etc/resolv.conf utilizável
+        return None
+
+
+class DnsCache:
+    """
+    Process-wide DNS cache shared by both engines.
+
+    Positive answers are kept for their record TTL when dnspython is
+    installed (the system resolver does not expose TTLs, so without it
+    every answer lives `ttl_s`), failures for `negative_ttl_s`. Lookups run
+    on a small thread pool with one lookup per host in flight, so hosts of
+    upcoming URLs can be resolved concurrently ahead of time (prefetch) and
+    a slow resolver never blocks a fetch worker for more than `timeout_s`.
+    """
+
+    def __init__(
+        self,
+        ttl_s: float = DEFAULT_TTL_S,
+        negative_ttl_s: float = DEFAULT_NEGATIVE_TTL_S,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        workers: int = DEFAULT_WORKERS,
+        max_hosts: int = DEFAULT_MAX_HOSTS,
+    ):
+        self.ttl_s = max(MIN_TTL_S, ttl_s)
+        self.negative_ttl_s = max(0.0, negative_ttl_s)
+        self.timeout_s = timeout_s
+        self.max_hosts = max(1, max_hosts)
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "prefetched": 0, "failed": 0, "timeouts": 0}
+        self.lookup_time = metrics.Histogram()  # só consultas reais ao resolvedor
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dns")
+        self._resolver = _dnspython_resolver()
+        if self._resolver is not None:
+            self._resolver.lifetime = timeout_s
+
+    # ---- resolução ----
+
+    def _lookup(self, host: str) -> Tuple[List[Address], float]:
+        if self._resolver is not None:
+            try:
+                return self._lookup_dnspython(host)
+            except Exception:
+                pass  # /etc/hosts, domínios de busca, NXDOMAIN...: o resolvedor do sistema decide
+        infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys((family, sockaddr[0]) for family, _, _, _, sockaddr in infos))
+        return addresses, self.ttl_s
+
+    def _lookup_dnspython(self, host: str) -> Tuple[List[Address], float]:
+        import dns.resolver
+
+        for rdtype, family in (("A", socket.AF_INET), ("AAAA", socket.AF_INET6)):
+            try:
+                answer = self._resolver.resolve(host, rdtype, search=True)
+            except dns.resolver.NoAnswer:
+                continue
+            addresses = [(family, rdata.address) for rdata in answer]
+            if addresses:
+                return addresses, min(self.ttl_s, max(MIN_TTL_S, answer.rrset.ttl))
+        raise LookupError(host)
+
+    def _store(self, host: str, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[host] = entry
+            self._entries.move_to_end(host)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+
+    def _resolve_now(self, host: str) -> _Entry:
+        try:
+            start = time.perf_counter()
+            try:
+                addresses, ttl = self._lookup(host)
+                entry = _Entry(addresses, time.monotonic() + ttl)
+            except socket.gaierror as e:
+                temporary = e.errno not in _PERMANENT_ERRORS
+                entry = _Entry([], time.monotonic() + self.negative_ttl_s, e.strerror or str(e), temporary)
+            except (OSError, UnicodeError) as e:  # rótulo inválido, etc.
+                entry = _Entry([], time.monotonic() + self.negative_ttl_s, str(e), False)
+            with self._lock:
+                self.lookup_time.add(time.perf_counter() - start)
+                if entry.reason:
+                    self.stats["failed"] += 1
+            self._store(host, entry)  # antes de sair de _inflight: sem janela para uma consulta repetida
+            return entry
+        finally:
+            with self._lock:
+                self._inflight.pop(host, None)
+
+    def _submit(self, host: str) -> Future:
+        with self._lock:
+            fut = self._inflight.get(host)
+            if fut is None:
+                fut = self._inflight[host] = self._executor.submit(self._resolve_now, host)
+            return fut
+
+    def _cached(self, host: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self._entries[host]
+                return None
+            self._entries.move_to_end(host)
+            return entry
+
+    def _timed_out(self, host: str) -> _Entry:
+        # a consulta continua no pool e substitui esta entrada quando terminar
+        entry = _Entry([], time.monotonic() + self.negative_ttl_s, "timeout", True)
+        with self._lock:
+            self.stats["timeouts"] += 1
+        self._store(host, entry)
+        return entry
+
+    def _count(self, entry: _Entry, hit: bool) -> None:
+        key = ("negative_hits" if entry.reason else "hits") if hit else "misses"
+        with self._lock:
+            self.stats[key] += 1
+        metrics.count("dns_hit" if hit else "dns_miss")
+
+    def _raise_if_failed(self, host: str, entry: _Entry) -> List[Address]:
+        if entry.reason:
+            retry_in = max(0.0, entry.expires - time.monotonic()) if entry.temporary else 0.0
+            raise HostUnresolvable(host, entry.reason, entry.temporary, retry_in)
+        return entry.addresses
+
+    def _get(self, host: str) -> Tuple[_Entry, bool]:
+        entry = self._cached(host)
+        if entry is not None:
+            return entry, True
+        try:
+            return self._submit(host).result(timeout=self.timeout_s), False
+        except FutureTimeout:
+            return self._timed_out(host), False
+
+    async def _get_async(self, host: str) -> Tuple[_Entry, bool]:
+        entry = self._cached(host)
+        if entry is not None:
+            return entry, True
+        try:
+            # shield: desistir de esperar não cancela a consulta dos outros interessados
+            fut = asyncio.shield(asyncio.wrap_future(self._submit(host)))
+            return await asyncio.wait_for(fut, self.timeout_s), False
+        except asyncio.TimeoutError:
+            return self._timed_out(host), False
+
+    def addresses(self, host: str) -> List[Address]:
+        """Addresses of `host` (for opening connections; raises HostUnresolvable)."""
+        return self._raise_if_failed(host, self._get(host)[0])
+
+    async def addresses_async(self, host: str) -> List[Address]:
+        return self._raise_if_failed(host, (await self._get_async(host))[0])
+
+    def check(self, url: str) -> None:
+        """
+        Make sure the URL's host resolves before it takes a rate-limit slot:
+        raises HostUnresolvable right away for hosts that failed recently.
+        """
+        host = host_of(url)
+        if not host or is_ip(host):
+            return
+        entry, hit = self._get(host)
+        self._count(entry, hit)
+        self._raise_if_failed(host, entry)
+
+    async def check_async(self, url: str) -> None:
+        host = host_of(url)
+        if not host or is_ip(host):
+            return
+        entry, hit = await self._get_async(host)
+        self._count(entry, hit)
+        self._raise_if_failed(host, entry)
+
+    # ---- prefetch ----
+
+    def prefetch(self, host: str) -> None:
+        """Start resolving `host` in the background (no-op if cached or in flight)."""
+        if not host or is_ip(host) or self._cached(host) is not None:
+            return
+        with self._lock:
+            if host in self._inflight:
+                return
+            self.stats["prefetched"] += 1
+        self._submit(host)
+
+    def prefetch_ahead(self, urls: Iterable[Any], ahead: int = DEFAULT_PREFETCH) -> Iterator[Any]:
+        """
+        Pass `urls` through unchanged, reading up to `ahead` items early and
+        prefetching their hosts, so lookups overlap the fetches before them.
+        A scheduler.IDLE marker flushes the look-ahead (the source is waiting
+        on in-flight pages and must not be read further).
+        """
+        buffer: Deque[Any] = deque()
+        for url in urls:
+            if url is IDLE:
+                while buffer:
+                    yield buffer.popleft()
+                yield url
+                continue
+            self.prefetch(host_of(url))
+            buffer.append(url)
+            if len(buffer) > ahead:
+                yield buffer.popleft()
+        while buffer:
+            yield buffer.popleft()
+
+    # ---- relatório ----
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            checks = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"]
+            hit_rate = round((self.stats["hits"] + self.stats["negative_hits"]) / checks, 4) if checks else 0.0
+            return {
+                **self.stats,
+                "hit_rate": hit_rate,
+                "hosts_cached": len(self._entries),
+                "ttl_source": "record" if self._resolver is not None else "fixed",
+                "lookup_s": self.lookup_time.summary(),
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_cache: Optional[DnsCache] = None
+
+
+def configure(
+    enabled: bool = True,
+    ttl_s: float = DEFAULT_TTL_S,
+    negative_ttl_s: float = DEFAULT_NEGATIVE_TTL_S,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+    workers: int = DEFAULT_WORKERS,
+) -> Optional[DnsCache]:
+    """Start the run-wide DNS cache, used by both HTTP clients (enabled=False: system resolver per connection)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = DnsCache(ttl_s, negative_ttl_s, timeout_s, workers) if enabled else None
+    return _cache
+
+
+def cache() -> Optional[DnsCache]:
+    return _cache
@@ -1,9 +1,32 @@
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import requests
+from scraper import async_http_client, images, metrics
+from scraper.blob_store import BlobStore, BlobWriter
 from scraper.http_client import download
+from scraper.scheduler import host_of
+
+DEFAULT_IMAGE_WORKERS = 8   # downloads de imagem simultâneos (todas as páginas)
+DEFAULT_IMAGE_PER_HOST = 4  # downloads simultâneos por host de imagem
+
+
+@dataclass
+class SavedImage:
+    url: str
+    path: str  # no modo empacotado: nome do registro no pack (pack.blob_name)
+    sha256: str = ""  # vazio quando não há BlobStore configurado
+    format: str = ""  # formato real (sniffado), não o da extensão / Content-Type
+    width: int = 0
+    height: int = 0
+    thumbnail: str = ""
 
 
 def _safe_filename_from_url(url: str, default: str) -> str:
@@ -13,25 +36,312 @@ def _safe_filename_from_url(url: str, default: str) -> str:
         return default
     return name.split("?")[0].split("#")[0] or default
 
-def download_images(image_urls: List[str], out_dir: Path) -> List[str]:
-    out_dir.mkdir(parents=True, exist_ok=True)
-    saved = []
 
+def _plan_paths(image_urls: List[str], out_dir: Path) -> List[Path]:
+    """
+    Pick every destination path up front, in input order, so names stay
+    deterministic no matter which download finishes first. Names are unique
+    by stem: the extension may still change to the sniffed format's.
+    """
+    taken = set()
+    paths = []
     for idx, url in enumerate(image_urls, start=1):
-        try:
-            resp = download(url)  # retry/backoff + SSL ok
-            fname = _safe_filename_from_url(url, default=f"img_{idx}.jpg")
-            path = out_dir / fname
+        fname = _safe_filename_from_url(url, default=f"img_{idx}.jpg")
+        path = out_dir / fname
 
-            if path.exists():
-                path = out_dir / f"{path.stem}_{idx}{path.suffix or '.jpg'}"
+        if path.stem in taken or path.exists():
+            path = out_dir / f"{path.stem}_{idx}{path.suffix or '.jpg'}"
 
-            with path.open("wb") as f:
-                for chunk in resp.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            saved.append(str(path))
-        except Exception:
+        taken.add(path.stem)
+        paths.append(path)
+    return paths
+
+
+def _final_path(path: Path, info: images.ImageInfo) -> Path:
+    return path.with_suffix(images.extension(info.format, path.suffix))
+
+
+def _saved(url: str, path: str, sha: str, info: images.ImageInfo) -> SavedImage:
+    return SavedImage(url=url, path=path, sha256=sha, format=info.format, width=info.width, height=info.height)
+
+
+def _open_temp(path: Path) -> Tuple[BinaryIO, Path]:
+    # arquivo temporário no mesmo diretório: o rename final é atômico
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    return os.fdopen(fd, "wb"), Path(tmp)
+
+
+class ImagePool:
+    """
+    Thread pool shared by the image downloads of every page. Bounds the
+    total number of in-flight image requests and the number per host.
+    """
+
+    def __init__(self, workers: int = DEFAULT_IMAGE_WORKERS, per_host: int = DEFAULT_IMAGE_PER_HOST):
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="img")
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+_pool: Optional[ImagePool] = None
+_store: Optional[BlobStore] = None
+_filter: Optional[images.ImageFilter] = None
+# URLs já recusadas nesta execução: não são pedidas de novo por outras páginas
+_rejected: Dict[str, images.ImageRejected] = {}
+
+
+def configure(
+    workers: int = DEFAULT_IMAGE_WORKERS,
+    per_host: int = DEFAULT_IMAGE_PER_HOST,
+    store: Optional[BlobStore] = None,
+    image_filter: Optional[images.ImageFilter] = None,
+) -> None:
+    """
+    Set the image download limits and, optionally, the run-wide BlobStore
+    used to deduplicate images and the filter images must pass (call once
+    at startup).
+    """
+    global _pool, _async_limits, _store, _filter
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = ImagePool(workers=workers, per_host=per_host)
+    _async_limits = None
+    _store = store
+    _filter = image_filter
+    _rejected.clear()
+
+
+def _get_pool() -> ImagePool:
+    global _pool
+    if _pool is None:
+        _pool = ImagePool()
+    return _pool
+
+
+def _stream_to(url: str, f: Union[BinaryIO, BlobWriter]) -> images.ImageInfo:
+    with _get_pool().host_slot(host_of(url)):
+        # "with" devolve a conexão ao pool mesmo em caso de erro (e a fecha se a imagem for recusada no meio)
+        with download(url, rate_limit=False) as resp:  # SSL ok; sem retry: imagem que falha fica de fora
+            probe = images.ImageProbe(_filter, resp.headers)
+            try:
+                with metrics.stage("download"):
+                    for chunk in resp.iter_content(chunk_size=8192):
+                        if chunk:
+                            probe.feed(chunk)
+                            f.write(chunk)
+                    return probe.finish()
+            finally:
+                metrics.count("bytes", probe.size)
+
+
+def _fetch_to(url: str, path: Path) -> SavedImage:
+    store = _store
+    if store is not None:
+        fetched: List[images.ImageInfo] = []
+        sha = store.get_or_fetch(url, lambda w: fetched.append(_stream_to(url, w)))
+        # reaproveitada (desta ou de outra execução): formato lido do início do blob
+        info = fetched[0] if fetched else images.sniff(store.head(sha, images.PROBE_BYTES))
+        ref = store.link(sha, _final_path(path, info))
+        return _saved(url, ref, sha, info)
+
+    f, tmp = _open_temp(path)
+    try:
+        with f:
+            info = _stream_to(url, f)
+        path = _final_path(path, info)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return _saved(url, str(path), "", info)
+
+
+def _make_dir(out_dir: Path) -> None:
+    # no modo empacotado as imagens vão para os shards: nenhuma pasta por item
+    if _store is None or not _store.packed:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+
+class _Drops:
+    """Images of one page dropped by the filter, and the bytes that were not downloaded."""
+
+    def __init__(self):
+        self.count = 0
+        self.saved_bytes = 0
+
+    def add(self, url: str, e: images.ImageRejected) -> None:
+        _rejected[url] = e
+        self.count += 1
+        self.saved_bytes += e.saved_bytes
+
+    def report(self) -> None:
+        if _filter is not None:
+            metrics.count("images_dropped", self.count)
+            metrics.count("image_bytes_saved", self.saved_bytes)
+
+
+def _prefilter(image_urls: List[str], drops: _Drops) -> List[str]:
+    """URLs worth requesting: data: URIs, tracking pixels and URLs already refused are dropped here."""
+    if _filter is None:
+        return image_urls
+    kept = []
+    for url in image_urls:
+        known = _rejected.get(url)
+        if known is not None:
+            drops.add(url, known)
+            continue
+        reason = _filter.check_url(url)
+        if reason:
+            drops.add(url, images.ImageRejected(reason))
             continue
+        kept.append(url)
+    return kept
+
+
+def _thumbnail_targets(saved: List[SavedImage]) -> List[SavedImage]:
+    # no modo empacotado não há arquivo local para reduzir; SVG o Pillow não lê
+    if images.thumbnails() is None or (_store is not None and _store.packed):
+        return []
+    return [img for img in saved if img.format not in ("", "svg")]
+
+
+def download_images(image_urls: List[str], out_dir: Path) -> List[SavedImage]:
+    _make_dir(out_dir)
+    drops = _Drops()
+    image_urls = _prefilter(image_urls, drops)
+    paths = _plan_paths(image_urls, out_dir)
+
+    with metrics.stage("images"):
+        pool = _get_pool()
+        # nas threads do pool as medições vão para o job da página, como image_*
+        fetch_to = metrics.bind(_fetch_to, "image_")
+        futures = [pool.executor.submit(fetch_to, url, path) for url, path in zip(image_urls, paths)]
+
+        saved = []
+        for url, fut in zip(image_urls, futures):
+            try:
+                saved.append(fut.result())
+            except images.ImageRejected as e:
+                drops.add(url, e)
+            except Exception:
+                continue
+
+    targets = _thumbnail_targets(saved)
+    if targets:
+        # decodificar e reduzir roda no pool de processos, fora das threads de rede
+        with metrics.stage("thumbnails"):
+            thumbs = images.thumbnails().make([Path(img.path) for img in targets])
+        for img in targets:
+            img.thumbnail = thumbs.get(Path(img.path), "")
+
+    metrics.count("images", len(saved))
+    drops.report()
+    return saved
+
+
+class _AsyncImageLimits:
+    def __init__(self, workers: int, per_host: int):
+        self.per_host = per_host
+        self.slots = asyncio.Semaphore(workers)
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def host_slot(self, host: str) -> asyncio.Semaphore:
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+
+_async_limits: Optional[_AsyncImageLimits] = None
+
+
+def _get_async_limits() -> _AsyncImageLimits:
+    # criado dentro do event loop, com os mesmos limites do pool de threads
+    global _async_limits
+    if _async_limits is None:
+        pool = _get_pool()
+        _async_limits = _AsyncImageLimits(pool.workers, pool.per_host)
+    return _async_limits
+
+
+async def _stream_to_async(url: str, f: Union[BinaryIO, BlobWriter]) -> images.ImageInfo:
+    limits = _get_async_limits()
+    async with limits.host_slot(host_of(url)), limits.slots:
+        async with async_http_client.download(url, rate_limit=False) as resp:
+            probe = images.ImageProbe(_filter, resp.headers)
+            try:
+                with metrics.stage("download"):
+                    async for chunk in resp.content.iter_chunked(8192):
+                        probe.feed(chunk)
+                        f.write(chunk)
+                    return probe.finish()
+            finally:
+                metrics.count("bytes", probe.size)
+
+
+async def _fetch_to_async(url: str, path: Path) -> SavedImage:
+    metrics.enter_scope("image_")  # cada imagem roda na sua própria task
+    store = _store
+    if store is not None:
+        fetched: List[images.ImageInfo] = []
+
+        async def fetch(w: BlobWriter) -> None:
+            fetched.append(await _stream_to_async(url, w))
+
+        sha = await store.get_or_fetch_async(url, fetch)
+        info = fetched[0] if fetched else images.sniff(store.head(sha, images.PROBE_BYTES))
+        ref = store.link(sha, _final_path(path, info))
+        return _saved(url, ref, sha, info)
+
+    f, tmp = _open_temp(path)
+    try:
+        with f:
+            info = await _stream_to_async(url, f)
+        path = _final_path(path, info)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return _saved(url, str(path), "", info)
+
+
+async def download_images_async(image_urls: List[str], out_dir: Path) -> List[SavedImage]:
+    _make_dir(out_dir)
+    drops = _Drops()
+    image_urls = _prefilter(image_urls, drops)
+    paths = _plan_paths(image_urls, out_dir)
+
+    with metrics.stage("images"):
+        results = await asyncio.gather(
+            *(_fetch_to_async(url, path) for url, path in zip(image_urls, paths)),
+            return_exceptions=True,
+        )
+    saved = []
+    for url, res in zip(image_urls, results):
+        if isinstance(res, images.ImageRejected):
+            drops.add(url, res)
+        elif not isinstance(res, BaseException):
+            saved.append(res)
+
+    targets = _thumbnail_targets(saved)
+    if targets:
+        with metrics.stage("thumbnails"):
+            thumbs = await images.thumbnails().make_async([Path(img.path) for img in targets])
+        for img in targets:
+            img.thumbnail = thumbs.get(Path(img.path), "")
 
-    return saved
\ No newline at end of file
+    metrics.count("images", len(saved))
+    drops.report()
+    return saved
@@ -1,6 +1,181 @@
 import csv
+import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from scraper.io_utils import open_output
+
+DATA_CSV_HEADERS = [
+    "url", "title", "h1", "description", "canonical_url",
+    "og_title", "og_description", "og_image",
+    "images_found", "images_downloaded", "links_found",
+    "text_preview",
+]
+
+
+def flatten_payload(p: Dict[str, Any]) -> Dict[str, Any]:
+    """One data.csv row from a 'payload' dict like the ones written to data.json."""
+    og = p.get("og") or {}
+    counts = p.get("counts") or {}
+    return {
+        "url": p.get("url", ""),
+        "title": p.get("title", ""),
+        "h1": p.get("h1", ""),
+        "description": p.get("description", ""),
+        "canonical_url": p.get("canonical_url", ""),
+        "og_title": og.get("og:title", ""),
+        "og_description": og.get("og:description", ""),
+        "og_image": og.get("og:image", ""),
+        "images_found": counts.get("images_found", ""),
+        "images_downloaded": counts.get("images_downloaded", ""),
+        "links_found": counts.get("links_found", ""),
+        "text_preview": p.get("text_preview", ""),
+    }
+
+
+class DataCsvWriter:
+    """
+    Consolidated data.csv written incrementally: the header goes out when
+    the file is opened and every row is flushed as soon as it is written,
+    so memory does not grow with the number of URLs and a crash keeps
+    everything written so far. append=True (resume) keeps the rows of the
+    previous run and only writes the header to a new or empty file (one
+    with a different header is rotated to data-N.csv first).
+    """
+
+    def __init__(self, out_path: Path, append: bool = False):
+        self._f, new = open_output(out_path, append, newline="", header=DATA_CSV_HEADERS)
+        self._writer = csv.DictWriter(self._f, fieldnames=DATA_CSV_HEADERS)
+        if new:
+            self._writer.writeheader()
+        self._f.flush()
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        self._writer.writerow(flatten_payload(payload))
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "DataCsvWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class JsonlWriter:
+    """
+    data.jsonl: one payload per line, appended and flushed as results
+    arrive (append=True keeps the lines of a previous run).
+    """
+
+    def __init__(self, out_path: Path, append: bool = False):
+        self._f, _ = open_output(out_path, append)
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+DEFAULT_ROW_GROUP = 10_000  # linhas por row group do Parquet (= linhas em memória)
+PARQUET_COMPRESSION = "zstd"
+
+
+def parquet_schema():
+    """
+    Explicit Arrow schema of the data.parquet rows: the data.json payload
+    with its nested fields (og map, links, counts, image files) kept as is.
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        pa.field("url", pa.string(), nullable=False),
+        pa.field("domain", pa.string()),
+        pa.field("title", pa.string()),
+        pa.field("h1", pa.string()),
+        pa.field("description", pa.string()),
+        pa.field("canonical_url", pa.string()),
+        pa.field("og", pa.map_(pa.string(), pa.string())),
+        pa.field("text_preview", pa.string()),
+        pa.field("links", pa.list_(pa.string())),
+        pa.field("counts", pa.struct([
+            pa.field("images_found", pa.int32()),
+            pa.field("links_found", pa.int32()),
+            pa.field("images_downloaded", pa.int32()),
+        ])),
+        pa.field("images", pa.list_(pa.string())),
+        pa.field("image_files", pa.list_(pa.struct([
+            pa.field("url", pa.string()),
+            pa.field("path", pa.string()),
+            pa.field("sha256", pa.string()),
+            pa.field("format", pa.string()),
+            pa.field("width", pa.int32()),
+            pa.field("height", pa.int32()),
+            pa.field("thumbnail", pa.string()),
+        ]))),
+        pa.field("content_sha256", pa.string()),
+    ])
+
+
+class ParquetWriter:
+    """
+    data.parquet written as results arrive: payloads are buffered and
+    written as one row group every `row_group_size` rows, so memory is
+    bounded by a row group, not by the run. Parquet keeps its index in the
+    footer, so the file is only readable after close(); rows written
+    before a crash are lost (use jsonl when that matters).
+
+    Needs pyarrow (optional dependency).
+    """
+
+    def __init__(self, out_path: Path, row_group_size: int = DEFAULT_ROW_GROUP, compression: str = PARQUET_COMPRESSION):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("--format parquet needs pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self.schema = parquet_schema()
+        self.row_group_size = max(1, row_group_size)
+        self._rows: List[Dict[str, Any]] = []
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer: Optional[Any] = pq.ParquetWriter(str(out_path), self.schema, compression=compression)
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        row = {name: payload.get(name) for name in self.schema.names}
+        # map do Arrow a partir de pares (dict só é aceito em versões recentes)
+        row["og"] = list((payload.get("og") or {}).items())
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            batch = self._pa.RecordBatch.from_pylist(self._rows, schema=self.schema)
+            self._writer.write_batch(batch, row_group_size=self.row_group_size)
+            self._rows = []
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
 
 def export_data_csv(out_path: Path, rows: List[Dict[str, Any]]) -> None:
@@ -8,51 +183,6 @@ def export_data_csv(out_path: Path, rows: List[Dict[str, Any]]) -> None:
     Export a consolidated CSV with one row per scraped URL.
     This expects 'payload' dicts like the ones you already write to data.json.
     """
-    if not rows:
-        # still create an empty file with headers for predictability
-        headers = [
-            "url", "title", "h1", "description", "canonical_url",
-            "og_title", "og_description", "og_image",
-            "images_found", "images_downloaded", "links_found",
-            "text_preview",
-        ]
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        with out_path.open("w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-        return
-
-    def safe_get(d: Dict[str, Any], path: List[str], default: Any = "") -> Any:
-        cur: Any = d
-        for p in path:
-            if not isinstance(cur, dict) or p not in cur:
-                return default
-            cur = cur[p]
-        return cur
-
-    flat_rows: List[Dict[str, Any]] = []
-    for p in rows:
-        og = p.get("og") or {}
-        counts = p.get("counts") or {}
-
-        flat_rows.append({
-            "url": p.get("url", ""),
-            "title": p.get("title", ""),
-            "h1": p.get("h1", ""),
-            "description": p.get("description", ""),
-            "canonical_url": p.get("canonical_url", ""),
-            "og_title": og.get("og:title", ""),
-            "og_description": og.get("og:description", ""),
-            "og_image": og.get("og:image", ""),
-            "images_found": counts.get("images_found", ""),
-            "images_downloaded": counts.get("images_downloaded", ""),
-            "links_found": counts.get("links_found", ""),
-            "text_preview": p.get("text_preview", ""),
-        })
-
-    headers = list(flat_rows[0].keys())
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(flat_rows)
\ No newline at end of file
+    with DataCsvWriter(out_path) as writer:
+        for p in rows:
+            writer.write(p)
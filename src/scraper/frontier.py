@@ -0,0 +1,243 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+from scraper.scheduler import IDLE, host_of
+from scraper.shards import Shard
+from scraper.urls import canonical_url, host_in_domain
+
+COMMIT_EVERY = 256
+COMMIT_INTERVAL_S = 1.0
+
+QUEUED, IN_FLIGHT, DONE, ERROR = 0, 1, 2, 3
+
+SCOPES = ("domain", "host", "any")
+ORDERS = ("bfs", "priority")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    url_key  TEXT NOT NULL UNIQUE,
+    url      TEXT NOT NULL,
+    depth    INTEGER NOT NULL,
+    priority REAL NOT NULL,
+    root     TEXT NOT NULL,
+    state    INTEGER NOT NULL,
+    done_at  REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS frontier_next ON frontier (state, priority, id);
+CREATE TABLE IF NOT EXISTS hosts (
+    host  TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class CrawlConfig:
+    max_depth: int = 2
+    scope: str = "domain"        # "domain" | "host" | "any"
+    allow: Sequence[str] = ()    # domínios permitidos além do escopo
+    max_pages_per_host: int = 0  # 0 = sem limite
+    order: str = "bfs"           # "bfs" | "priority"
+    shard: Optional[Shard] = None  # execução particionada: só hosts deste shard
+
+
+def _root_of(url: str) -> str:
+    host = host_of(url)
+    return host[4:] if host.startswith("www.") else host
+
+
+def link_priority(url: str, depth: int, order: str) -> float:
+    """
+    Lower runs first. bfs: by depth only (ties in discovery order).
+    priority: within a depth, pages closer to the site root first and
+    pages with a query string last.
+    """
+    if order == "bfs":
+        return float(depth)
+    parts = urlsplit(url)
+    segments = len([s for s in parts.path.split("/") if s])
+    return depth + min(segments, 9) / 10 + (0.05 if parts.query else 0.0)
+
+
+class Frontier:
+    """
+    Disk-backed crawl frontier (SQLite): every discovered URL, keyed by its
+    canonical form, with depth, priority, the seed domain it descends from
+    and its state (queued / in flight / done / failed) with when it
+    finished, plus the page count per host for the per-host budget.
+
+    The database is the checkpoint: writes are committed every
+    COMMIT_EVERY changes or COMMIT_INTERVAL_S seconds, and reopening it with
+    resume=True continues where the previous run stopped (pages that were
+    in flight are queued again). On resume, retry_errors also queues again
+    the pages whose fetch failed, and recrawl_after_s the pages finished
+    more than that many seconds ago; the rest of the frontier is continued
+    as usual.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        config: CrawlConfig,
+        resume: bool = False,
+        retry_errors: bool = False,
+        recrawl_after_s: Optional[float] = None,
+    ):
+        self.path = path
+        self.config = config
+        self.stats = {"queued": 0, "out_of_scope": 0, "over_budget": 0, "too_deep": 0, "other_shard": 0}
+        self.in_flight = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            path.unlink(missing_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(frontier)")}
+        if "done_at" not in columns:
+            # fronteira de uma versão anterior: páginas feitas contam como antigas
+            self._db.execute("ALTER TABLE frontier ADD COLUMN done_at REAL NOT NULL DEFAULT 0")
+        self._db.execute("UPDATE frontier SET state = ? WHERE state = ?", (QUEUED, IN_FLIGHT))
+        if retry_errors:
+            self._db.execute("UPDATE frontier SET state = ? WHERE state = ?", (QUEUED, ERROR))
+        if recrawl_after_s is not None:
+            self._db.execute("UPDATE frontier SET state = ? WHERE state = ? AND done_at < ?",
+                             (QUEUED, DONE, time.time() - recrawl_after_s))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    # ---- escrita ----
+
+    def _write(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        if self._pending == 0:
+            self._db.execute("BEGIN")
+        cur = self._db.execute(sql, params)
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_INTERVAL_S:
+            self._commit()
+        return cur
+
+    def _commit(self) -> None:
+        if self._pending:
+            self._db.execute("COMMIT")
+            self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def _insert(self, url: str, depth: int, root: str, state: int = QUEUED) -> bool:
+        cur = self._write(
+            "INSERT OR IGNORE INTO frontier (url_key, url, depth, priority, root, state) VALUES (?, ?, ?, ?, ?, ?)",
+            (canonical_url(url), url, depth, link_priority(url, depth, self.config.order), root, state),
+        )
+        if cur.rowcount and state == QUEUED:
+            self._write(
+                "INSERT INTO hosts (host, pages) VALUES (?, 1) ON CONFLICT(host) DO UPDATE SET pages = pages + 1",
+                (host_of(url),),
+            )
+            self.stats["queued"] += 1
+        return bool(cur.rowcount)
+
+    def add_seeds(self, urls: Iterable[str]) -> None:
+        """Seeds go in at depth 0 (already known URLs are ignored) and are not subject to scope or budget."""
+        with self._lock:
+            for url in urls:
+                self._insert(url, 0, _root_of(url))
+            self._commit()
+
+    def _in_scope(self, url: str, root: str) -> bool:
+        host = host_of(url)
+        if any(host_in_domain(host, d) for d in self.config.allow):
+            return True
+        if self.config.scope == "host":
+            return host == root or host == "www." + root
+        if self.config.scope == "domain":
+            return host_in_domain(host, root)
+        return True
+
+    def _host_pages(self, host: str) -> int:
+        row = self._db.execute("SELECT pages FROM hosts WHERE host = ?", (host,)).fetchone()
+        return row[0] if row else 0
+
+    def complete(self, url: str, links: Iterable[str] = (), canonical: str = "", ok: bool = True) -> None:
+        """
+        Mark a page done and enqueue its links (depth + 1) that are in scope,
+        within the depth limit and within their host's budget. A declared
+        canonical URL is marked done as an alias of this page. ok=False
+        marks the page failed instead (queued again by retry_errors).
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            key = canonical_url(url)
+            now = time.time()
+            row = self._db.execute("SELECT depth, root FROM frontier WHERE url_key = ?", (key,)).fetchone()
+            self._write("UPDATE frontier SET state = ?, done_at = ? WHERE url_key = ?", (DONE if ok else ERROR, now, key))
+            if row is None or not ok:
+                return
+            depth, root = row
+
+            if canonical and canonical_url(canonical) != key:
+                self._insert(canonical, depth, root, state=DONE)
+                self._write("UPDATE frontier SET state = ?, done_at = ? WHERE url_key = ? AND state != ?",
+                            (DONE, now, canonical_url(canonical), IN_FLIGHT))
+
+            child_depth = depth + 1
+            for link in links:
+                if urlsplit(link).scheme not in ("http", "https"):
+                    continue
+                if child_depth > self.config.max_depth:
+                    self.stats["too_deep"] += 1
+                    continue
+                if not self._in_scope(link, root):
+                    self.stats["out_of_scope"] += 1
+                    continue
+                # hosts de outro shard são de outro nó (sem coordenador para repassar o link)
+                if self.config.shard is not None and not self.config.shard.owns(link):
+                    self.stats["other_shard"] += 1
+                    continue
+                budget = self.config.max_pages_per_host
+                if budget and self._host_pages(host_of(link)) >= budget:
+                    self.stats["over_budget"] += 1
+                    continue
+                self._insert(link, child_depth, root)
+
+    # ---- leitura ----
+
+    def _pop(self) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT id, url FROM frontier WHERE state = ? ORDER BY priority, id LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._write("UPDATE frontier SET state = ? WHERE id = ?", (IN_FLIGHT, row[0]))
+        self.in_flight += 1
+        return row[1]
+
+    def urls(self) -> Iterator[Union[str, object]]:
+        """
+        Next URLs in priority order. Yields scheduler.IDLE while the queue is
+        empty but pages are still in flight (their links may refill it), and
+        stops once both are empty.
+        """
+        while True:
+            with self._lock:
+                url = self._pop()
+                in_flight = self.in_flight
+            if url is not None:
+                yield url
+            elif in_flight:
+                yield IDLE
+            else:
+                return
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._db.close()
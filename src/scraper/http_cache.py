@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+# cabeçalhos que não valem para o corpo já decodificado guardado em disco
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+# cabeçalhos que um 304 pode atualizar
+_REFRESH_HEADERS = ("cache-control", "expires", "etag", "last-modified", "date", "age")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    headers: Dict[str, str]
+    stored_at: float
+    body_path: Path
+
+
+def _parse_cache_control(value: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            out[name.lower()] = arg.strip().strip('"')
+    return out
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache for GET responses, keyed by URL.
+
+    Each entry is <root>/<key[:2]>/<key>.json (url, headers, stored_at) plus
+    <key>.body with the decoded response body. Fresh entries (Cache-Control
+    max-age / Expires) are served without a request; stale ones are
+    revalidated with If-None-Match / If-Modified-Since. The total body size
+    is bounded and the least recently used entries are evicted first
+    (file mtime is the LRU clock, so the order survives restarts).
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats = {"hit": 0, "miss": 0, "revalidated": 0}
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        found = []
+        for meta in self.root.glob("*/*.json"):
+            body = meta.with_suffix(".body")
+            try:
+                found.append((meta.stat().st_mtime, meta.stem, body.stat().st_size))
+            except OSError:
+                continue
+        for _, key, size in sorted(found):
+            self._lru[key] = size
+            self._total += size
+
+    def _paths(self, key: str):
+        base = self.root / key[:2] / key
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    # ---- leitura ----
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        key = self.key_for(url)
+        with self._lock:
+            if key not in self._lru:
+                return None
+            self._lru.move_to_end(key)
+        meta_path, body_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        if not body_path.exists():
+            return None
+        return CacheEntry(key=key, url=meta["url"], headers=meta["headers"],
+                          stored_at=meta["stored_at"], body_path=body_path)
+
+    def is_fresh(self, entry: CacheEntry, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        headers = CaseInsensitiveDict(entry.headers)
+        cc = _parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-cache" in cc or "no-store" in cc:
+            return False
+
+        lifetime: Optional[float] = None
+        if "max-age" in cc:
+            try:
+                lifetime = float(cc["max-age"])
+            except ValueError:
+                lifetime = None
+        elif headers.get("Expires"):
+            try:
+                expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+                date = parsedate_to_datetime(headers["Date"]).timestamp() if headers.get("Date") else entry.stored_at
+                lifetime = expires - date
+            except (TypeError, ValueError):
+                lifetime = 0.0  # Expires inválido conta como já expirado
+        if lifetime is None:
+            return False
+
+        try:
+            age = float(headers.get("Age", 0))
+        except ValueError:
+            age = 0.0
+        return (now - entry.stored_at) + age < lifetime
+
+    @staticmethod
+    def validators(entry: CacheEntry) -> Dict[str, str]:
+        headers = CaseInsensitiveDict(entry.headers)
+        out = {}
+        if headers.get("ETag"):
+            out["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            out["If-Modified-Since"] = headers["Last-Modified"]
+        return out
+
+    def response(self, entry: CacheEntry, stream: bool = False) -> requests.Response:
+        """Build a 200 requests.Response from a cache entry."""
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.reason = "OK"
+        resp.url = entry.url
+        resp.headers = CaseInsensitiveDict(entry.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        if stream:
+            resp.raw = entry.body_path.open("rb")
+        else:
+            resp._content = entry.body_path.read_bytes()
+        return resp
+
+    # ---- escrita ----
+
+    @staticmethod
+    def storable(headers: Mapping[str, str]) -> bool:
+        """Worth storing: not no-store, and either revalidatable or with a freshness lifetime."""
+        headers = CaseInsensitiveDict(headers)
+        cc = _parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in cc:
+            return False
+        return bool(
+            headers.get("ETag") or headers.get("Last-Modified")
+            or "max-age" in cc or headers.get("Expires")
+        )
+
+    def _write_meta(self, key: str, url: str, headers: Mapping[str, str], stored_at: float) -> None:
+        meta_path, _ = self._paths(key)
+        data = {
+            "url": url,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+            "stored_at": stored_at,
+        }
+        fd, tmp = tempfile.mkstemp(dir=meta_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, meta_path)
+
+    def body_writer(self, url: str) -> "CacheBodyWriter":
+        key = self.key_for(url)
+        _, body_path = self._paths(key)
+        body_path.parent.mkdir(exist_ok=True)
+        return CacheBodyWriter(self, key, url, body_path)
+
+    def store(self, url: str, headers: Mapping[str, str], body: bytes) -> None:
+        writer = self.body_writer(url)
+        writer.write(body)
+        writer.commit(headers)
+
+    def _commit(self, key: str, url: str, headers: Mapping[str, str], tmp: Path, body_path: Path, size: int) -> None:
+        os.replace(tmp, body_path)
+        self._write_meta(key, url, headers, time.time())
+        with self._lock:
+            self._total += size - self._lru.pop(key, 0)
+            self._lru[key] = size
+            evict = []
+            while self._total > self.max_bytes and len(self._lru) > 1:
+                old_key, old_size = self._lru.popitem(last=False)
+                self._total -= old_size
+                evict.append(old_key)
+        for old_key in evict:
+            for path in self._paths(old_key):
+                path.unlink(missing_ok=True)
+
+    def refresh(self, entry: CacheEntry, headers: Mapping[str, str]) -> None:
+        """Apply the headers of a 304 to the stored entry and restart its freshness clock."""
+        merged = CaseInsensitiveDict(entry.headers)
+        for name in _REFRESH_HEADERS:
+            if name in headers:
+                merged[name] = headers[name]
+        entry.headers = dict(merged)
+        self._write_meta(entry.key, entry.url, merged, time.time())
+
+
+class CacheBodyWriter:
+    """Temp file next to the cache body; commit() makes it the new entry."""
+
+    def __init__(self, cache: HttpCache, key: str, url: str, body_path: Path):
+        self.cache = cache
+        self.key = key
+        self.url = url
+        self.body_path = body_path
+        fd, tmp = tempfile.mkstemp(dir=body_path.parent, suffix=".part")
+        self.tmp = Path(tmp)
+        self._f = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._f.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, headers: Mapping[str, str]) -> None:
+        self._f.close()
+        self.cache._commit(self.key, self.url, headers, self.tmp, self.body_path, self.size)
+
+    def discard(self) -> None:
+        self._f.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+class TeeRaw:
+    """
+    File-like wrapper for a streamed response's `raw`: everything read
+    through it is also written to the cache, and the entry is committed
+    once the body has been read to the end.
+    """
+
+    def __init__(self, raw, writer: CacheBodyWriter, headers: Mapping[str, str]):
+        self._raw = raw
+        self._writer: Optional[CacheBodyWriter] = writer
+        self._headers = dict(headers)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        try:
+            chunk = self._raw.read(amt, decode_content=True)
+        except BaseException:
+            self._discard()
+            raise
+        if self._writer is not None:
+            if chunk:
+                self._writer.write(chunk)
+            else:
+                self._writer.commit(self._headers)
+                self._writer = None
+        return chunk
+
+    def _discard(self) -> None:
+        if self._writer is not None:
+            self._writer.discard()
+            self._writer = None
+
+    def close(self) -> None:
+        self._discard()  # corpo incompleto não vai para o cache
+        self._raw.close()
+
+    def release_conn(self) -> None:
+        release = getattr(self._raw, "release_conn", None)
+        if release is not None:
+            release()
@@ -1,46 +1,240 @@
+import socket
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import TYPE_CHECKING, Optional
+
 import requests
 import certifi
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+
+from scraper import dns_cache, metrics
+from scraper.http_cache import HttpCache, TeeRaw
+from scraper.rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    from scraper.retries import CircuitBreaker  # retries importa este módulo
 
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; WebScraperDownloader/1.0)"
 }
 
+DEFAULT_POOL_SIZE = 10      # conexões keep-alive por host
+DEFAULT_POOL_HOSTS = 256    # pools de host mantidos (LRU)
+
 RETRYABLE_EXCEPTIONS = (
     requests.Timeout,
     requests.ConnectionError,
     requests.exceptions.ChunkedEncodingError,
 )
 
-@retry(
-    reraise=True,
-    stop=stop_after_attempt(3),                 # 3 tentativas
-    wait=wait_exponential(multiplier=1, min=1, max=8),  # backoff: 1s, 2s, 4s... até 8s
-    retry=retry_if_exception_type(RETRYABLE_EXCEPTIONS),
-)
-def get(url: str, timeout_s: int = 20) -> requests.Response:
-    resp = requests.get(
-        url,
-        headers=DEFAULT_HEADERS,
-        timeout=timeout_s,
-        verify=certifi.where(),  # corrige seu SSL no Windows
-    )
-    resp.raise_for_status()
+
+def _accept_encoding() -> str:
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+class _CachedDnsMixin:
+    """
+    Opens the socket to the addresses in the run's DnsCache (trying each
+    in turn) instead of resolving the host again on every new connection.
+    TLS (SNI, certificate) and the Host header still use the host name.
+    """
+
+    def _new_conn(self):
+        cache = dns_cache.cache()
+        host = self._dns_host
+        if cache is None or dns_cache.is_ip(host):
+            return super()._new_conn()
+        try:
+            addresses = cache.addresses(host)
+        except dns_cache.HostUnresolvable as e:
+            raise NameResolutionError(host, self, socket.gaierror(e.reason)) from e
+        try:
+            for i, (_, ip) in enumerate(addresses):
+                self._dns_host = ip
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+
+class _TimedHTTPConnection(_CachedDnsMixin, HTTPConnection):
+    def connect(self) -> None:
+        with metrics.stage("connect"):  # TCP (DNS vem do DnsCache, medido antes do rate limiter)
+            super().connect()
+
+
+class _TimedHTTPSConnection(_CachedDnsMixin, HTTPSConnection):
+    def connect(self) -> None:
+        with metrics.stage("connect"):  # TCP + TLS
+            super().connect()
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class HttpClient:
+    """
+    Shared HTTP client with one keep-alive connection pool per host.
+
+    requests.Session is not thread-safe, so each thread gets its own
+    Session, but all of them are mounted on the same HTTPAdapter and
+    therefore share the underlying urllib3 pools (which are thread-safe).
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, pool_hosts: int = DEFAULT_POOL_HOSTS):
+        self.pool_size = pool_size
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        # conexões novas entram nas métricas do job (conexões reaproveitadas custam 0)
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            session.headers["Accept-Encoding"] = _accept_encoding()
+            session.verify = certifi.where()  # corrige seu SSL no Windows
+            # sem cookies entre URLs, como no requests.get avulso
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self._local.session = session
+        return session
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+_client = HttpClient()
+_cache: Optional[HttpCache] = None
+_limiter: Optional[RateLimiter] = None
+_breaker: Optional["CircuitBreaker"] = None
+
+
+def configure(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    pool_hosts: int = DEFAULT_POOL_HOSTS,
+    cache: Optional[HttpCache] = None,
+    limiter: Optional[RateLimiter] = None,
+    breaker: Optional["CircuitBreaker"] = None,
+) -> HttpClient:
+    """Replace the shared client (call once at startup, before any request)."""
+    global _client, _cache, _limiter, _breaker
+    _client.close()
+    _client = HttpClient(pool_size=pool_size, pool_hosts=pool_hosts)
+    _cache = cache
+    _limiter = limiter
+    _breaker = breaker
+    return _client
+
+
+def client() -> HttpClient:
+    return _client
+
+
+def cache() -> Optional[HttpCache]:
+    return _cache
+
+
+def _observe(
+    url: str,
+    status: Optional[int],
+    latency_s: Optional[float] = None,
+    retry_after: Optional[str] = None,
+    timed_out: bool = False,
+) -> None:
+    """
+    Feed a response (status None = no response) to the rate limiter and
+    the breaker. Only timeouts slow the host down; a refused connection
+    is the breaker's business.
+    """
+    if _limiter is not None and (status is not None or timed_out):
+        _limiter.feedback(url, status, latency_s, retry_after)
+    if _breaker is not None:
+        _breaker.record_status(url, status, retry_after)
+
+
+def _fetch(url: str, timeout_s: int, stream: bool, rate_limit: bool) -> requests.Response:
+    entry = _cache.lookup(url) if _cache is not None else None
+    if entry is not None and _cache.is_fresh(entry):
+        _cache.count("hit")
+        return _cache.response(entry, stream=stream)
+
+    headers = HttpCache.validators(entry) if entry is not None else None
+    dns = dns_cache.cache()
+    if dns is not None:
+        with metrics.stage("dns"):
+            dns.check(url)  # host que não resolve: HostUnresolvable sem gastar token
+    probe = _breaker.check(url) if _breaker is not None else 0  # host fora do ar: HostUnavailable sem gastar token
+    try:
+        if _limiter is not None:
+            # rate_limit=False (imagens): não gasta token, mas respeita Retry-After
+            _limiter.acquire(url, consume=rate_limit)
+        start = time.perf_counter()
+        try:
+            resp = _client.session.get(url, timeout=timeout_s, stream=stream, headers=headers)
+        except RETRYABLE_EXCEPTIONS as e:
+            _observe(url, None, timed_out=isinstance(e, requests.Timeout))
+            raise
+        ttfb = resp.elapsed.total_seconds()
+        metrics.add("ttfb", ttfb, start)
+        if not stream:
+            # sem stream o corpo já foi lido dentro do get(); com stream quem lê mede
+            metrics.add("download", max(0.0, time.perf_counter() - start - ttfb), start + ttfb)
+        _observe(url, resp.status_code, resp.elapsed.total_seconds(), resp.headers.get("Retry-After"))
+    finally:
+        # erro que não diz nada do host (redirects demais, URL inválida...): o teste não fica preso
+        if probe:
+            _breaker.release(url, probe)
+
+    if entry is not None and resp.status_code == 304:
+        resp.close()
+        _cache.refresh(entry, resp.headers)
+        _cache.count("revalidated")
+        return _cache.response(entry, stream=stream)
+
+    try:
+        resp.raise_for_status()
+    except Exception:
+        resp.close()
+        raise
+
+    if _cache is not None:
+        _cache.count("miss")
+        if HttpCache.storable(resp.headers):
+            if stream:
+                resp.raw = TeeRaw(resp.raw, _cache.body_writer(url), resp.headers)
+            else:
+                _cache.store(url, resp.headers, resp.content)
     return resp
 
-@retry(
-    reraise=True,
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=8),
-    retry=retry_if_exception_type(RETRYABLE_EXCEPTIONS),
-)
-def download(url: str, timeout_s: int = 25) -> requests.Response:
-    resp = requests.get(
-        url,
-        headers=DEFAULT_HEADERS,
-        timeout=timeout_s,
-        verify=certifi.where(),
-        stream=True,
-    )
-    resp.raise_for_status()
-    return resp
\ No newline at end of file
+
+# uma tentativa só: quem decide se e quando tentar de novo é retries.RetryQueue,
+# sem prender o worker dormindo
+def get(url: str, timeout_s: int = 20, rate_limit: bool = True) -> requests.Response:
+    return _fetch(url, timeout_s, stream=False, rate_limit=rate_limit)
+
+
+def download(url: str, timeout_s: int = 25, rate_limit: bool = True) -> requests.Response:
+    return _fetch(url, timeout_s, stream=True, rate_limit=rate_limit)
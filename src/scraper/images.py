@@ -0,0 +1,284 @@
+import asyncio
+import multiprocessing
+import re
+import struct
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+PROBE_BYTES = 64 * 1024  # teto da leitura antes de decidir: cobre o cabeçalho de quase todo JPEG
+
+DEFAULT_TYPES = ("jpeg", "png", "gif", "webp", "avif")
+ALL_TYPES = DEFAULT_TYPES + ("bmp", "svg")
+DEFAULT_MIN_PX = 32
+DEFAULT_MAX_MB = 10.0
+
+# extensões aceitas por formato; a primeira é a usada quando a da URL não bate
+EXTENSIONS = {
+    "jpeg": (".jpg", ".jpeg", ".jpe"), "png": (".png",), "gif": (".gif",), "webp": (".webp",),
+    "avif": (".avif",), "bmp": (".bmp",), "svg": (".svg",),
+}
+
+# só formas inequívocas de pixel/espaçador, decididas sem baixar nada: o nome do arquivo
+# inteiro (não uma palavra dentro dele, como em pixel-art.jpg) ou 1x1 pedido na query.
+# O resto fica com as dimensões lidas do cabeçalho (min_px)
+_PIXEL_NAME = re.compile(r"^((spacer|pixel|blank|clear|transparent|trans|1x1)\.gif|1x1\.png)$", re.IGNORECASE)
+_PIXEL_QUERY = re.compile(r"(^|&)(width|w)=1&(height|h)=1(&|$)", re.IGNORECASE)
+
+
+class ImageRejected(Exception):
+    """An image dropped by the filter; saved_bytes = what was not downloaded (when known)."""
+
+    def __init__(self, reason: str, saved_bytes: int = 0):
+        super().__init__(f"image dropped: {reason}")
+        self.reason = reason
+        self.saved_bytes = saved_bytes
+
+
+@dataclass
+class ImageInfo:
+    format: str = ""   # "" = não reconhecido
+    width: int = 0     # 0 = desconhecido
+    height: int = 0
+    size: int = 0
+
+
+def _jpeg_size(head: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 9 < len(head):
+        if head[i] != 0xFF:
+            return None
+        marker = head[i + 1]
+        if marker == 0xFF:  # preenchimento
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack(">H", head[i + 2:i + 4])[0]
+        # SOF0..SOF15, exceto DHT (C4), JPG (C8) e DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack(">HH", head[i + 5:i + 9])
+            return w, h
+        i += 2 + length
+    return None
+
+
+def sniff(head: bytes) -> ImageInfo:
+    """Real format (and dimensions, when the header has them) from the first bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        w, h = _jpeg_size(head) or (0, 0)
+        return ImageInfo("jpeg", w, h)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        w, h = struct.unpack(">II", head[16:24])
+        return ImageInfo("png", w, h)
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        w, h = struct.unpack("<HH", head[6:10])
+        return ImageInfo("gif", w, h)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        chunk = head[12:16]
+        if chunk == b"VP8 " and len(head) >= 30:
+            w, h = struct.unpack("<HH", head[26:30])
+            return ImageInfo("webp", w & 0x3FFF, h & 0x3FFF)
+        if chunk == b"VP8L" and len(head) >= 25:
+            bits = int.from_bytes(head[21:25], "little")
+            return ImageInfo("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        if chunk == b"VP8X" and len(head) >= 30:
+            return ImageInfo("webp", int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1)
+        return ImageInfo("webp")
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return ImageInfo("avif")
+    if head[:2] == b"BM" and len(head) >= 26:
+        w, h = struct.unpack("<ii", head[18:26])
+        return ImageInfo("bmp", abs(w), abs(h))
+    text = head[:1024].lstrip().lower()
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return ImageInfo("svg")
+    return ImageInfo()
+
+
+class ImageFilter:
+    """
+    What an image must look like to be kept: URL checks before any request
+    (data: URIs, tracking pixels), then Content-Type / Content-Length from
+    the response headers and the sniffed format and dimensions from the
+    first bytes, before the rest of the body is read.
+    """
+
+    def __init__(
+        self,
+        types: Iterable[str] = DEFAULT_TYPES,
+        min_px: int = DEFAULT_MIN_PX,
+        max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+    ):
+        self.types: FrozenSet[str] = frozenset(types)
+        self.min_px = max(0, min_px)
+        self.max_bytes = max(0, max_bytes)  # 0 = sem limite
+
+    def check_url(self, url: str) -> Optional[str]:
+        """Reason to drop the URL without requesting it, or None."""
+        parsed = urlparse(url)
+        if parsed.scheme == "data":
+            return "data-uri"
+        if parsed.scheme not in ("http", "https"):
+            return "scheme"
+        if _PIXEL_NAME.match(Path(parsed.path).name) or _PIXEL_QUERY.search(parsed.query):
+            return "pixel"
+        ext = Path(parsed.path).suffix.lower()
+        if ext == ".svg" and "svg" not in self.types:
+            return "type"
+        return None
+
+    def check_headers(self, headers: Mapping[str, str]) -> None:
+        length = _content_length(headers)
+        if self.max_bytes and length is not None and length > self.max_bytes:
+            raise ImageRejected("too-large", length)
+        ctype = (headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        # só recusa tipos claramente não-imagem: muito servidor manda octet-stream
+        if ctype.startswith(("text/html", "application/json", "text/plain")):
+            raise ImageRejected("type", length or 0)
+
+    def check_head(self, info: ImageInfo, length: Optional[int], read: int) -> None:
+        saved = max(0, length - read) if length is not None else 0
+        if info.format not in self.types:
+            raise ImageRejected("type", saved)
+        if self.min_px and info.width and info.height and (info.width < self.min_px or info.height < self.min_px):
+            raise ImageRejected("too-small", saved)
+
+
+def _content_length(headers: Mapping[str, str]) -> Optional[int]:
+    try:
+        return int(headers.get("Content-Length") or "")
+    except ValueError:
+        return None
+
+
+class ImageProbe:
+    """
+    Watches one image body as it streams: header checks first, the format
+    decision as soon as the bytes so far give the format and dimensions
+    (at most PROBE_BYTES, or the whole body if shorter), and the size cap
+    on every chunk. feed() raises ImageRejected to stop reading.
+    """
+
+    def __init__(self, image_filter: Optional[ImageFilter], headers: Mapping[str, str]):
+        self.filter = image_filter
+        self.length = _content_length(headers)
+        self.info: Optional[ImageInfo] = None
+        self.size = 0
+        self._head = bytearray()
+        if image_filter is not None:
+            image_filter.check_headers(headers)
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.info is None:
+            self._head += chunk
+            info = sniff(bytes(self._head))
+            # AVIF/SVG não trazem dimensões no começo: decide só pelo formato
+            if (info.format and info.width) or info.format in ("avif", "svg") or len(self._head) >= PROBE_BYTES:
+                self._decide(info)
+        if self.filter is not None and self.filter.max_bytes and self.size > self.filter.max_bytes:
+            raise ImageRejected("too-large", max(0, (self.length or 0) - self.size))
+
+    def _decide(self, info: ImageInfo) -> None:
+        self.info = info
+        self._head = bytearray()
+        if self.filter is not None:
+            self.filter.check_head(self.info, self.length, self.size)
+
+    def finish(self) -> ImageInfo:
+        if self.info is None:
+            self._decide(sniff(bytes(self._head)))
+        self.info.size = self.size
+        return self.info
+
+
+def extension(fmt: str, suffix: str) -> str:
+    """File extension for the sniffed format, keeping `suffix` when it already matches."""
+    choices = EXTENSIONS.get(fmt)
+    if not choices or suffix.lower() in choices:
+        return suffix
+    return choices[0]
+
+
+def _thumbnail(src: str, dest: str, size: int, fmt: str) -> str:
+    from PIL import Image  # só nos workers
+
+    with Image.open(src) as img:
+        img.thumbnail((size, size))
+        if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        img.save(dest, format=fmt.upper())
+    return dest
+
+
+class ThumbnailPool:
+    """
+    Process pool that writes a thumbnail (re-encoded as `fmt`) of every
+    kept image, so the decoding and resizing stay off the network threads
+    and the GIL. Needs Pillow.
+    """
+
+    def __init__(self, processes: int, size: int, fmt: str = "jpeg"):
+        try:
+            import PIL  # noqa: F401
+        except ImportError as e:
+            raise ImportError("thumbnails need Pillow (pip install Pillow)") from e
+        self.size = size
+        self.fmt = fmt
+        self.ext = ".jpg" if fmt == "jpeg" else f".{fmt}"
+        # spawn: os workers não herdam as threads do processo principal
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, processes),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def dest(self, image: Path) -> Path:
+        return image.parent / "thumbs" / (image.stem + self.ext)
+
+    def submit(self, image: Path) -> Future:
+        return self._executor.submit(_thumbnail, str(image), str(self.dest(image)), self.size, self.fmt)
+
+    def make(self, images: List[Path]) -> Dict[Path, str]:
+        """Thumbnail paths by image ("" when the image could not be decoded, e.g. SVG)."""
+        futures = [(img, self.submit(img)) for img in images]
+        out = {}
+        for img, fut in futures:
+            try:
+                out[img] = fut.result()
+            except Exception:
+                out[img] = ""
+        return out
+
+    async def make_async(self, images: List[Path]) -> Dict[Path, str]:
+        futures = [(img, asyncio.wrap_future(self.submit(img))) for img in images]
+        out = {}
+        for img, fut in futures:
+            try:
+                out[img] = await fut
+            except Exception:
+                out[img] = ""
+        return out
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_thumbs: Optional[ThumbnailPool] = None
+
+
+def configure_thumbnails(size: int = 0, fmt: str = "jpeg", processes: int = 1) -> Optional[ThumbnailPool]:
+    """Start the thumbnail pool (size 0 disables thumbnails)."""
+    global _thumbs
+    if _thumbs is not None:
+        _thumbs.shutdown()
+    _thumbs = ThumbnailPool(processes, size, fmt) if size > 0 else None
+    return _thumbs
+
+
+def thumbnails() -> Optional[ThumbnailPool]:
+    return _thumbs
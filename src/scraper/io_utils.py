@@ -1,22 +1,73 @@
 import csv
 from pathlib import Path
-from typing import List, Dict
-
-def read_csv_urls(csv_path: Path) -> List[str]:
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        if "url" not in reader.fieldnames:
-            raise ValueError("CSV file must contain a 'url' column.")
-        urls = []
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+def read_csv_urls(csv_path: Path) -> Iterator[str]:
+    """
+    Yield the non-empty 'url' values one at a time (the file is never loaded
+    whole). The header is checked right away, not on the first next(), so a
+    file without a 'url' column fails before any output is opened.
+    """
+    f = csv_path.open("r", encoding="utf-8", newline="")
+    reader = csv.DictReader(f)
+    if "url" not in (reader.fieldnames or []):
+        f.close()
+        raise ValueError("CSV file must contain a 'url' column.")
+    return _iter_urls(f, reader)
+
+def _iter_urls(f: TextIO, reader: csv.DictReader) -> Iterator[str]:
+    with f:
         for row in reader:
             url = (row.get("url") or "").strip()
             if url:
-                urls.append(url)
-        return urls
+                yield url
+
+def open_output(
+    path: Path,
+    append: bool = False,
+    newline: Optional[str] = None,
+    header: Optional[Sequence[str]] = None,
+) -> Tuple[TextIO, bool]:
+    """
+    Open an incremental output file: truncated, or appended to when resuming
+    so the rows of the previous run are kept. Also returns whether the file
+    starts empty (i.e. needs its header).
+
+    For CSV files pass `header`: an existing file whose header differs (it
+    was written by a version with other columns) is not appended to but
+    renamed to <stem>-1<suffix>, <stem>-2<suffix>, ... and a new file is
+    started, so no row ends up under the wrong columns.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if append and path.exists() and path.stat().st_size:
+        if header is not None and _csv_header(path) != list(header):
+            path.replace(_rotated_path(path))
+            return path.open("w", encoding="utf-8", newline=newline), True
+        with path.open("rb") as f:
+            f.seek(-1, 2)
+            complete = f.read(1) == b"\n"
+        out = path.open("a", encoding="utf-8", newline=newline)
+        if not complete:
+            out.write("\n")  # última linha cortada por um crash: a próxima começa numa linha nova
+        return out, False
+    return path.open("w", encoding="utf-8", newline=newline), True
+
+def _csv_header(path: Path) -> List[str]:
+    with path.open("r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), [])
+
+def _rotated_path(path: Path) -> Path:
+    # mesmo esquema do data-N.parquet: o primeiro <stem>-N livre
+    n = 1
+    while True:
+        candidate = path.with_name(f"{path.stem}-{n}{path.suffix}")
+        if not candidate.exists():
+            return candidate
+        n += 1
 
 def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 def write_json(path: Path, data: Dict) -> None:
     import json
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
\ No newline at end of file
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -1,14 +1,49 @@
 import argparse
+import asyncio
+import hashlib
+import json
 import re
+import sys
+import time
+from contextlib import ExitStack
+from dataclasses import asdict
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlparse
+from urllib.request import getproxies
 
+from scraper import (
+    async_http_client, dns_cache, downloader, http_client, images, metrics, pack, parse_pool, playwright_engine,
+)
 from scraper.io_utils import read_csv_urls, ensure_dir, write_json
-from scraper.downloader import download_images
-from scraper.report import ReportRow, write_report_csv
-from scraper.exporter import export_data_csv
+from scraper.blob_store import BlobStore
+from scraper.pack import PackStore
+from scraper.dedupe import SeenSet
+from scraper.frontier import ORDERS, SCOPES, CrawlConfig, Frontier
+from scraper.downloader import SavedImage, download_images, download_images_async
+from scraper.http_cache import HttpCache
 from scraper.rate_limiter import RateLimiter
+from scraper.robots import RobotsCache
+from scraper.report import ReportRow, ReportWriter, write_summary_json
+from scraper.resume_index import ResumeIndex
+from scraper.shards import Shard, find_shard_dirs, merge_outputs
+from scraper.retries import (
+    DEFAULT_BACKOFF_S,
+    DEFAULT_BREAKER_COOLDOWN_S,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_MAX_ATTEMPTS,
+    CircuitBreaker,
+    RetryPolicy,
+    RetryQueue,
+    retry_delay,
+)
+from scraper.exporter import DEFAULT_ROW_GROUP, DataCsvWriter, JsonlWriter, ParquetWriter
+from scraper.scheduler import IDLE, AsyncHostScheduler, HostScheduler, host_of
+from scraper.sites.base import ExtractedItem
+from scraper.sites import registry
 from scraper.sites.registry import pick_extractor
+from scraper.sites.rules import load_rules
+from scraper.urls import canonical_url, host_in_domain
 
 
 def slugify(text: str) -> str:
@@ -17,116 +52,841 @@ def slugify(text: str) -> str:
     return text.strip("-") or "item"
 
 
-def make_item_dir(base_out: Path, url: str, idx: int) -> Path:
+def make_item_dir(base_out: Path, url: str) -> Path:
     parsed = urlparse(url)
     host = parsed.netloc or "site"
     path = parsed.path.strip("/") or "root"
-    slug = slugify(f"{host}-{path}-{idx}")
+    # hash da URL canônica: a mesma URL cai na mesma pasta em qualquer ordem de entrada
+    key = hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:8]
+    slug = slugify(f"{host}-{path}-{key}")
     return base_out / slug
 
 
+def content_hash(data: ExtractedItem) -> str:
+    return hashlib.sha256(json.dumps(asdict(data), sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def build_payload(url: str, data: ExtractedItem, saved_images: List[SavedImage]) -> Dict:
+    return {
+        "url": data.url,
+        "title": data.title,
+        "h1": data.h1,
+        "description": data.description,
+        "canonical_url": data.canonical_url,
+        "og": data.og or {},
+        "text_preview": data.text_preview,
+        "links": data.links or [],
+        "counts": {
+            "images_found": len(data.image_urls),
+            "links_found": len(data.links or []),
+            "images_downloaded": len(saved_images),
+        },
+        "images": [img.path for img in saved_images],
+        "image_files": [
+            {
+                "url": img.url, "path": img.path, "sha256": img.sha256,
+                "format": img.format, "width": img.width, "height": img.height, "thumbnail": img.thumbnail,
+            }
+            for img in saved_images
+        ],
+        "domain" : urlparse(url).netloc,
+        "content_sha256": content_hash(data),
+    }
+
+
+def save_item(url: str, item_dir: Path, payload: Dict, args: argparse.Namespace) -> ReportRow:
+    packer = pack.writer()
+    if packer is not None:
+        # modo empacotado: o registro vai sempre para o shard (é ele que o --resume procura)
+        with metrics.stage("write"):
+            packer.add_item(url, f"{item_dir.name}/data.json", payload)
+    elif args.format in ("json", "both"):
+        ensure_dir(item_dir)
+        with metrics.stage("write"):
+            write_json(item_dir / "data.json", payload)
+    else:
+        ensure_dir(item_dir)
+
+    print(f"[OK] {url} -> {item_dir}")
+    return ReportRow(url=url, status="ok", output_dir=str(item_dir))
+
+
+SKIP_REASONS = {
+    "skipped": "already processed",
+    "duplicate": "same canonical URL as an earlier one",
+}
+
+
+def skipped_row(url: str, item_dir: Path, status: str = "skipped") -> ReportRow:
+    print(f"[SKIP] {url} ({SKIP_REASONS[status]})")
+    return ReportRow(url=url, status=status, output_dir=str(item_dir), error="")
+
+
+def error_row(url: str, item_dir: Path, e: Exception) -> ReportRow:
+    print(f"[ERR] {url} -> {e}")
+    return ReportRow(url=url, status="error", output_dir=str(item_dir), error=str(e), retry_after=retry_delay(e))
+
+
+def process_url(url: str, args: argparse.Namespace, out_base: Path, skip: str = "") -> Tuple[ReportRow, Optional[Dict]]:
+    item_dir = make_item_dir(out_base, url)
+
+    if skip:
+        return skipped_row(url, item_dir, skip), None
+
+    job = metrics.begin(url)
+    start = time.perf_counter()
+    try:
+        extractor = pick_extractor(
+            url,
+            max_images=args.max_images,
+            max_links=args.max_links,
+            text_preview_limit=args.text_preview,
+        )
+        pool = parse_pool.pool()
+        if args.stream:
+            data = extractor.extract_streaming(url, max_body_bytes=args.max_body_bytes)
+        elif pool is not None and extractor.can_offload_parse:
+            body, encoding = extractor.fetch(url)
+            data = pool.parse(extractor, url, body, encoding)
+        else:
+            data = extractor.extract(url)
+
+        saved_images = download_images(data.image_urls, item_dir / "images")
+
+        payload = build_payload(url, data, saved_images)
+        row = save_item(url, item_dir, payload, args)
+
+    except Exception as e:
+        row, payload = error_row(url, item_dir, e), None
+
+    job.add("total", time.perf_counter() - start, start)
+    row.rate_wait_s = round(job.times.get("rate_wait", 0.0), 3)
+    row.metrics = job
+    return row, payload
+
+
+async def process_url_async(url: str, args: argparse.Namespace, out_base: Path, skip: str = "") -> Tuple[ReportRow, Optional[Dict]]:
+    item_dir = make_item_dir(out_base, url)
+
+    if skip:
+        return skipped_row(url, item_dir, skip), None
+
+    job = metrics.begin(url)
+    start = time.perf_counter()
+    try:
+        extractor = pick_extractor(
+            url,
+            max_images=args.max_images,
+            max_links=args.max_links,
+            text_preview_limit=args.text_preview,
+        )
+        pool = parse_pool.pool()
+        if args.stream:
+            data = await extractor.extract_streaming_async(url, max_body_bytes=args.max_body_bytes)
+        elif pool is not None and extractor.can_offload_parse:
+            body, encoding = await extractor.fetch_async(url)
+            data = await pool.parse_async(extractor, url, body, encoding)
+        else:
+            data = await extractor.extract_async(url)
+
+        saved_images = await download_images_async(data.image_urls, item_dir / "images")
+
+        payload = build_payload(url, data, saved_images)
+        row = save_item(url, item_dir, payload, args)
+
+    except Exception as e:
+        row, payload = error_row(url, item_dir, e), None
+
+    job.add("total", time.perf_counter() - start, start)
+    row.rate_wait_s = round(job.times.get("rate_wait", 0.0), 3)
+    row.metrics = job
+    return row, payload
+
+
+async def run_async(
+    jobs: Iterable[Tuple[str, str]],
+    args: argparse.Namespace,
+    out_base: Path,
+    host: Callable[[Tuple[str, str]], Optional[str]],
+    start: Callable[[Tuple[str, str]], str],
+    on_result: Callable[[Tuple[ReportRow, Optional[Dict]]], None],
+) -> None:
+    scheduler = AsyncHostScheduler(
+        workers=args.workers,
+        per_host=args.per_host,
+        min_interval_s=0,  # o ritmo por host fica com o RateLimiter dos clientes HTTP
+    )
+    try:
+        async for result in scheduler.map(
+            lambda job: process_url_async(job[0], args, out_base, skip=start(job)),
+            jobs,
+            host=host,
+        ):
+            on_result(result)
+    finally:
+        await async_http_client.client().close()
+
+
+def _parquet_path(out_base: Path, resuming: bool) -> Path:
+    # Parquet não aceita append (o índice fica no rodapé): ao retomar, os dados novos vão para
+    # data-1.parquet, data-2.parquet... e os arquivos anteriores ficam intactos
+    path = out_base / "data.parquet"
+    n = 0
+    while resuming and path.exists():
+        n += 1
+        path = out_base / f"data-{n}.parquet"
+    return path
+
+
+def merge_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m scraper.main merge",
+        description="Combine the outputs of sharded runs (--shard i/N) into one report.csv, data.csv, "
+                    "data.jsonl and resume.sqlite3",
+    )
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Directory the merged files go to; without shard directories, its shard-<i>-of-<N>/ folders are merged"
+    )
+    parser.add_argument("shard_dirs", nargs="*", help="Shard output directories (default: found under --output)")
+    parser.add_argument(
+        "--allow-missing",
+        action="store_true",
+        help="Merge even if some shards of the split have no output yet"
+    )
+    args = parser.parse_args(argv)
+
+    out_base = Path(args.output)
+    if args.shard_dirs:
+        shard_dirs, missing = [Path(d) for d in args.shard_dirs], []
+        for d in shard_dirs:
+            if not d.is_dir():
+                parser.error(f"{d}: not a directory")
+    else:
+        try:
+            shard_dirs, missing = find_shard_dirs(out_base)
+        except ValueError as e:
+            parser.error(str(e))
+    if not shard_dirs:
+        parser.error(f"no shard outputs (shard-<i>-of-<N>/) under {out_base}")
+    if missing and not args.allow_missing:
+        parser.error(f"missing shard(s) {', '.join(map(str, missing))} (use --allow-missing to merge anyway)")
+
+    stats = merge_outputs(out_base, shard_dirs)
+    write_summary_json(out_base / "summary.json", {"merge": {**stats, "shard_dirs": [str(d) for d in shard_dirs]}})
+    print(
+        f"Merged {stats['shards']} shard(s): {stats['report_rows']} report rows, {stats['data_rows']} data.csv rows, "
+        f"{stats['jsonl_rows']} data.jsonl rows ({stats['dropped_rows']} stale or duplicate rows dropped)"
+    )
+    print(f"\nReport: {out_base / 'report.csv'}")
+
+
 def main() -> None:
-    parser = argparse.ArgumentParser()
+    if sys.argv[1:2] == ["merge"]:
+        merge_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(epilog="Subcommand: merge (combine --shard outputs; see merge --help)")
     parser.add_argument("--input", required=True)
     parser.add_argument("--output", required=True)
-    parser.add_argument("--rate", type=float, default=0.8, help="Min seconds between URLs")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.8,
+        help="Starting min seconds between requests to the same host (0 = unlimited); "
+             "slowed down on 429/503, timeouts and latency spikes"
+    )
+    parser.add_argument("--burst", type=int, default=1, help="Requests a host may receive back to back")
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="Attempts per URL for retryable failures (timeouts, connection errors, 429/502/503/504)"
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=DEFAULT_BACKOFF_S,
+        help="Base seconds before a failed URL is retried (doubles per attempt, with jitter)"
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=DEFAULT_BREAKER_THRESHOLD,
+        help="Consecutive failures that mark a host as down (its URLs fail fast until a probe succeeds)"
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=DEFAULT_BREAKER_COOLDOWN_S,
+        help="Seconds a down host is left alone before the next probe request"
+    )
+    parser.add_argument(
+        "--trace",
+        default="",
+        help="Write a Chrome trace (chrome://tracing / Perfetto) of every stage of every URL to this file"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default="",
+        help="Also write the run's stage timings in Prometheus text format to this file"
+    )
+    parser.add_argument(
+        "--ignore-robots",
+        action="store_true",
+        help="Do not read robots.txt (Crawl-delay / Request-rate)"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Max URLs processed concurrently")
+    parser.add_argument("--per-host", type=int, default=1, help="Max URLs processed concurrently per host")
+    parser.add_argument("--pool-size", type=int, default=10, help="Keep-alive connections kept per host")
+    parser.add_argument(
+        "--http-cache",
+        default="",
+        help="Directory for an on-disk HTTP cache (ETag/Last-Modified revalidation, Cache-Control max-age)"
+    )
+    parser.add_argument("--http-cache-mb", type=int, default=1024, help="Max size of the HTTP cache (LRU eviction)")
+    parser.add_argument(
+        "--engine",
+        choices=["threads", "async"],
+        default="threads",
+        help="Fetch engine: thread pool (requests) or asyncio (aiohttp, for thousands of in-flight URLs)"
+    )
+    parser.add_argument(
+        "--no-dns-cache",
+        action="store_true",
+        help="Resolve hosts through the system resolver on every new connection (no in-process cache or prefetch)"
+    )
+    parser.add_argument(
+        "--dns-ttl",
+        type=float,
+        default=dns_cache.DEFAULT_TTL_S,
+        help="Max seconds a resolved host is cached (record TTLs are used when dnspython is installed)"
+    )
+    parser.add_argument(
+        "--dns-negative-ttl",
+        type=float,
+        default=dns_cache.DEFAULT_NEGATIVE_TTL_S,
+        help="Seconds a host that failed to resolve fails fast before being looked up again"
+    )
+    parser.add_argument("--dns-timeout", type=float, default=dns_cache.DEFAULT_TIMEOUT_S, help="Max seconds a URL waits for its host's lookup")
+    parser.add_argument("--dns-workers", type=int, default=dns_cache.DEFAULT_WORKERS, help="Concurrent DNS lookups")
+    parser.add_argument(
+        "--dns-prefetch",
+        type=int,
+        default=dns_cache.DEFAULT_PREFETCH,
+        help="Input URLs read ahead of the scheduler to resolve their hosts early (0 = no prefetch)"
+    )
+    parser.add_argument("--image-workers", type=int, default=8, help="Max image downloads in flight (all pages)")
+    parser.add_argument("--image-per-host", type=int, default=4, help="Max image downloads in flight per image host")
+    parser.add_argument(
+        "--image-types",
+        default=",".join(images.DEFAULT_TYPES),
+        help=f"Image formats to keep, by sniffed content (comma-separated; known: {','.join(images.ALL_TYPES)})"
+    )
+    parser.add_argument(
+        "--min-image-px",
+        type=int,
+        default=images.DEFAULT_MIN_PX,
+        help="Drop images narrower or shorter than this, read from the header before the full download (0 = keep all)"
+    )
+    parser.add_argument(
+        "--max-image-mb",
+        type=float,
+        default=images.DEFAULT_MAX_MB,
+        help="Drop images larger than this, by Content-Length or once the download passes it (0 = no cap)"
+    )
+    parser.add_argument(
+        "--no-image-filter",
+        action="store_true",
+        help="Download every extracted image URL as is (no data:/pixel skipping, no type or size checks)"
+    )
+    parser.add_argument(
+        "--thumbnail-size",
+        type=int,
+        default=0,
+        help="Also write images/thumbs/ with each kept image fitted in this many pixels (needs Pillow; 0 = off)"
+    )
+    parser.add_argument(
+        "--thumbnail-format",
+        choices=["jpeg", "webp", "png"],
+        default="jpeg",
+        help="With --thumbnail-size: format the thumbnails are re-encoded to"
+    )
+    parser.add_argument(
+        "--thumbnail-procs",
+        type=int,
+        default=2,
+        help="With --thumbnail-size: processes decoding and resizing images"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse pages while they download and stop reading once the extraction limits are met"
+    )
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=10 * 1024 * 1024,
+        help="With --stream: stop reading a page after this many bytes (0 = no cap)"
+    )
+    parser.add_argument(
+        "--parse-procs",
+        type=int,
+        nargs="?",
+        const=parse_pool.default_processes(),
+        default=0,
+        help="Parse pages in a process pool of this size (no value = one per CPU core; 0 = parse in the fetch worker)"
+    )
+    parser.add_argument(
+        "--render-domain",
+        action="append",
+        default=[],
+        help="Fetch this domain (and subdomains) through the Playwright browser pool; repeatable"
+    )
+    parser.add_argument(
+        "--site-rules",
+        default="",
+        help="JSON file with declarative per-site extraction rules (XPath per field, by domain)"
+    )
+    parser.add_argument("--render-browsers", type=int, default=playwright_engine.DEFAULT_BROWSERS, help="Browsers in the render pool")
+    parser.add_argument("--render-contexts", type=int, default=playwright_engine.DEFAULT_CONTEXTS, help="Contexts (parallel pages) per browser")
+    parser.add_argument(
+        "--render-recycle",
+        type=int,
+        default=playwright_engine.DEFAULT_RECYCLE_AFTER,
+        help="Restart a browser after this many pages"
+    )
+    parser.add_argument(
+        "--render-wait",
+        choices=playwright_engine.WAIT_STRATEGIES,
+        default="settle",
+        help="When a rendered page is done: settle = DOMContentLoaded + 300 ms without network activity"
+    )
     parser.add_argument("--max-images", type=int, default=20, help="Max images extracted per page")
     parser.add_argument("--max-links", type=int, default=30, help="Max links extracted per page")
     parser.add_argument("--text-preview", type=int, default=700, help="Max chars for text preview")
-    parser.add_argument("--only-domain", default="", help="Process only URLs that match this domain (e.g. example.com)")
+    parser.add_argument("--only-domain", default="", help="Process only URLs on this domain or its subdomains (e.g. example.com)")
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Process every input row, even URLs with the same canonical form as an earlier one"
+    )
+    parser.add_argument(
+        "--dedupe-capacity",
+        type=int,
+        default=None,
+        help="Initial size of the in-memory Bloom filter in URLs (default: start small and grow with the input)"
+    )
+    parser.add_argument(
+        "--crawl",
+        action="store_true",
+        help="Follow the links of each page (input URLs are the seeds); the frontier is kept in output/frontier.sqlite3"
+    )
+    parser.add_argument("--max-depth", type=int, default=2, help="With --crawl: max link distance from a seed")
+    parser.add_argument(
+        "--crawl-scope",
+        choices=SCOPES,
+        default="domain",
+        help="With --crawl: follow links on the seed's domain (and subdomains), only its host, or anywhere"
+    )
+    parser.add_argument(
+        "--crawl-allow",
+        action="append",
+        default=[],
+        help="With --crawl: also follow links to this domain (and subdomains); repeatable"
+    )
+    parser.add_argument(
+        "--max-pages-per-host",
+        type=int,
+        default=0,
+        help="With --crawl: stop queuing pages of a host after this many (0 = no limit)"
+    )
+    parser.add_argument(
+        "--crawl-order",
+        choices=ORDERS,
+        default="bfs",
+        help="With --crawl: breadth-first, or by priority (shallow paths first, query strings last)"
+    )
     parser.add_argument(
         "--format",
-        choices=["json", "csv", "both"],
+        choices=["json", "csv", "jsonl", "parquet", "both"],
         default="both",
-        help="Output format: json per item, consolidated csv, or both"
+        help="Output format: json per item, consolidated csv, both, a single data.jsonl, "
+             "or a columnar data.parquet with the nested fields (needs pyarrow)"
+    )
+    parser.add_argument(
+        "--parquet-row-group",
+        type=int,
+        default=DEFAULT_ROW_GROUP,
+        help="With --format parquet: rows buffered per row group"
+    )
+    parser.add_argument(
+        "--pack",
+        choices=pack.FORMATS,
+        default="",
+        help="Append data.json records and images to rolling shards in output/pack/ (indexed by offset) "
+             "instead of one directory per URL"
+    )
+    parser.add_argument(
+        "--pack-shard-mb",
+        type=int,
+        default=pack.DEFAULT_SHARD_MB,
+        help="With --pack: start a new shard after this many MB"
+    )
+    parser.add_argument(
+        "--shard",
+        default="",
+        help="Process only the input hosts of shard i of N (0 <= i < N, by host hash) and write to "
+             "<output>/shard-<i>-of-<N>/; run every i on its own node or process, then merge"
     )
     parser.add_argument(
         "--resume",
         action="store_true",
-        help="Skip URLs that already have output/<item>/data.json"
+        help="Skip URLs that already succeeded in a previous run (output/resume.sqlite3)"
+    )
+    parser.add_argument(
+        "--retry-errors",
+        action="store_true",
+        help="Resume mode that only processes URLs whose last attempt failed"
+    )
+    parser.add_argument(
+        "--recrawl-after",
+        type=float,
+        default=None,
+        help="With --resume: process again URLs that succeeded more than this many hours ago"
     )
 
     args = parser.parse_args()
 
     csv_path = Path(args.input)
+    # o cabeçalho é conferido já aqui: entrada inválida falha antes de qualquer saída ser aberta
+    try:
+        urls: Iterable[str] = read_csv_urls(csv_path)
+    except ValueError as e:
+        parser.error(f"{csv_path}: {e}")
     out_base = Path(args.output)
+    shard = None
+    if args.shard:
+        try:
+            shard = Shard.parse(args.shard)
+        except ValueError as e:
+            parser.error(f"--shard: {e}")
+        # cada shard tem sua saída (report, dados, índices): o merge junta depois
+        out_base = out_base / shard.dirname
     ensure_dir(out_base)
 
-    urls = read_csv_urls(csv_path)
+    cache = None
+    if args.http_cache:
+        cache = HttpCache(Path(args.http_cache), max_bytes=args.http_cache_mb * 1024 * 1024)
 
-    if args.only_domain:
-        urls = [u for u in urls if args.only_domain in u]
+    limiter = RateLimiter(
+        min_interval_s=args.rate,
+        burst=args.burst,
+        robots=None if args.ignore_robots else RobotsCache(),
+    )
+    breaker = CircuitBreaker(threshold=args.breaker_threshold, cooldown_s=args.breaker_cooldown)
+    proxied = any(scheme in getproxies() for scheme in ("http", "https"))
+    if proxied and not args.no_dns_cache:
+        # com proxy quem resolve o destino é o proxy: resolver aqui só recusaria hosts válidos
+        print("DNS cache disabled: HTTP(S) proxy configured")
+    dns = dns_cache.configure(
+        enabled=not (args.no_dns_cache or proxied),
+        ttl_s=args.dns_ttl,
+        negative_ttl_s=args.dns_negative_ttl,
+        timeout_s=args.dns_timeout,
+        workers=args.dns_workers,
+    )
+    if args.engine == "async":
+        async_http_client.configure(
+            limit=max(args.workers, 100), pool_size=args.pool_size, cache=cache, limiter=limiter, breaker=breaker
+        )
+    else:
+        http_client.configure(pool_size=args.pool_size, cache=cache, limiter=limiter, breaker=breaker)
+    # falhas transitórias voltam para o fim da fila em vez de dormir no worker
+    retries = RetryQueue(RetryPolicy(max_attempts=args.max_attempts, base_s=args.retry_backoff))
+    recorder = metrics.configure(trace_path=Path(args.trace) if args.trace else None)
+    resuming = args.resume or args.retry_errors
+    index = ResumeIndex(out_base / "resume.sqlite3")
+    max_age_s = args.recrawl_after * 3600 if args.recrawl_after is not None else None
+    packer = pack.configure(out_base / "pack", args.pack, args.pack_shard_mb) if args.pack else None
+    if packer is not None:
+        blob_store = PackStore(packer, load_index=resuming)
+    else:
+        blob_store = BlobStore(out_base / "_blobs", load_index=resuming)
+    image_filter = None
+    if not args.no_image_filter:
+        types = [t.strip().lower() for t in args.image_types.split(",") if t.strip()]
+        unknown = set(types) - set(images.ALL_TYPES)
+        if unknown:
+            parser.error(f"--image-types: unknown format(s) {', '.join(sorted(unknown))}")
+        image_filter = images.ImageFilter(types, args.min_image_px, int(args.max_image_mb * 1024 * 1024))
+    downloader.configure(
+        workers=args.image_workers, per_host=args.image_per_host, store=blob_store, image_filter=image_filter
+    )
+    if args.thumbnail_size and args.pack:
+        # as imagens vão direto para o shard: não há arquivo local para reduzir
+        parser.error("--thumbnail-size cannot be used with --pack")
+    try:
+        images.configure_thumbnails(args.thumbnail_size, args.thumbnail_format, args.thumbnail_procs)
+    except ImportError as e:
+        parser.error(str(e))
+    if not args.stream:
+        parse_pool.configure(args.parse_procs)
+    for domain in args.render_domain:
+        registry.register_rendered(domain)
+    if args.site_rules:
+        # XPath compilado aqui: regra inválida para a execução antes da primeira URL
+        try:
+            for rule in load_rules(Path(args.site_rules)):
+                registry.REGISTRY.register_rule(rule)
+        except (OSError, ValueError) as e:
+            parser.error(f"--site-rules: {e}")
+    render_pool = playwright_engine.configure(
+        browsers=args.render_browsers,
+        contexts=args.render_contexts,
+        recycle_after=args.render_recycle,
+        wait=args.render_wait,
+    )
 
-    limiter = RateLimiter(min_interval_s=args.rate)
-    report_rows = []
+    # tudo é lido e escrito em streaming: a memória depende só da concorrência
+    if args.only_domain:
+        urls = (u for u in urls if host_in_domain(host_of(u), args.only_domain))
 
-    all_payloads = []
+    other_shard = 0
 
-    for idx, url in enumerate(urls, start=1):
-        limiter.wait()  # ✅ rate limit antes de cada URL
+    def owned(urls: Iterable[str]) -> Iterable[str]:
+        nonlocal other_shard
+        for url in urls:
+            if shard.owns(url):
+                yield url
+            else:
+                other_shard += 1
 
-        item_dir = make_item_dir(out_base, url, idx)
+    if shard is not None:
+        urls = owned(urls)
 
-        if args.resume and already_processed(item_dir):
-            print(f"[SKIP] {url} (already processed)")
-            report_rows.append(ReportRow(url=url, status="skipped", output_dir=str(item_dir), error=""))
-            continue
+    frontier = None
+    if args.crawl:
+        # a fronteira em disco substitui a lista de entrada (e já deduplica)
+        config = CrawlConfig(
+            max_depth=args.max_depth,
+            scope=args.crawl_scope,
+            allow=args.crawl_allow,
+            max_pages_per_host=args.max_pages_per_host,
+            order=args.crawl_order,
+            shard=shard,
+        )
+        frontier = Frontier(
+            out_base / "frontier.sqlite3",
+            config,
+            resume=resuming,
+            retry_errors=args.retry_errors,
+            recrawl_after_s=max_age_s,
+        )
+        frontier.add_seeds(urls)
+        urls = frontier.urls()
 
-        images_dir = item_dir / "images"
+    seen = aliases = None
+    if not args.keep_duplicates and frontier is None:
+        seen = SeenSet(capacity=args.dedupe_capacity)
+        # URLs canônicas declaradas pelas páginas já baixadas (rel=canonical)
+        aliases = SeenSet(capacity=args.dedupe_capacity // 4 if args.dedupe_capacity else None)
+    duplicates = 0
 
+    outputs = ExitStack()
+    # ao retomar, as linhas da execução anterior ficam: os arquivos são continuados, não truncados
+    report = outputs.enter_context(ReportWriter(out_base / "report.csv", append=resuming))
+    data_csv = None
+    if args.format in ("csv", "both"):
+        data_csv = outputs.enter_context(DataCsvWriter(out_base / "data.csv", append=resuming))
+    data_jsonl = None
+    if args.format == "jsonl":
+        data_jsonl = outputs.enter_context(JsonlWriter(out_base / "data.jsonl", append=resuming))
+    data_parquet = None
+    parquet_path = _parquet_path(out_base, resuming)
+    if args.format == "parquet":
         try:
-            extractor = pick_extractor(
-                url,
-                max_images=args.max_images,
-                max_links=args.max_links,
-                text_preview=args.text_preview
-            )
-            data = extractor.extract(url)
+            data_parquet = outputs.enter_context(ParquetWriter(parquet_path, args.parquet_row_group))
+        except ImportError as e:
+            parser.error(str(e))
 
-            saved_images = download_images(data.image_urls, images_dir)
-
-            payload = {
-                "url": data.url,
-                "title": data.title,
-                "h1": data.h1,
-                "description": data.description,
-                "canonical_url": data.canonical_url,
-                "og": data.og or {},
-                "text_preview": data.text_preview,
-                "links": data.links or [],
-                "counts": {
-                    "images_found": len(data.image_urls),
-                    "links_found": len(data.links or []),
-                    "images_downloaded": len(saved_images),
-                },
-                "images": saved_images,
-                "domain" : urlparse(url).netloc
-            }
-            if args.format in ("csv", "both"):
-                all_payloads.append(payload)
+    def job_host(job: Tuple[str, str]) -> Optional[str]:
+        url, skip = job
+        # itens pulados não consomem o limite por host
+        return None if skip else host_of(url)
 
-            ensure_dir(item_dir)
+    def on_result(result: Tuple[ReportRow, Optional[Dict]]) -> None:
+        nonlocal duplicates
+        row, payload = result
+        if row.status == "error" and row.retry_after is not None and retries.defer(row.url, row.retry_after):
+            print(f"[RETRY] {row.url} deferred (attempt {retries.attempts(row.url) - 1} failed)")
+            if row.metrics is not None:
+                recorder.record(row.metrics, "retry")
+            return
+        row.attempts = retries.attempts(row.url)
+        retries.done(row.url, row.status == "ok")
+        row.host = host_of(row.url)
+        host_stats = limiter.host_stats(row.host)
+        if host_stats:
+            row.host_rate = "" if host_stats["rate"] is None else str(host_stats["rate"])
+            row.host_throttled = host_stats["throttled"]
+        if row.status == "duplicate":
+            duplicates += 1
+        if row.status in ("ok", "error"):
+            sha = payload["content_sha256"] if payload is not None else ""
+            index.record(row.url, row.status, output_dir=row.output_dir, content_sha256=sha, error=row.error)
+        if aliases is not None and payload is not None and payload["canonical_url"]:
+            canonical = canonical_url(payload["canonical_url"])
+            if canonical != canonical_url(row.url):
+                seen.add(canonical)  # ainda não admitida: será pulada na admissão
+                aliases.add(canonical)  # já admitida: pulada ao começar
+        if frontier is not None:
+            if payload is not None:
+                frontier.complete(row.url, payload["links"], payload["canonical_url"])
+            else:
+                frontier.complete(row.url, ok=row.status != "error")
+        if payload is not None:
+            start = time.perf_counter()
+            if data_csv is not None:
+                data_csv.write(payload)
+            if data_jsonl is not None:
+                data_jsonl.write(payload)
+            if data_parquet is not None:
+                data_parquet.write(payload)
+            if row.metrics is not None:
+                row.metrics.add("write", time.perf_counter() - start, start)
+        report.write(row)
+        if row.metrics is not None:
+            recorder.record(row.metrics, row.status)
 
-            if args.format in ("json", "both"):
-                ensure_dir(item_dir)
-                write_json(item_dir / "data.json", payload)
+    def skip_status(url: str) -> str:
+        # decidido uma vez por URL, quando o scheduler a admite
+        if seen is not None and seen.add(canonical_url(url)):
+            return "duplicate"
+        # no crawl a fronteira já sabe o que falta: ela decide o resume
+        if resuming and frontier is None and not index.should_process(url, retry_errors=args.retry_errors, max_age_s=max_age_s):
+            # empacotado: só conta como feito se o registro chegou ao disco (índice do pack)
+            if packer is None or packer.has_item(url):
+                return "skipped"
+        return ""
 
-            report_rows.append(ReportRow(url=url, status="ok", output_dir=str(item_dir)))
-            print(f"[OK] {url} -> {item_dir}")
+    def start_status(job: Tuple[str, str]) -> str:
+        url, skip = job
+        if not skip and aliases is not None and canonical_url(url) in aliases:
+            return "duplicate"
+        return skip
 
-        except Exception as e:
-            report_rows.append(ReportRow(url=url, status="error", output_dir=str(item_dir), error=str(e)))
-            print(f"[ERR] {url} -> {e}")
+    if dns is not None and args.dns_prefetch > 0:
+        urls = dns.prefetch_ahead(urls, args.dns_prefetch)
+    jobs = retries.wrap(url if url is IDLE else (url, skip_status(url)) for url in urls)
+    with outputs:
+        if args.engine == "async":
+            asyncio.run(run_async(jobs, args, out_base, job_host, start_status, on_result))
+        else:
+            scheduler = HostScheduler(
+                workers=args.workers,
+                per_host=args.per_host,
+                min_interval_s=0,
+            )
+            for result in scheduler.map(
+                lambda job: process_url(job[0], args, out_base, skip=start_status(job)),
+                jobs,
+                host=job_host,
+            ):
+                on_result(result)
 
-    write_report_csv(out_base / "report.csv", report_rows)
-    if args.format in ("csv", "both"):
-        export_data_csv(out_base / "data.csv", all_payloads)
+    parse_pool.configure(0)
+    images.configure_thumbnails(0)
+    render_pool.close()
+    index.close()
+    if seen is not None:
+        seen.close()
+        aliases.close()
+    if frontier is not None:
+        frontier.close()
+    blob_store.close()
+    print(
+        f"Images: {blob_store.stats['downloaded']} downloaded, "
+        f"{blob_store.stats['reused']} reused from {blob_store.root}"
+    )
+    summary = {"images": dict(blob_store.stats), "hosts": limiter.stats()}
+    dropped = recorder.counts.get("images_dropped", 0)
+    if dropped:
+        bytes_saved = recorder.counts.get("image_bytes_saved", 0)
+        summary["images"].update(dropped=dropped, bytes_saved=bytes_saved)
+        print(f"Image filter: {dropped} images dropped, {bytes_saved / 1024 / 1024:.1f} MB not downloaded")
+    if packer is not None:
+        pack.configure(None)  # último fsync e commit do índice
+        summary["pack"] = packer.stats
+        print(
+            f"Pack: {packer.stats['items']} records and {packer.stats['blobs']} images in "
+            f"{packer.stats['shards']} new shard(s) under {out_base / 'pack'}"
+        )
+    if dns is not None:
+        summary["dns"] = dns.summary()
+        lookups = summary["dns"]["lookup_s"]
+        print(
+            f"DNS: {summary['dns']['hit_rate']:.1%} cache hit rate, {lookups['count']} lookups "
+            f"(p50 {lookups['p50'] * 1000:.1f} ms, p99 {lookups['p99'] * 1000:.1f} ms), "
+            f"{summary['dns']['prefetched']} prefetched, {summary['dns']['failed']} failed"
+        )
+        dns_cache.configure(enabled=False)
+    summary["retries"] = {**retries.stats, **breaker.stats, "down_hosts": breaker.open_hosts()}
+    if retries.stats["deferred"]:
+        print(
+            f"Retries: {retries.stats['deferred']} deferred, {retries.stats['recovered']} recovered, "
+            f"{retries.stats['gave_up']} gave up; {breaker.stats['opened']} circuit breaks"
+        )
+    throttled = sum(s["throttled"] for s in summary["hosts"].values())
+    if throttled:
+        print(f"Rate limit: {throttled} throttled responses across {len(summary['hosts'])} hosts")
+    if frontier is not None:
+        summary["crawl"] = frontier.stats
+        print(
+            f"Crawl: {frontier.stats['queued']} pages queued, {frontier.stats['out_of_scope']} links out of scope, "
+            f"{frontier.stats['over_budget']} over the per-host budget, {frontier.stats['too_deep']} too deep"
+            + (f", {frontier.stats['other_shard']} on other shards' hosts" if shard is not None else "")
+        )
+    if shard is not None:
+        summary["shard"] = {"index": shard.index, "count": shard.count, "other_shard_urls": other_shard}
+        print(f"Shard {shard.index}/{shard.count}: {other_shard} input URLs left to the other shards")
+    if seen is not None:
+        summary["dedupe"] = {"duplicates": duplicates, **seen.stats}
+        print(f"Dedupe: {duplicates} duplicate URLs skipped")
+    if render_pool.stats["pages"]:
+        summary["render"] = render_pool.stats
+        print(
+            f"Rendered: {render_pool.stats['pages']} pages, browsers recycled "
+            f"{render_pool.stats['recycled']}, crashed {render_pool.stats['crashed']}, "
+            f"failed to relaunch {render_pool.stats['launch_failed']}"
+        )
+    if cache is not None:
+        summary["http_cache"] = cache.stats
+        print(
+            f"HTTP cache: {cache.stats['hit']} hit, {cache.stats['miss']} miss, "
+            f"{cache.stats['revalidated']} revalidated"
+        )
+
+    write_summary_json(out_base / "summary.json", summary)
+    recorder.close()
+    recorder.write_json(out_base / "metrics.json")
+    if args.metrics_prom:
+        recorder.write_prometheus(Path(args.metrics_prom))
+    total = recorder.times.get("total")
+    if total is not None:
+        print(
+            f"Timing: {recorder.summary()['jobs_per_s']} URLs/s, per URL p50 {total.quantile(0.5):.3f}s, "
+            f"p99 {total.quantile(0.99):.3f}s (details in {out_base / 'metrics.json'})"
+        )
+    if data_csv is not None:
         print(f"Data CSV: {out_base / 'data.csv'}")
+    if data_jsonl is not None:
+        print(f"Data JSONL: {out_base / 'data.jsonl'}")
+    if data_parquet is not None:
+        print(f"Data Parquet: {parquet_path}")
 
     print(f"\nReport: {out_base / 'report.csv'}")
 
-def already_processed(item_dir: Path) -> bool:
-    return (item_dir / "data.json").exists()
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,333 @@
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# colunas por URL no report.csv (segundos, exceto bytes/contagens)
+REPORT_COLUMNS = (
+    "total_s", "dns_s", "connect_s", "ttfb_s", "download_s", "html_bytes",
+    "parse_s", "images", "image_bytes", "images_dropped", "image_bytes_saved", "images_s", "write_s",
+)
+
+# histograma logarítmico: ~4,6% de erro relativo nos percentis, de 1 µs a ~1 dia
+_BUCKET_BASE = 1.1
+_BUCKET_MIN = 1e-6
+_LOG_BASE = math.log(_BUCKET_BASE)
+QUANTILES = (0.5, 0.9, 0.99)
+
+Span = Tuple[str, float, float]  # nome, início (perf_counter), duração
+
+
+class JobMetrics:
+    """
+    Timings (seconds) and counters of one URL, filled in by the stages as
+    they run. Only the total per name is kept, plus the individual spans
+    when a trace is being written.
+    """
+
+    __slots__ = ("url", "times", "counts", "spans", "_lock")
+
+    def __init__(self, url: str, trace: bool = False):
+        self.url = url
+        self.times: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.spans: Optional[List[Span]] = [] if trace else None
+        # imagens baixam em outras threads somando no mesmo job
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None) -> None:
+        with self._lock:
+            self.times[name] = self.times.get(name, 0.0) + seconds
+            if self.spans is not None:
+                self.spans.append((name, start if start is not None else time.perf_counter() - seconds, seconds))
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def merge(self, times: Dict[str, float], counts: Dict[str, int], spans: Optional[List[Span]] = None) -> None:
+        """Fold in what a parse worker process measured for this job."""
+        with self._lock:
+            for name, seconds in times.items():
+                self.times[name] = self.times.get(name, 0.0) + seconds
+            for name, n in counts.items():
+                self.counts[name] = self.counts.get(name, 0) + n
+            if self.spans is not None and spans:
+                self.spans.extend(spans)
+
+    def columns(self) -> Dict[str, Any]:
+        """The REPORT_COLUMNS values for report.csv (blank when the stage did not run)."""
+        out: Dict[str, Any] = {}
+        for col in REPORT_COLUMNS:
+            name = col[:-2] if col.endswith("_s") else col
+            if col.endswith("_s"):
+                value = self.times.get(name)
+                out[col] = round(value, 4) if value is not None else ""
+            else:
+                out[col] = self.counts.get(name, "")
+        return out
+
+
+class _Scoped:
+    """A JobMetrics view that prefixes every name (image downloads: "image_connect", ...)."""
+
+    __slots__ = ("job", "prefix")
+
+    def __init__(self, job: JobMetrics, prefix: str):
+        self.job = job
+        self.prefix = prefix
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None) -> None:
+        self.job.add(self.prefix + name, seconds, start)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.job.count(self.prefix + name, n)
+
+
+_current: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("job_metrics", default=None)
+
+
+def begin(url: str) -> JobMetrics:
+    """Start measuring a job in the current thread / asyncio task."""
+    job = JobMetrics(url, trace=_recorder is not None and _recorder.trace is not None)
+    _current.set(job)
+    return job
+
+
+def current() -> Optional[JobMetrics]:
+    job = _current.get()
+    return job.job if isinstance(job, _Scoped) else job
+
+
+def add(name: str, seconds: float, start: Optional[float] = None) -> None:
+    job = _current.get()
+    if job is not None:
+        job.add(name, seconds, start)
+
+
+def count(name: str, n: int = 1) -> None:
+    job = _current.get()
+    if job is not None:
+        job.count(name, n)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start, start)
+
+
+class Laps:
+    """Consecutive timings without nesting: lap("title") records the time since the previous lap."""
+
+    __slots__ = ("prefix", "_last")
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def __call__(self, name: str) -> None:
+        now = time.perf_counter()
+        add(self.prefix + name, now - self._last, self._last)
+        self._last = now
+
+
+def enter_scope(prefix: str) -> None:
+    """Prefix the current job's names from here on (call inside a task of its own)."""
+    job = _current.get()
+    if job is not None:
+        _current.set(_Scoped(current(), prefix))
+
+
+def bind(fn: Callable[..., T], prefix: str = "") -> Callable[..., T]:
+    """Carry the current job (optionally prefixed) into a call that runs on a pool thread."""
+    job = current()
+    if job is None:
+        return fn
+    target = _Scoped(job, prefix) if prefix else job
+
+    def run(*args, **kwargs) -> T:
+        token = _current.set(target)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+def collect(fn: Callable[..., T], *args) -> Tuple[T, Dict[str, float], Dict[str, int], Optional[List[Span]]]:
+    """Run fn under a fresh job and return its result plus what it measured (parse workers)."""
+    job = JobMetrics("", trace=True)
+    token = _current.set(job)
+    try:
+        result = fn(*args)
+    finally:
+        _current.reset(token)
+    return result, job.times, job.counts, job.spans
+
+
+class Histogram:
+    """Fixed log-bucket histogram: constant memory, approximate percentiles."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        idx = int(math.log(max(value, _BUCKET_MIN) / _BUCKET_MIN) / _LOG_BASE)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                # centro geométrico do bucket, limitado ao máximo observado
+                return min(self.max, _BUCKET_MIN * _BUCKET_BASE ** (idx + 0.5))
+        return self.max
+
+    def summary(self, digits: int = 6) -> Dict[str, float]:
+        out = {"count": self.count, "sum": round(self.total, digits), "max": round(self.max, digits)}
+        if self.count:
+            out["mean"] = round(self.total / self.count, digits)
+        for q in QUANTILES:
+            out[f"p{round(q * 100)}"] = round(self.quantile(q), digits)
+        return out
+
+
+class TraceWriter:
+    """
+    Chrome trace (chrome://tracing, Perfetto) written as jobs finish: one
+    complete event per span, one track per URL.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = path.open("w", encoding="utf-8")
+        self._f.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        self._first = True
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+
+    def write(self, tid: int, job: JobMetrics, status: str) -> None:
+        events = [{"ph": "M", "name": "thread_name", "pid": self._pid, "tid": tid, "args": {"name": job.url}}]
+        for name, start, seconds in sorted(job.spans or (), key=lambda s: s[1]):
+            events.append({
+                "ph": "X", "name": name, "cat": name.split(".")[0], "pid": self._pid, "tid": tid,
+                "ts": round((start - self._origin) * 1e6, 1), "dur": round(seconds * 1e6, 1),
+                "args": {"url": job.url, "status": status},
+            })
+        for event in events:
+            self._f.write(("" if self._first else ",\n") + json.dumps(event))
+            self._first = False
+
+    def close(self) -> None:
+        self._f.write("\n]}\n")
+        self._f.close()
+
+
+class Recorder:
+    """
+    Run-level aggregation of every finished job: a histogram per timing
+    name, totals per counter, and the optional Chrome trace. record() is
+    called from the thread that consumes results.
+    """
+
+    def __init__(self, trace_path: Optional[Path] = None):
+        self.started = time.monotonic()
+        self.times: Dict[str, Histogram] = {}
+        self.counts: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+        self.trace = TraceWriter(trace_path) if trace_path else None
+        self._jobs = 0
+
+    def record(self, job: JobMetrics, status: str) -> None:
+        self._jobs += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        for name, seconds in job.times.items():
+            hist = self.times.get(name)
+            if hist is None:
+                hist = self.times[name] = Histogram()
+            hist.add(seconds)
+        for name, n in job.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+        if self.trace is not None:
+            self.trace.write(self._jobs, job, status)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "jobs": self._jobs,
+            "jobs_per_s": round(self._jobs / elapsed, 3) if elapsed > 0 else 0.0,
+            "statuses": dict(self.statuses),
+            "counts": dict(self.counts),
+            "timings_s": {name: hist.summary() for name, hist in sorted(self.times.items())},
+        }
+
+    def write_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.summary(), indent=2), encoding="utf-8")
+
+    def write_prometheus(self, path: Path, prefix: str = "scraper") -> None:
+        """Prometheus text exposition (e.g. for the node_exporter textfile collector)."""
+        lines = [
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, hist in sorted(self.times.items()):
+            label = f'stage="{name}"'
+            for q in QUANTILES:
+                lines.append(f'{prefix}_stage_seconds{{{label},quantile="{q}"}} {hist.quantile(q):.6f}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {hist.total:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{label}}} {hist.count}")
+        lines.append(f"# TYPE {prefix}_total counter")
+        for name, n in sorted(self.counts.items()):
+            lines.append(f'{prefix}_total{{name="{name}"}} {n}')
+        lines.append(f"# TYPE {prefix}_jobs_total counter")
+        for status, n in sorted(self.statuses.items()):
+            lines.append(f'{prefix}_jobs_total{{status="{status}"}} {n}')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def close(self) -> None:
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+
+_recorder: Optional[Recorder] = None
+
+
+def configure(trace_path: Optional[Path] = None) -> Recorder:
+    """Start the run-level recorder (begin() only keeps spans while a trace is open)."""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = Recorder(trace_path)
+    return _recorder
+
+
+def recorder() -> Optional[Recorder]:
+    return _recorder
@@ -0,0 +1,403 @@
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tarfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from scraper.blob_store import BlobStore, BlobWriter
+from scraper.urls import canonical_url
+
+FORMATS = ("warc", "tar")
+SUFFIXES = {"warc": ".warc.gz", "tar": ".tar"}
+
+DEFAULT_SHARD_MB = 1024
+SYNC_EVERY = 256        # registros por fsync + transação do índice
+SYNC_INTERVAL_S = 1.0   # ou a cada segundo, o que vier primeiro
+CHUNK = 1024 * 1024
+GZIP_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    url_key TEXT PRIMARY KEY,
+    url     TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    shard   TEXT NOT NULL,
+    offset  INTEGER NOT NULL,
+    length  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    shard  TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS image_urls (
+    url    TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+"""
+
+Location = Tuple[str, int, int]  # shard, offset, length
+
+
+def blob_name(sha: str) -> str:
+    """Name of an image's record inside the pack (tar member / WARC Pack-Record-Name)."""
+    return f"_blobs/{sha}"
+
+
+def _warc_content(record: bytes) -> bytes:
+    head, _, rest = record.partition(b"\r\n\r\n")
+    size = next(int(line.split(b":", 1)[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length:"))
+    return rest[:size]
+
+
+def _read_head(root: Path, loc: Location, n: int) -> bytes:
+    """First `n` bytes of a record's content, decompressing only as much of a WARC member as needed."""
+    shard, offset, length = loc
+    with (root / shard).open("rb") as f:
+        f.seek(offset)
+        if not shard.endswith(".warc.gz"):
+            return f.read(min(n, length))
+        z = zlib.decompressobj(31)
+        record = b""
+        left = length
+        while left:
+            chunk = f.read(min(CHUNK, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            record += z.decompress(chunk)
+            _, sep, body = record.partition(b"\r\n\r\n")
+            if sep and len(body) >= n:
+                break
+    return _warc_content(record)[:n]
+
+
+def _warc_header(record_type: str, target: str, content_type: str, length: int, extra: Dict[str, str]) -> bytes:
+    lines = [
+        "WARC/1.1",
+        f"WARC-Type: {record_type}",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+    ]
+    if target:
+        lines.append(f"WARC-Target-URI: {target}")
+    lines += [f"{k}: {v}" for k, v in extra.items()]
+    lines += [f"Content-Type: {content_type}", f"Content-Length: {length}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+
+class _Shard:
+    """One open shard file; append() returns where the record landed."""
+
+    def __init__(self, path: Path, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._f = path.open("wb")
+        self._tar = tarfile.open(fileobj=self._f, mode="w", format=tarfile.PAX_FORMAT) if fmt == "tar" else None
+        if fmt == "warc":
+            info = json.dumps({"software": "scraper", "format": "WARC File Format 1.1"}).encode("utf-8")
+            self._write_warc("warcinfo", "", "application/json", io.BytesIO(info), len(info), {"WARC-Filename": path.name})
+
+    @property
+    def size(self) -> int:
+        return self._f.tell()
+
+    def _write_warc(self, record_type: str, target: str, content_type: str, body: BinaryIO, length: int, extra: Dict[str, str]) -> Location:
+        # um membro gzip por registro: dá para ler qualquer um sozinho a partir do offset
+        offset = self._f.tell()
+        z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        self._f.write(z.compress(_warc_header(record_type, target, content_type, length, extra)))
+        for chunk in iter(lambda: body.read(CHUNK), b""):
+            self._f.write(z.compress(chunk))
+        self._f.write(z.compress(b"\r\n\r\n"))
+        self._f.write(z.flush())
+        return self.path.name, offset, self._f.tell() - offset
+
+    def _write_tar(self, name: str, body: BinaryIO, length: int) -> Location:
+        info = tarfile.TarInfo(name)
+        info.size = length
+        info.mtime = int(time.time())
+        header = info.tobuf(self._tar.format, self._tar.encoding, self._tar.errors)
+        offset = self._tar.offset + len(header)  # os bytes do arquivo, sem o cabeçalho tar
+        self._tar.addfile(info, body)
+        return self.path.name, offset, length
+
+    def append(self, name: str, target: str, content_type: str, body: BinaryIO, length: int) -> Location:
+        if self._tar is not None:
+            return self._write_tar(name, body, length)
+        return self._write_warc("resource", target, content_type, body, length, {"Pack-Record-Name": name})
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def sync(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()  # blocos finais do tar; não fecha o arquivo
+        self.sync()
+        self._f.close()
+
+
+class PackWriter:
+    """
+    Packed output: per-URL records (data.json) and image bytes appended to
+    rolling shard files (pack/shard-NNNNN.warc.gz or .tar) instead of one
+    directory per URL, plus an offset index (pack/index.sqlite3) for
+    random access by URL or image hash.
+
+    Appends are batched: every SYNC_EVERY records or SYNC_INTERVAL_S
+    seconds (and when a shard rolls over at `shard_bytes`) the shard is
+    fsync'd and only then are the new offsets committed to the index, so
+    the index never points at bytes that did not reach the disk. A crash
+    loses at most the last batch; those URLs are not in the index and are
+    processed again on --resume.
+    """
+
+    def __init__(self, root: Path, fmt: str = "warc", shard_bytes: int = DEFAULT_SHARD_MB * 1024 * 1024):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown pack format {fmt!r}")
+        self.root = root
+        self.fmt = fmt
+        self.shard_bytes = max(1, shard_bytes)
+        root.mkdir(parents=True, exist_ok=True)
+        self.stats = {"shards": 0, "items": 0, "blobs": 0, "bytes": 0, "syncs": 0}
+
+        self._db = sqlite3.connect(str(root / "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        # registros já escritos, esperando o próximo fsync para entrar no índice
+        self._items: Dict[str, Tuple[str, str, Location]] = {}
+        self._blobs: Dict[str, Tuple[Location, int]] = {}
+        self._image_urls: Dict[str, str] = {}
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        # execuções seguintes (--resume) nunca reabrem um shard: começam o próximo
+        numbers = [int(p.name.split(".")[0].split("-")[1]) for p in root.glob("shard-*.*")]
+        self._next = max(numbers, default=-1) + 1
+        self._shard: Optional[_Shard] = None
+
+    def _current(self) -> _Shard:
+        if self._shard is None:
+            path = self.root / f"shard-{self._next:05d}{SUFFIXES[self.fmt]}"
+            self._next += 1
+            self._shard = _Shard(path, self.fmt)
+            self.stats["shards"] += 1
+        return self._shard
+
+    def _append(self, name: str, target: str, content_type: str, body: BinaryIO, length: int) -> Location:
+        shard = self._current()
+        before = shard.size
+        loc = shard.append(name, target, content_type, body, length)
+        self.stats["bytes"] += shard.size - before
+        self._pending += 1
+        return loc
+
+    def _after_append(self) -> None:
+        if self._shard is not None and self._shard.size >= self.shard_bytes:
+            self._sync(roll=True)
+        elif self._pending >= SYNC_EVERY or time.monotonic() - self._last_sync >= SYNC_INTERVAL_S:
+            self._sync()
+
+    def _sync(self, roll: bool = False) -> None:
+        if self._shard is not None:
+            if roll:
+                self._shard.close()
+                self._shard = None
+            else:
+                self._shard.sync()
+            self.stats["syncs"] += 1
+        if self._items or self._blobs or self._image_urls:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO items (url_key, url, name, shard, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, url, name, *loc) for key, (url, name, loc) in self._items.items()],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO blobs (sha256, shard, offset, length, size) VALUES (?, ?, ?, ?, ?)",
+                [(sha, *loc, size) for sha, (loc, size) in self._blobs.items()],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO image_urls (url, sha256) VALUES (?, ?)", list(self._image_urls.items())
+            )
+            self._db.execute("COMMIT")
+            self._items.clear()
+            self._blobs.clear()
+            self._image_urls.clear()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def add_item(self, url: str, name: str, payload: Dict[str, Any]) -> None:
+        """Append one URL's data.json record (name: its path inside the pack)."""
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        with self._lock:
+            loc = self._append(name, url, "application/json", io.BytesIO(body), len(body))
+            self._items[canonical_url(url)] = (url, name, loc)
+            self.stats["items"] += 1
+            self._after_append()
+
+    def add_blob(self, sha: str, url: str, src: Path, size: int) -> None:
+        """Append image bytes once per content hash (a repeated hash is a no-op)."""
+        with self._lock:
+            if sha in self._blobs or self._indexed_blob(sha):
+                return
+            with src.open("rb") as f:
+                loc = self._append(blob_name(sha), url, "application/octet-stream", f, size)
+            self._blobs[sha] = (loc, size)
+            self.stats["blobs"] += 1
+            self._after_append()
+
+    def add_image_url(self, url: str, sha: str) -> None:
+        with self._lock:
+            self._image_urls[url] = sha
+
+    def _indexed_blob(self, sha: str) -> bool:
+        return self._db.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha,)).fetchone() is not None
+
+    def has_blob(self, sha: str) -> bool:
+        with self._lock:
+            return sha in self._blobs or self._indexed_blob(sha)
+
+    def blob_head(self, sha: str, n: int) -> bytes:
+        """First `n` bytes of a packed image, from this run or an earlier one (b"" when unknown)."""
+        with self._lock:
+            pending = self._blobs.get(sha)
+            if pending is not None:
+                loc = pending[0]
+                if self._shard is not None and loc[0] == self._shard.path.name:
+                    self._shard.flush()  # ainda no buffer do shard aberto
+            else:
+                loc = self._db.execute("SELECT shard, offset, length FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+                if loc is None:
+                    return b""
+        try:
+            return _read_head(self.root, loc, n)
+        except (OSError, zlib.error, StopIteration, ValueError):
+            return b""
+
+    def has_item(self, url: str) -> bool:
+        """True once the URL's record is durable (fsync'd and indexed) or pending in this run."""
+        key = canonical_url(url)
+        with self._lock:
+            if key in self._items:
+                return True
+            return self._db.execute("SELECT 1 FROM items WHERE url_key = ?", (key,)).fetchone() is not None
+
+    def image_urls(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._db.execute("SELECT url, sha256 FROM image_urls"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync(roll=True)
+            self._db.close()
+
+
+class PackStore(BlobStore):
+    """
+    BlobStore whose blobs live in the pack shards instead of _blobs/: same
+    per-URL deduplication, but downloaded images are appended to the
+    current shard and the temp file removed; nothing is linked into item
+    folders; the image path in the payload is its record name in the pack.
+    """
+
+    packed = True
+
+    def __init__(self, writer: PackWriter, load_index: bool = False):
+        self.pack = writer
+        super().__init__(writer.root, load_index)
+
+    def _open_index(self, load: bool) -> None:
+        if load:
+            self._by_url.update(self.pack.image_urls())
+
+    def has_blob(self, sha: str) -> bool:
+        return self.pack.has_blob(sha)
+
+    def _store(self, url: str, sha: str, writer: BlobWriter) -> None:
+        try:
+            self.pack.add_blob(sha, url, writer.path, writer.size)
+        finally:
+            writer.path.unlink(missing_ok=True)
+
+    def _record(self, url: str, sha: str, size: int) -> None:
+        self.pack.add_image_url(url, sha)
+
+    def head(self, sha: str, n: int) -> bytes:
+        return self.pack.blob_head(sha, n)
+
+    def link(self, sha: str, dest: Path) -> str:
+        return blob_name(sha)  # a imagem fica no shard: nada é criado em dest
+
+    def close(self) -> None:
+        pass  # o PackWriter é fechado por quem o abriu
+
+
+class PackReader:
+    """Random access to a pack directory through its offset index."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._db = sqlite3.connect(f"file:{root / 'index.sqlite3'}?mode=ro", uri=True)
+
+    def _read(self, loc: Location) -> bytes:
+        shard, offset, length = loc
+        with (self.root / shard).open("rb") as f:
+            f.seek(offset)
+            raw = f.read(length)
+        if not shard.endswith(".warc.gz"):
+            return raw
+        return _warc_content(gzip.decompress(raw))
+
+    def item(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT shard, offset, length FROM items WHERE url_key = ?", (canonical_url(url),)).fetchone()
+        return json.loads(self._read(row)) if row else None
+
+    def blob(self, sha: str) -> Optional[bytes]:
+        row = self._db.execute("SELECT shard, offset, length FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+        return self._read(row) if row else None
+
+    def image(self, url: str) -> Optional[bytes]:
+        row = self._db.execute("SELECT sha256 FROM image_urls WHERE url = ?", (url,)).fetchone()
+        return self.blob(row[0]) if row else None
+
+    def items(self) -> Iterator[Dict[str, Any]]:
+        """Every indexed record, in shard order."""
+        rows: List[Location] = self._db.execute("SELECT shard, offset, length FROM items ORDER BY shard, offset").fetchall()
+        for loc in rows:
+            yield json.loads(self._read(loc))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_writer: Optional[PackWriter] = None
+
+
+def configure(root: Optional[Path] = None, fmt: str = "warc", shard_mb: int = DEFAULT_SHARD_MB) -> Optional[PackWriter]:
+    """Open the run's pack (root None = one directory per URL, the default layout)."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = PackWriter(root, fmt, shard_mb * 1024 * 1024) if root is not None else None
+    return _writer
+
+
+def writer() -> Optional[PackWriter]:
+    return _writer
@@ -0,0 +1,70 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from scraper import metrics
+from scraper.sites.base import BaseExtractor, ExtractedItem
+
+
+def _parse(extractor: BaseExtractor, url: str, body: bytes, encoding: Optional[str]):
+    # as medições do worker voltam junto com o item e entram no job de quem pediu
+    return metrics.collect(extractor.parse_bytes, url, body, encoding)
+
+
+def _merged(result) -> ExtractedItem:
+    item, times, counts, spans = result
+    job = metrics.current()
+    if job is not None:
+        job.merge(times, counts, spans)
+    return item
+
+
+class ParsePool:
+    """
+    Process pool for the CPU-bound parse stage, so parsing does not compete
+    with network I/O for the GIL. Workers receive the raw HTML bytes and
+    return the compact ExtractedItem.
+
+    The pipeline stays bounded without extra queues: each fetch worker hands
+    at most one page to this pool and waits for its result, so at most
+    `--workers` pages are buffered between the fetch and parse stages.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = max(1, processes)
+        # spawn: os workers não herdam as threads do processo principal
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def parse(self, extractor: BaseExtractor, url: str, body: bytes, encoding: Optional[str]) -> ExtractedItem:
+        return _merged(self._executor.submit(_parse, extractor, url, body, encoding).result())
+
+    async def parse_async(self, extractor: BaseExtractor, url: str, body: bytes, encoding: Optional[str]) -> ExtractedItem:
+        return _merged(await asyncio.wrap_future(self._executor.submit(_parse, extractor, url, body, encoding)))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[ParsePool] = None
+
+
+def configure(processes: int) -> Optional[ParsePool]:
+    """Start the parse pool (0 disables it: pages are parsed in the fetch worker)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = ParsePool(processes) if processes > 0 else None
+    return _pool
+
+
+def pool() -> Optional[ParsePool]:
+    return _pool
+
+
+def default_processes() -> int:
+    return os.cpu_count() or 1
@@ -1,10 +1,290 @@
-from playwright.sync_api import sync_playwright
-
-def fetch_rendered_html(url: str, timeout_ms: int = 30000) -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(url, timeout=timeout_ms, wait_until="networkidle")
-        html = page.content()
-        browser.close()
-        return html
\ No newline at end of file
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import suppress
+from typing import Awaitable, List, Optional, Set, Tuple
+
+from playwright.async_api import Browser, BrowserContext, Error, Page, Playwright, Route, async_playwright
+
+from scraper.http_client import DEFAULT_HEADERS
+
+DEFAULT_BROWSERS = 2          # processos Chromium
+DEFAULT_CONTEXTS = 4          # contextos (abas isoladas) por browser
+DEFAULT_RECYCLE_AFTER = 200   # páginas por browser antes de reiniciá-lo
+DEFAULT_TIMEOUT_MS = 30000
+
+# recursos que não mudam o HTML renderizado
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# "settle": DOMContentLoaded + rede quieta por quiet_ms (bem mais barato que
+# networkidle, que espera o evento load e 500 ms sem nenhuma conexão)
+WAIT_STRATEGIES = ("settle", "domcontentloaded", "load", "networkidle")
+DEFAULT_QUIET_MS = 300
+SETTLE_MAX_MS = 5000
+
+RELAUNCH_RETRY_S = 5.0        # espera após um browser que não subiu (dobra a cada falha)
+RELAUNCH_RETRY_MAX_S = 120.0
+
+
+class BrowserUnavailable(Exception):
+    """Raised to rendered fetches while every browser of the pool is down and relaunching fails."""
+
+
+_NO_BROWSER = None  # marcador na fila de contextos: pool sem nenhum browser
+
+
+class _Browser:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages = 0
+        self.live_contexts = 0
+        self.retiring = False
+
+    @property
+    def usable(self) -> bool:
+        return not self.retiring and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless Chromium browsers for rendered fetches:
+    `browsers` processes with `contexts` contexts each, so up to
+    browsers x contexts pages render at once. A browser is replaced after
+    `recycle_after` pages or as soon as it crashes; a replacement that
+    fails to launch is retried in the background with backoff, and while
+    no browser is left rendered fetches fail with BrowserUnavailable
+    instead of waiting.
+
+    Playwright runs on its own event loop in a background thread, started
+    on the first fetch, so rendering overlaps the HTTP fetches of both
+    engines: fetch() blocks the calling thread and fetch_async() awaits
+    from any other event loop.
+    """
+
+    def __init__(
+        self,
+        browsers: int = DEFAULT_BROWSERS,
+        contexts: int = DEFAULT_CONTEXTS,
+        recycle_after: int = DEFAULT_RECYCLE_AFTER,
+        wait: str = "settle",
+        quiet_ms: int = DEFAULT_QUIET_MS,
+    ):
+        if wait not in WAIT_STRATEGIES:
+            raise ValueError(f"wait must be one of {WAIT_STRATEGIES}")
+        self.browsers = max(1, browsers)
+        self.contexts = max(1, contexts)
+        self.recycle_after = max(1, recycle_after)
+        self.wait = wait
+        self.quiet_ms = quiet_ms
+        self.stats = {"pages": 0, "recycled": 0, "crashed": 0, "launch_failed": 0}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pw: Optional[Playwright] = None
+        self._started: Optional[asyncio.Future] = None
+        self._idle: Optional["asyncio.Queue[Tuple[_Browser, BrowserContext]]"] = None
+        self._all: List[_Browser] = []
+        self._relaunching: Set[asyncio.Task] = set()
+        self._launch_error: Optional[BaseException] = None
+
+    # ---- API (qualquer thread) ----
+
+    def fetch(self, url: str, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> str:
+        return self._submit(self._render(url, timeout_ms)).result()
+
+    async def fetch_async(self, url: str, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> str:
+        return await asyncio.wrap_future(self._submit(self._render(url, timeout_ms)))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    def _submit(self, coro: Awaitable[str]) -> Future:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+                self._thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    # ---- dentro do loop do pool ----
+
+    async def _start(self) -> None:
+        self._idle = asyncio.Queue()
+        self._pw = await async_playwright().start()
+        for _ in range(self.browsers):
+            await self._launch()
+
+    async def _launch(self) -> None:
+        b = _Browser(await self._pw.chromium.launch(headless=True))
+        contexts = []
+        try:
+            for _ in range(self.contexts):
+                ctx = await b.browser.new_context(
+                    user_agent=DEFAULT_HEADERS["User-Agent"],
+                    service_workers="block",  # service workers escapam do route()
+                )
+                await ctx.route("**/*", self._route)
+                contexts.append(ctx)
+        except BaseException:
+            with suppress(Error):
+                await b.browser.close()
+            raise
+        # só entra no pool inteiro: um browser pela metade não fica com contextos na fila
+        self._all.append(b)
+        b.live_contexts = len(contexts)
+        for ctx in contexts:
+            self._idle.put_nowait((b, ctx))
+        self._launch_error = None
+
+    async def _relaunch(self) -> None:
+        """Replace a retired browser, retrying with backoff while the launch fails."""
+        delay = RELAUNCH_RETRY_S
+        while True:
+            try:
+                await self._launch()
+                return
+            except Exception as e:
+                self.stats["launch_failed"] += 1
+                print(f"[RENDER] browser launch failed ({e}); retrying in {delay:.0f}s")
+                if not self._all and self._launch_error is None:
+                    self._idle.put_nowait(_NO_BROWSER)  # acorda quem espera: sem browser, falha já
+                self._launch_error = e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RELAUNCH_RETRY_MAX_S)
+
+    @staticmethod
+    async def _route(route: Route) -> None:
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _acquire(self) -> Tuple[_Browser, BrowserContext]:
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._start())
+        await self._started  # chamadas concorrentes esperam o mesmo start
+        while True:
+            item = await self._idle.get()
+            if item is _NO_BROWSER:
+                if self._all:
+                    continue  # um browser voltou depois do aviso
+                self._idle.put_nowait(item)  # o próximo da fila também falha
+                raise BrowserUnavailable(f"no browser available: {self._launch_error}")
+            b, ctx = item
+            if b.usable:
+                return b, ctx
+            await self._retire(b, ctx)
+
+    async def _release(self, b: _Browser, ctx: BrowserContext) -> None:
+        if b.usable and b.pages < self.recycle_after:
+            self._idle.put_nowait((b, ctx))
+        else:
+            await self._retire(b, ctx)
+
+    async def _retire(self, b: _Browser, ctx: BrowserContext) -> None:
+        """Drop one context of a recycled/crashed browser; the last one out replaces the browser."""
+        if not b.retiring:
+            b.retiring = True
+            self.stats["recycled" if b.browser.is_connected() else "crashed"] += 1
+        with suppress(Error):
+            await ctx.close()
+        b.live_contexts -= 1
+        if b.live_contexts == 0:
+            with suppress(Error):
+                await b.browser.close()
+            self._all.remove(b)
+            # em segundo plano: uma falha ao subir o substituto não vira o erro da página que já renderizou
+            task = asyncio.ensure_future(self._relaunch())
+            self._relaunching.add(task)
+            task.add_done_callback(self._relaunching.discard)
+
+    async def _render(self, url: str, timeout_ms: int) -> str:
+        b, ctx = await self._acquire()
+        try:
+            page = await ctx.new_page()
+            try:
+                return await self._load(page, url, timeout_ms)
+            finally:
+                with suppress(Error):
+                    await page.close()
+        finally:
+            b.pages += 1
+            self.stats["pages"] += 1
+            await self._release(b, ctx)
+
+    async def _load(self, page: Page, url: str, timeout_ms: int) -> str:
+        if self.wait != "settle":
+            await page.goto(url, timeout=timeout_ms, wait_until=self.wait)
+            return await page.content()
+
+        loop = asyncio.get_running_loop()
+        net = {"inflight": 0, "last": loop.time()}
+
+        def started(_) -> None:
+            net["inflight"] += 1
+            net["last"] = loop.time()
+
+        def ended(_) -> None:
+            net["inflight"] -= 1
+            net["last"] = loop.time()
+
+        page.on("request", started)
+        page.on("requestfinished", ended)
+        page.on("requestfailed", ended)  # inclui os bloqueados
+
+        await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+        quiet = self.quiet_ms / 1000
+        deadline = loop.time() + min(SETTLE_MAX_MS, timeout_ms) / 1000
+        while loop.time() < deadline:
+            if net["inflight"] <= 0 and loop.time() - net["last"] >= quiet:
+                break
+            await asyncio.sleep(0.05)
+        return await page.content()
+
+    async def _shutdown(self) -> None:
+        for task in list(self._relaunching):
+            task.cancel()
+        for b in self._all:
+            with suppress(Error):
+                await b.browser.close()
+        self._all.clear()
+        if self._pw is not None:
+            await self._pw.stop()
+            self._pw = None
+
+
+_pool = BrowserPool()
+
+
+def configure(
+    browsers: int = DEFAULT_BROWSERS,
+    contexts: int = DEFAULT_CONTEXTS,
+    recycle_after: int = DEFAULT_RECYCLE_AFTER,
+    wait: str = "settle",
+) -> BrowserPool:
+    """Replace the shared pool (browsers are only launched on the first rendered fetch)."""
+    global _pool
+    _pool.close()
+    _pool = BrowserPool(browsers=browsers, contexts=contexts, recycle_after=recycle_after, wait=wait)
+    return _pool
+
+
+def pool() -> BrowserPool:
+    return _pool
+
+
+def fetch_rendered_html(url: str, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> str:
+    return _pool.fetch(url, timeout_ms)
+
+
+async def fetch_rendered_html_async(url: str, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> str:
+    return await _pool.fetch_async(url, timeout_ms)
@@ -1,14 +1,204 @@
+import asyncio
+import threading
 import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Set
+
+from scraper import metrics
+from scraper.scheduler import host_of
+
+THROTTLE_STATUSES = {429, 503}
+
+DECREASE_THROTTLED = 0.5    # 429/503/timeout: taxa pela metade
+DECREASE_SLOW = 0.8         # pico de latência: corte mais suave
+SLOW_FACTOR = 3.0           # latência > 3x a média móvel...
+SLOW_FLOOR_S = 2.0          # ...e acima de 2 s conta como pico
+LATENCY_ALPHA = 0.2         # peso da amostra nova na média móvel
+MIN_RATE = 1 / 60           # nunca abaixo de 1 requisição por minuto
+UNLIMITED_RESTART_RATE = 2.0  # host sem limite que começou a reclamar
+UNLIMITED_CEILING = 50.0      # acima disso volta a ficar sem limite
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After as seconds from now (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class _HostState:
+    def __init__(self, rate: Optional[float], burst: int):
+        self.max_rate = rate        # None = sem limite
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.crawl_delay: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.last_cut = float("-inf")
+        self.stats = {"requests": 0, "throttled": 0, "slow": 0, "wait_s": 0.0}
+
 
 class RateLimiter:
-    def __init__(self, min_interval_s: float = 0.8):
-        self.min_interval_s = min_interval_s
-        self._last = 0.0
-
-    def wait(self):
-        now = time.time()
-        elapsed = now - self._last
-        sleep_for = self.min_interval_s - elapsed
-        if sleep_for > 0:
-            time.sleep(sleep_for)
-        self._last = time.time()
\ No newline at end of file
+    """
+    Per-host token bucket with AIMD adaptation, on the monotonic clock.
+
+    Each host starts at one request every `min_interval_s` (0 = unlimited)
+    with a burst of `burst`, capped by its robots.txt Crawl-delay. 429/503,
+    timeouts and latency spikes cut the host's rate multiplicatively (once
+    per request interval, so a burst of errors counts as one), and
+    a Retry-After blocks the host until it expires; every healthy response
+    adds `increase` requests/s back, up to the starting rate.
+
+    reserve() only does bookkeeping under a lock and returns how long the
+    caller must wait, so acquire() (threads) and acquire_async() (asyncio)
+    share the same state and never sleep while holding the lock.
+    """
+
+    def __init__(self, min_interval_s: float = 0.8, burst: int = 1, increase: float = 0.1, robots=None):
+        self.base_rate = 1.0 / min_interval_s if min_interval_s > 0 else None
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.robots = robots  # RobotsCache opcional (Crawl-delay)
+        self._hosts: Dict[str, _HostState] = {}
+        self._robots_done: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = _HostState(self.base_rate, self.burst)
+        return st
+
+    def _max_rate(self, st: _HostState) -> Optional[float]:
+        if st.crawl_delay:
+            robots_rate = 1.0 / st.crawl_delay
+            return robots_rate if st.max_rate is None else min(st.max_rate, robots_rate)
+        return st.max_rate
+
+    def needs_robots(self, url: str, host: str) -> bool:
+        if self.robots is None or url.endswith("/robots.txt"):  # o próprio robots.txt não espera por ele
+            return False
+        with self._lock:
+            return host not in self._robots_done
+
+    def set_crawl_delay(self, host: str, delay: Optional[float]) -> None:
+        with self._lock:
+            self._robots_done.add(host)
+            st = self._state(host)
+            st.crawl_delay = delay if delay and delay > 0 else None
+            cap = self._max_rate(st)
+            if cap is not None and (st.rate is None or st.rate > cap):
+                st.rate = cap
+
+    def reserve(self, host: str, consume: bool = True) -> float:
+        """Take a token (or just wait out a Retry-After block); returns the seconds to wait."""
+        with self._lock:
+            st = self._state(host)
+            now = time.monotonic()
+            delay = max(0.0, st.blocked_until - now)
+            if consume:
+                st.stats["requests"] += 1
+                if st.rate is not None:
+                    st.tokens = min(st.burst, st.tokens + (now - st.updated) * st.rate)
+                    st.updated = now
+                    st.tokens -= 1  # negativo = fila: a espera cobre a dívida
+                    if st.tokens < 0:
+                        delay = max(delay, -st.tokens / st.rate)
+            st.stats["wait_s"] += delay
+        return delay
+
+    def _prepare(self, url: str, consume: bool) -> str:
+        host = host_of(url)
+        # sem token (imagens, quase sempre de CDNs) o Crawl-delay não conta: nada de buscar robots.txt
+        if consume and self.needs_robots(url, host):
+            self.set_crawl_delay(host, self.robots.crawl_delay(url))
+        return host
+
+    async def _prepare_async(self, url: str, consume: bool) -> str:
+        host = host_of(url)
+        if consume and self.needs_robots(url, host):
+            self.set_crawl_delay(host, await self.robots.crawl_delay_async(url))
+        return host
+
+    def acquire(self, url: str, consume: bool = True) -> None:
+        delay = self.reserve(self._prepare(url, consume), consume)
+        if delay > 0:
+            time.sleep(delay)
+            metrics.add("rate_wait", delay)
+
+    async def acquire_async(self, url: str, consume: bool = True) -> None:
+        delay = self.reserve(await self._prepare_async(url, consume), consume)
+        if delay > 0:
+            await asyncio.sleep(delay)
+            metrics.add("rate_wait", delay)
+
+    def feedback(
+        self,
+        url: str,
+        status: Optional[int],
+        latency_s: Optional[float] = None,
+        retry_after: Optional[str] = None,
+    ) -> None:
+        """Report a response (status None = timeout) and adapt the host's rate."""
+        host = host_of(url)
+        with self._lock:
+            st = self._state(host)
+            now = time.monotonic()
+            wait = parse_retry_after(retry_after)
+            if wait is not None:
+                st.blocked_until = max(st.blocked_until, now + wait)
+
+            throttled = status is None or status in THROTTLE_STATUSES
+            slow = (
+                latency_s is not None and st.latency is not None
+                and latency_s > max(SLOW_FACTOR * st.latency, SLOW_FLOOR_S)
+            )
+            if latency_s is not None:
+                st.latency = latency_s if st.latency is None else (
+                    LATENCY_ALPHA * latency_s + (1 - LATENCY_ALPHA) * st.latency
+                )
+
+            if throttled or slow:
+                st.stats["throttled" if throttled else "slow"] += 1
+                current = st.rate if st.rate is not None else UNLIMITED_RESTART_RATE
+                # respostas da mesma rajada chegam juntas: no máximo um corte por intervalo
+                if now - st.last_cut >= 1.0 / current:
+                    factor = DECREASE_THROTTLED if throttled else DECREASE_SLOW
+                    st.rate = max(MIN_RATE, current * factor)
+                    st.tokens = min(st.tokens, 0.0)  # sem rajada logo depois de um corte
+                    st.updated = st.last_cut = now
+            elif status is not None and status < 400 and st.rate is not None:
+                cap = self._max_rate(st)
+                st.rate += self.increase
+                if cap is not None:
+                    st.rate = min(st.rate, cap)
+                elif st.rate >= UNLIMITED_CEILING:
+                    st.rate = None
+
+    def host_stats(self, host: str) -> Dict[str, object]:
+        with self._lock:
+            st = self._hosts.get(host)
+            if st is None:
+                return {}
+            return {
+                **st.stats,
+                "wait_s": round(st.stats["wait_s"], 3),
+                "rate": round(st.rate, 3) if st.rate is not None else None,
+                "crawl_delay": st.crawl_delay,
+                "latency_s": round(st.latency, 3) if st.latency is not None else None,
+            }
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            hosts = list(self._hosts)
+        return {h: self.host_stats(h) for h in hosts}
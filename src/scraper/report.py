@@ -1,7 +1,11 @@
 import csv
+import json
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+from scraper.io_utils import open_output
+from scraper.metrics import REPORT_COLUMNS, JobMetrics
 
 
 @dataclass
@@ -10,17 +14,70 @@ class ReportRow:
     status: str  # "ok" | "error"
     output_dir: str
     error: str = ""
+    host: str = ""
+    rate_wait_s: float = 0.0  # tempo parado no rate limiter
+    host_rate: str = ""       # taxa atual do host (req/s) após esta URL
+    host_throttled: int = 0   # 429/503/timeouts do host até aqui
+    attempts: int = 1
+    # erro transitório: espera mínima (s) antes de tentar de novo; None = definitivo (não vai ao CSV)
+    retry_after: Optional[float] = None
+    metrics: Optional[JobMetrics] = None  # tempos por etapa (colunas REPORT_COLUMNS)
+
+
+REPORT_HEADERS = [
+    "url", "status", "output_dir", "error", "attempts", "host", "rate_wait_s", "host_rate", "host_throttled",
+    *REPORT_COLUMNS,
+]
+_NO_TIMINGS = dict.fromkeys(REPORT_COLUMNS, "")
+
+
+class ReportWriter:
+    """
+    report.csv written as results arrive: one flushed row per URL, so the
+    report of a long run that crashes is complete up to the crash.
+    append=True (resume) adds to the report of the previous run instead of
+    replacing it; a report with other columns is rotated to report-N.csv.
+    """
+
+    def __init__(self, path: Path, append: bool = False):
+        self._f, new = open_output(path, append, newline="", header=REPORT_HEADERS)
+        self._writer = csv.DictWriter(self._f, fieldnames=REPORT_HEADERS)
+        if new:
+            self._writer.writeheader()
+        self._f.flush()
+
+    def write(self, r: ReportRow) -> None:
+        self._writer.writerow({
+            "url": r.url,
+            "status": r.status,
+            "output_dir": r.output_dir,
+            "error": r.error,
+            "attempts": r.attempts,
+            "host": r.host,
+            "rate_wait_s": r.rate_wait_s,
+            "host_rate": r.host_rate,
+            "host_throttled": r.host_throttled,
+            **(r.metrics.columns() if r.metrics is not None else _NO_TIMINGS),
+        })
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
 
 def write_report_csv(path: Path, rows: List[ReportRow]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["url", "status", "output_dir", "error"])
-        writer.writeheader()
+    with ReportWriter(path) as writer:
         for r in rows:
-            writer.writerow({
-                "url": r.url,
-                "status": r.status,
-                "output_dir": r.output_dir,
-                "error": r.error,
-            })
\ No newline at end of file
+            writer.write(r)
+
+
+def write_summary_json(path: Path, summary: Dict[str, Any]) -> None:
+    """Run-level counters (image store, HTTP cache, ...) next to report.csv."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
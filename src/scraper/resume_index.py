@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+from scraper.urls import canonical_url
+
+COMMIT_EVERY = 256      # registros por transação
+COMMIT_INTERVAL_S = 1.0  # ou a cada segundo, o que vier primeiro
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url_key        TEXT PRIMARY KEY,
+    url            TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    first_seen     REAL NOT NULL,
+    updated_at     REAL NOT NULL,
+    content_sha256 TEXT NOT NULL DEFAULT '',
+    output_dir     TEXT NOT NULL DEFAULT '',
+    error          TEXT NOT NULL DEFAULT ''
+)
+"""
+
+
+@dataclass
+class IndexEntry:
+    url: str
+    status: str  # "ok" | "error"
+    first_seen: float
+    updated_at: float
+    content_sha256: str
+    output_dir: str
+    error: str
+
+
+class ResumeIndex:
+    """
+    Persistent completion index (SQLite) keyed by canonical URL, with the
+    latest status, first/last processing time and content hash of every
+    URL. Lookups are primary-key reads, so resume checks do not depend on
+    the input order or the output layout.
+
+    Writes are batched into one transaction every COMMIT_EVERY records or
+    COMMIT_INTERVAL_S seconds; a crash loses at most the last batch, and
+    those URLs are simply processed again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def lookup(self, url: str) -> Optional[IndexEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, first_seen, updated_at, content_sha256, output_dir, error"
+                " FROM urls WHERE url_key = ?",
+                (canonical_url(url),),
+            ).fetchone()
+        return IndexEntry(*row) if row else None
+
+    def should_process(self, url: str, retry_errors: bool = False, max_age_s: Optional[float] = None) -> bool:
+        """
+        Resume decision for one URL:
+        - default: process unless it already succeeded;
+        - retry_errors: process only URLs whose last attempt failed;
+        - max_age_s: successes older than this are processed again.
+        """
+        entry = self.lookup(url)
+        if retry_errors:
+            return entry is not None and entry.status == "error"
+        if entry is None or entry.status != "ok":
+            return True
+        return max_age_s is not None and time.time() - entry.updated_at > max_age_s
+
+    def record(self, url: str, status: str, output_dir: str = "", content_sha256: str = "", error: str = "") -> None:
+        now = time.time()
+        with self._lock:
+            if self._pending == 0:
+                self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT INTO urls (url_key, url, status, first_seen, updated_at, content_sha256, output_dir, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(url_key) DO UPDATE SET url = excluded.url, status = excluded.status,"
+                " updated_at = excluded.updated_at, content_sha256 = excluded.content_sha256,"
+                " output_dir = excluded.output_dir, error = excluded.error",
+                (canonical_url(url), url, status, now, now, content_sha256, output_dir, error),
+            )
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_INTERVAL_S:
+                self._commit()
+
+    def merge(self, sources: Sequence[Path]) -> None:
+        """
+        Fold other indexes (e.g. the outputs of sharded runs) into this one:
+        per URL the most recent attempt wins and first_seen is the earliest.
+        source_of() then tells which source each winning entry came from.
+        """
+        with self._lock:
+            self._commit()
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS origin (url_key TEXT PRIMARY KEY, source INTEGER NOT NULL)")
+            for i, path in enumerate(sources):
+                self._db.execute("ATTACH DATABASE ? AS src", (str(path),))
+                try:
+                    self._db.execute("BEGIN")
+                    # origem antes do upsert: compara com o que o índice tinha até aqui
+                    self._db.execute(
+                        "INSERT INTO origin (url_key, source)"
+                        " SELECT s.url_key, ? FROM src.urls s LEFT JOIN main.urls m USING (url_key)"
+                        " WHERE m.url_key IS NULL OR s.updated_at > m.updated_at"
+                        " ON CONFLICT(url_key) DO UPDATE SET source = excluded.source",
+                        (i,),
+                    )
+                    newer = "excluded.updated_at > urls.updated_at"
+                    self._db.execute(
+                        "INSERT INTO main.urls (url_key, url, status, first_seen, updated_at, content_sha256, output_dir, error)"
+                        " SELECT url_key, url, status, first_seen, updated_at, content_sha256, output_dir, error"
+                        " FROM src.urls WHERE true"
+                        " ON CONFLICT(url_key) DO UPDATE SET first_seen = min(urls.first_seen, excluded.first_seen),"
+                        + ",".join(
+                            f" {col} = CASE WHEN {newer} THEN excluded.{col} ELSE urls.{col} END"
+                            for col in ("url", "status", "content_sha256", "output_dir", "error", "updated_at")
+                        )
+                    )
+                    self._db.execute("COMMIT")
+                finally:
+                    self._db.execute("DETACH DATABASE src")
+
+    def source_of(self, url: str) -> Optional[int]:
+        """Position in merge()'s sources of the entry kept for `url` (None = not merged)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT source FROM origin WHERE url_key = ?", (canonical_url(url),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _commit(self) -> None:
+        if self._pending:
+            self._db.execute("COMMIT")
+            self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._db.close()
@@ -0,0 +1,251 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from scraper import async_http_client, http_client
+from scraper.dns_cache import HostUnresolvable
+from scraper.rate_limiter import parse_retry_after
+from scraper.scheduler import IDLE, Wait, host_of
+
+RETRY_STATUSES = {429, 502, 503, 504}
+# respostas que contam como "host fora do ar" para o disjuntor; 429 e 503 com
+# Retry-After são "ocupado, volte depois": ficam com o rate limiter
+HOST_FAILURE_STATUSES = {500, 502, 503, 504}
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_S = 5.0
+DEFAULT_BACKOFF_CAP_S = 300.0
+
+DEFAULT_BREAKER_THRESHOLD = 5     # falhas seguidas para abrir
+DEFAULT_BREAKER_COOLDOWN_S = 30.0  # dobra a cada sonda que falha...
+BREAKER_MAX_COOLDOWN_S = 600.0     # ...até 10 min
+
+
+class HostUnavailable(Exception):
+    """Raised instead of a request while the host's circuit breaker is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"host {host} unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code
+    return None
+
+
+def retry_delay(exc: BaseException) -> Optional[float]:
+    """
+    Classify a failed fetch: None if retrying cannot help (4xx, parse
+    errors, ...), otherwise the minimum seconds to wait before the next
+    attempt (Retry-After, the breaker's cooldown, or 0).
+    """
+    if isinstance(exc, HostUnavailable):
+        return exc.retry_in
+    if isinstance(exc, HostUnresolvable):
+        # nome inexistente não volta a existir em minutos; timeout/SERVFAIL sim, depois do cache negativo
+        return exc.retry_in if exc.temporary else None
+    status = status_of(exc)
+    if status is not None:
+        if status not in RETRY_STATUSES:
+            return None
+        return parse_retry_after(exc.response.headers.get("Retry-After")) or 0.0
+    if isinstance(exc, http_client.RETRYABLE_EXCEPTIONS + async_http_client.RETRYABLE_EXCEPTIONS):
+        return 0.0
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter: attempt n waits base * 2**(n-1), +-50%, capped."""
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_s: float = DEFAULT_BACKOFF_S,
+        cap_s: float = DEFAULT_BACKOFF_CAP_S,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_s = base_s
+        self.cap_s = cap_s
+
+    def backoff(self, attempt: int, min_delay: float = 0.0) -> float:
+        delay = min(self.cap_s, self.base_s * 2 ** (attempt - 1))
+        return max(min_delay, delay * random.uniform(0.5, 1.5))
+
+
+class _Circuit:
+    def __init__(self, cooldown_s: float):
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown_s = cooldown_s
+        self.probing = 0  # ficha da requisição de teste em curso (0 = nenhuma)
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker. After `threshold` consecutive failures
+    (timeouts, connection errors, 5xx) the host is open: requests fail
+    fast with HostUnavailable for `cooldown_s`. Then one probe request is
+    let through (half open); success closes the circuit, failure reopens
+    it with twice the cooldown. A probe that ends without an outcome for
+    the host (an error that is neither a response nor a connection
+    failure) must be handed back with release(), or the host would stay
+    open for the rest of the run.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_BREAKER_THRESHOLD, cooldown_s: float = DEFAULT_BREAKER_COOLDOWN_S):
+        self.threshold = max(1, threshold)
+        self.cooldown_s = cooldown_s
+        self.stats = {"opened": 0, "fast_failed": 0}
+        self._hosts: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+        self._probes = itertools.count(1)
+
+    def check(self, url: str) -> int:
+        """
+        Raise HostUnavailable while the host is open. Returns a probe token
+        when this request is the half-open probe (0 otherwise), to pass to
+        release() once the request is over.
+        """
+        host = host_of(url)
+        with self._lock:
+            c = self._hosts.get(host)
+            if c is None or c.failures < self.threshold:
+                return 0
+            now = time.monotonic()
+            if now >= c.open_until and not c.probing:
+                c.probing = next(self._probes)  # meio aberto: só esta requisição passa
+                return c.probing
+            self.stats["fast_failed"] += 1
+            retry_in = max(c.open_until - now, 0.0) or c.cooldown_s
+        raise HostUnavailable(host, retry_in)
+
+    def release(self, url: str, probe: int) -> None:
+        """
+        End of a request let through by check(): if it was the probe and
+        no outcome was recorded for it, the next request probes instead.
+        """
+        if not probe:
+            return
+        with self._lock:
+            c = self._hosts.get(host_of(url))
+            if c is not None and c.probing == probe:
+                c.probing = 0
+
+    def record(self, url: str, ok: bool) -> None:
+        host = host_of(url)
+        with self._lock:
+            c = self._hosts.get(host)
+            if ok:
+                if c is not None:
+                    del self._hosts[host]
+                return
+            if c is None:
+                c = self._hosts[host] = _Circuit(self.cooldown_s)
+            if c.probing:
+                c.probing = 0
+                c.cooldown_s = min(c.cooldown_s * 2, BREAKER_MAX_COOLDOWN_S)
+            c.failures += 1
+            if c.failures >= self.threshold:
+                if c.open_until <= time.monotonic():
+                    self.stats["opened"] += 1
+                c.open_until = time.monotonic() + c.cooldown_s
+
+    def record_status(self, url: str, status: Optional[int], retry_after: Optional[str] = None) -> None:
+        """Feed a response status (None = timeout/connection error) into the breaker."""
+        down = status is None or (status in HOST_FAILURE_STATUSES and not (status == 503 and retry_after))
+        self.record(url, not down)
+
+    def open_hosts(self) -> List[str]:
+        with self._lock:
+            return sorted(h for h, c in self._hosts.items() if c.failures >= self.threshold)
+
+
+Job = Tuple[str, str]
+
+
+class RetryQueue:
+    """
+    URLs whose fetch failed with a retryable error, deferred to later in
+    the run instead of sleeping in the worker. wrap() interleaves them
+    with the input as their backoff expires; once the input is exhausted
+    it yields scheduler.IDLE while other jobs are still running and a
+    scheduler.Wait until the next backoff expires when a deferred URL is
+    all that is left (the scheduler sleeps; wrap() never blocks).
+
+    Every consumed result must go through defer() or done(), so it knows
+    when the scheduler has nothing in flight.
+    """
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.stats = {"deferred": 0, "recovered": 0, "gave_up": 0}
+        self._attempts: Dict[str, int] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._outstanding = 0
+
+    def attempts(self, url: str) -> int:
+        return self._attempts.get(url, 0) + 1
+
+    def defer(self, url: str, min_delay: float) -> bool:
+        """
+        Consume a failed result by scheduling another attempt; False (and
+        nothing consumed) when the URL is out of attempts.
+        """
+        attempt = self.attempts(url)
+        if attempt >= self.policy.max_attempts:
+            return False
+        self._attempts[url] = attempt
+        due = time.monotonic() + self.policy.backoff(attempt, min_delay)
+        heapq.heappush(self._heap, (due, self._seq, url))
+        self._seq += 1
+        self._outstanding -= 1
+        self.stats["deferred"] += 1
+        return True
+
+    def done(self, url: str, ok: bool) -> None:
+        """Consume a final result (every job's result ends in defer() or here)."""
+        self._outstanding -= 1
+        if self._attempts.pop(url, None) is not None:
+            self.stats["recovered" if ok else "gave_up"] += 1
+
+    def _pop_due(self) -> Optional[str]:
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def _wait_next(self) -> Wait:
+        return Wait(self._heap[0][0])
+
+    def wrap(self, jobs: Iterable[Union[Job, object]]) -> Iterator[Union[Job, object]]:
+        for job in jobs:
+            url = self._pop_due()
+            while url is not None:
+                self._outstanding += 1
+                yield url, ""
+                url = self._pop_due()
+            if job is IDLE and self._outstanding == 0 and self._heap:
+                # a entrada espera por URLs adiadas (crawl): nada mais vai chegar antes delas;
+                # o scheduler dorme até a primeira vencer e pede de novo
+                yield self._wait_next()
+                continue
+            if job is not IDLE:
+                self._outstanding += 1
+            yield job
+
+        # jobs ainda em andamento podem ser adiados: só termina quando tudo acabou
+        while self._heap or self._outstanding:
+            url = self._pop_due()
+            if url is None:
+                yield IDLE if self._outstanding else self._wait_next()
+                continue
+            self._outstanding += 1
+            yield url, ""
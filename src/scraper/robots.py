@@ -0,0 +1,143 @@
+import asyncio
+import re
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ROBOTS_TIMEOUT_S = 10
+# nosso product token (RFC 9309): é ele, não o User-Agent inteiro, que um grupo do robots.txt nomeia
+ROBOTS_AGENT = "webscraperdownloader"
+_UNIT_S = {"": 1.0, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _robots_url(url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    return origin, origin + "/robots.txt"
+
+
+def _groups(text: str) -> List[Tuple[List[str], Dict[str, str]]]:
+    """robots.txt as (user agents, rules) groups; consecutive User-agent lines share a group."""
+    groups: List[Tuple[List[str], Dict[str, str]]] = []
+    agents: List[str] = []
+    rules: Dict[str, str] = {}
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        key = key.lower()
+        if key == "user-agent":
+            if rules:
+                groups.append((agents, rules))
+                agents, rules = [], {}
+            if value:
+                agents.append(value.lower())
+        elif agents:
+            rules.setdefault(key, value)
+    if agents:
+        groups.append((agents, rules))
+    return groups
+
+
+def _period_s(value: str) -> float:
+    """'10', '10s', '1m', '1h' in seconds."""
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", value.strip().lower())
+    if m is None:
+        raise ValueError(value)
+    return float(m.group(1)) * _UNIT_S[m.group(2)]
+
+
+def parse_crawl_delay(text: str, agent: str = ROBOTS_AGENT) -> Optional[float]:
+    """
+    Crawl-delay (or Request-rate) for our product token, in seconds between
+    requests: the group naming our agent wins over "*". A group matches
+    when our token starts with its User-agent value, compared without
+    case, as in RFC 9309. Fractional delays are accepted
+    (urllib.robotparser only reads whole seconds).
+    """
+    token = agent.lower()
+    chosen = None
+    for agents, rules in _groups(text):
+        if any(a != "*" and token.startswith(a) for a in agents):
+            chosen = rules
+            break
+        if chosen is None and "*" in agents:
+            chosen = rules
+    if not chosen:
+        return None
+    try:
+        if "crawl-delay" in chosen:
+            return max(0.0, float(chosen["crawl-delay"]))
+        if "request-rate" in chosen:
+            requests, period = chosen["request-rate"].split()[0].split("/")
+            return _period_s(period) / float(requests)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return None
+
+
+class RobotsCache:
+    """
+    Crawl-delay per origin, read from /robots.txt once per run. A missing
+    or unreadable robots.txt means no delay. Concurrent first requests to
+    the same origin share a single fetch.
+    """
+
+    def __init__(self):
+        self._delays: Dict[str, Optional[float]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, origin: str) -> Tuple[bool, Future]:
+        with self._lock:
+            if origin in self._delays:
+                fut: Future = Future()
+                fut.set_result(self._delays[origin])
+                return False, fut
+            fut = self._inflight.get(origin)
+            if fut is not None:
+                return False, fut
+            fut = self._inflight[origin] = Future()
+            return True, fut
+
+    def _resolve(self, origin: str, fut: Future, text: Optional[str]) -> Optional[float]:
+        delay = None
+        if text:
+            delay = parse_crawl_delay(text)
+        with self._lock:
+            self._delays[origin] = delay
+            self._inflight.pop(origin, None)
+        fut.set_result(delay)
+        return delay
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        from scraper import http_client
+
+        origin, robots_url = _robots_url(url)
+        owner, fut = self._claim(origin)
+        if not owner:
+            return fut.result()
+        text = None
+        try:
+            resp = http_client.get(robots_url, timeout_s=ROBOTS_TIMEOUT_S, rate_limit=False)
+            text = resp.text
+        except Exception:
+            pass  # sem robots.txt legível: sem Crawl-delay
+        return self._resolve(origin, fut, text)
+
+    async def crawl_delay_async(self, url: str) -> Optional[float]:
+        from scraper import async_http_client
+
+        origin, robots_url = _robots_url(url)
+        owner, fut = self._claim(origin)
+        if not owner:
+            return await asyncio.wrap_future(fut)
+        text = None
+        try:
+            resp = await async_http_client.get(robots_url, timeout_s=ROBOTS_TIMEOUT_S, rate_limit=False)
+            text = resp.text
+        except Exception:
+            pass
+        return self._resolve(origin, fut, text)
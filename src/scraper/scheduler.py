@@ -0,0 +1,194 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# item de entrada que significa "nada disponível agora": a admissão para até
+# o próximo job terminar (ex.: fronteira do crawl esperando novos links)
+IDLE = object()
+
+
+@dataclass(frozen=True)
+class Wait:
+    """
+    Input item meaning "nothing in flight and nothing before `until`
+    (time.monotonic())": the scheduler sleeps until then and asks again,
+    so the input never has to block its thread or event loop.
+    """
+
+    until: float
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+class HostScheduler:
+    """
+    Runs jobs on a thread pool with a global concurrency limit, plus a
+    per-host concurrency cap and a minimum interval between job starts on
+    the same host. Results are yielded in input order.
+
+    Input is pulled lazily: at most `window` jobs are admitted but not yet
+    yielded, so a slow host cannot make the buffer grow without bound.
+    Jobs whose host is None (e.g. resumed items) skip the per-host limits.
+    The input may yield IDLE when it has nothing yet but will have more once
+    a job's result has been consumed; it is asked again after that. A Wait
+    item makes the scheduler sleep until its time before asking again.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        per_host: int = 1,
+        min_interval_s: float = 0.8,
+        window: Optional[int] = None,
+    ):
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.min_interval_s = max(0.0, min_interval_s)
+        self.window = window or max(256, self.workers * 32)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T], host: Callable[[T], Optional[str]]) -> Iterator[R]:
+        it = iter(items)
+        exhausted = False
+        next_seq = 0  # próximo item admitido
+        emit_seq = 0  # próximo resultado a devolver
+
+        pending: Dict[Optional[str], Deque[Tuple[int, T]]] = {}
+        active: Dict[Optional[str], int] = {}
+        next_start: Dict[Optional[str], float] = {}
+        running: Dict[Future, Tuple[int, Optional[str]]] = {}
+        finished: Dict[int, Future] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                while not exhausted and next_seq - emit_seq < self.window:
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if item is IDLE:
+                        # sem nada em andamento, ninguém vai produzir mais itens
+                        exhausted = not (pending or running or finished)
+                        break
+                    if isinstance(item, Wait):
+                        time.sleep(max(0.0, item.until - time.monotonic()))
+                        continue
+                    pending.setdefault(host(item), deque()).append((next_seq, item))
+                    next_seq += 1
+
+                now = time.monotonic()
+                wake: Optional[float] = None
+                for h in list(pending):
+                    if len(running) >= self.workers:
+                        break
+                    queue = pending[h]
+                    while queue and len(running) < self.workers:
+                        if h is not None:
+                            if active.get(h, 0) >= self.per_host:
+                                break
+                            start_at = next_start.get(h, 0.0)
+                            if start_at > now:
+                                wake = start_at if wake is None else min(wake, start_at)
+                                break
+                            next_start[h] = now + self.min_interval_s
+                        seq, item = queue.popleft()
+                        running[pool.submit(fn, item)] = (seq, h)
+                        active[h] = active.get(h, 0) + 1
+                    if not queue:
+                        del pending[h]
+
+                while emit_seq in finished:
+                    yield finished.pop(emit_seq).result()
+                    emit_seq += 1
+
+                if exhausted and not pending and not running and not finished:
+                    return
+                if not running and wake is None:
+                    continue
+
+                timeout = None if wake is None else max(0.0, wake - time.monotonic())
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    seq, h = running.pop(fut)
+                    active[h] -= 1
+                    if not active[h]:
+                        del active[h]
+                    finished[seq] = fut
+
+
+class AsyncHostScheduler(HostScheduler):
+    """
+    asyncio version of HostScheduler: same limits and ordering, but jobs are
+    coroutines on one event loop, so `workers` can be in the thousands.
+    """
+
+    async def map(
+        self,
+        fn: Callable[[T], Awaitable[R]],
+        items: Iterable[T],
+        host: Callable[[T], Optional[str]],
+    ) -> AsyncIterator[R]:
+        slots = asyncio.Semaphore(self.workers)
+        host_slots: Dict[str, asyncio.Semaphore] = {}
+        host_users: Dict[str, int] = {}
+        next_start: Dict[str, float] = {}
+
+        async def run(item: T) -> R:
+            h = host(item)
+            if h is None:
+                async with slots:
+                    return await fn(item)
+
+            sem = host_slots.get(h)
+            if sem is None:
+                sem = host_slots[h] = asyncio.Semaphore(self.per_host)
+            host_users[h] = host_users.get(h, 0) + 1
+            try:
+                async with sem:
+                    now = time.monotonic()
+                    start_at = max(now, next_start.get(h, 0.0))
+                    next_start[h] = start_at + self.min_interval_s
+                    if start_at > now:
+                        await asyncio.sleep(start_at - now)
+                    async with slots:
+                        return await fn(item)
+            finally:
+                host_users[h] -= 1
+                if not host_users[h]:
+                    # host sem jobs na janela: libera o estado (exceto o intervalo)
+                    del host_users[h], host_slots[h]
+
+        window: Deque[asyncio.Task] = deque()
+        it = iter(items)
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(window) < self.window:
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if item is IDLE:
+                        exhausted = not window
+                        break
+                    if isinstance(item, Wait):
+                        # dorme no loop (e não dentro do gerador): prefetch de DNS, robots e miniaturas seguem
+                        await asyncio.sleep(max(0.0, item.until - time.monotonic()))
+                        continue
+                    window.append(asyncio.ensure_future(run(item)))
+                if not window:
+                    return
+                yield await window.popleft()
+        finally:
+            for task in window:
+                task.cancel()
@@ -0,0 +1,183 @@
+import csv
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from scraper.dedupe import SeenSet
+from scraper.exporter import DATA_CSV_HEADERS
+from scraper.report import REPORT_HEADERS
+from scraper.resume_index import ResumeIndex
+from scraper.scheduler import host_of
+from scraper.urls import canonical_url
+
+_DIR_NAME = re.compile(r"^shard-(\d+)-of-(\d+)$")
+
+
+def shard_of(host: str, count: int) -> int:
+    # hash estável entre processos e máquinas (hash() do Python é aleatorizado por processo)
+    digest = hashlib.blake2b(host.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    One of `count` disjoint slices of the input, by host: every URL of a
+    host lands on the same shard, so the per-host rate limit, robots.txt
+    and circuit breaker of that host all live on one node.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """'i/N' with 0 <= i < N."""
+        try:
+            index, count = (int(part) for part in spec.split("/"))
+        except ValueError:
+            raise ValueError(f"expected i/N, got {spec!r}") from None
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"expected i/N with 0 <= i < N, got {spec!r}")
+        return cls(index, count)
+
+    def owns(self, url: str) -> bool:
+        return shard_of(host_of(url), self.count) == self.index
+
+    @property
+    def dirname(self) -> str:
+        return f"shard-{self.index}-of-{self.count}"
+
+
+def find_shard_dirs(base: Path) -> Tuple[List[Path], List[int]]:
+    """
+    Shard outputs under `base` (shard-<i>-of-<N>/), in shard order, and the
+    indexes of the shards that are missing.
+    """
+    found: Dict[int, Path] = {}
+    counts = set()
+    for path in base.iterdir() if base.is_dir() else ():
+        m = _DIR_NAME.match(path.name)
+        if m and path.is_dir():
+            found[int(m.group(1))] = path
+            counts.add(int(m.group(2)))
+    if len(counts) > 1:
+        raise ValueError(f"{base}: shard outputs of different splits ({', '.join(f'of-{n}' for n in sorted(counts))})")
+    if not counts:
+        return [], []
+    count = counts.pop()
+    return [found[i] for i in sorted(found)], [i for i in range(count) if i not in found]
+
+
+def _csv_rows(path: Path) -> Iterator[Dict[str, str]]:
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+class _CsvOut:
+    def __init__(self, path: Path, headers: List[str]):
+        self._f = path.open("w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=headers, restval="", extrasaction="ignore")
+        self._writer.writeheader()
+        self.rows = 0
+
+    def write(self, row: Dict[str, str]) -> None:
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def merge_outputs(out_dir: Path, shard_dirs: Sequence[Path]) -> Dict[str, int]:
+    """
+    Combine the outputs of sharded runs into `out_dir`: resume.sqlite3,
+    report.csv, data.csv and data.jsonl.
+
+    The resume indexes are merged first (latest attempt per URL wins) and
+    decide which shard's rows are kept when a URL shows up in more than one
+    shard (e.g. after re-running with a different N), so the report, the
+    data files and the index describe the same results. Item folders,
+    images and packs stay in the shard directories the rows point to.
+    Memory stays flat: rows are streamed and seen URLs are kept in a
+    SeenSet.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats = {"shards": len(shard_dirs), "report_rows": 0, "data_rows": 0, "jsonl_rows": 0, "dropped_rows": 0}
+
+    index = ResumeIndex(out_dir / "resume.sqlite3")
+    index.merge([d / "resume.sqlite3" for d in shard_dirs if (d / "resume.sqlite3").exists()])
+    sources = {d: i for i, d in enumerate(d for d in shard_dirs if (d / "resume.sqlite3").exists())}
+
+    def wins(url: str, shard_dir: Path) -> bool:
+        source = index.source_of(url)
+        return source is None or source == sources.get(shard_dir)
+
+    def keep(seen: SeenSet, url: str, shard_dir: Path) -> bool:
+        if wins(url, shard_dir) and not seen.add(canonical_url(url)):
+            return True
+        stats["dropped_rows"] += 1
+        return False
+
+    try:
+        # report: primeiro os resultados (ok/erro); depois skipped/duplicate das URLs que não tiveram resultado
+        seen = SeenSet()
+        report = _CsvOut(out_dir / "report.csv", REPORT_HEADERS)
+        try:
+            for final in (True, False):
+                for d in shard_dirs:
+                    for row in _csv_rows(d / "report.csv"):
+                        if (row.get("status") in ("ok", "error")) != final:
+                            continue
+                        if final and not wins(row["url"], d):
+                            stats["dropped_rows"] += 1
+                        elif not seen.add(canonical_url(row["url"])):
+                            report.write(row)
+                        elif final:
+                            stats["dropped_rows"] += 1
+            stats["report_rows"] = report.rows
+        finally:
+            report.close()
+            seen.close()
+
+        if any((d / "data.csv").exists() for d in shard_dirs):
+            seen = SeenSet()
+            data = _CsvOut(out_dir / "data.csv", DATA_CSV_HEADERS)
+            try:
+                for d in shard_dirs:
+                    for row in _csv_rows(d / "data.csv"):
+                        if keep(seen, row["url"], d):
+                            data.write(row)
+                stats["data_rows"] = data.rows
+            finally:
+                data.close()
+                seen.close()
+
+        if any((d / "data.jsonl").exists() for d in shard_dirs):
+            seen = SeenSet()
+            try:
+                with (out_dir / "data.jsonl").open("w", encoding="utf-8") as out:
+                    for d in shard_dirs:
+                        path = d / "data.jsonl"
+                        if not path.exists():
+                            continue
+                        with path.open("r", encoding="utf-8") as f:
+                            for line in f:
+                                try:
+                                    url = json.loads(line)["url"]
+                                except (ValueError, KeyError):
+                                    continue  # linha truncada por um crash
+                                if keep(seen, url, d):
+                                    out.write(line if line.endswith("\n") else line + "\n")
+                                    stats["jsonl_rows"] += 1
+            finally:
+                seen.close()
+    finally:
+        index.close()
+    return stats
+
@@ -1,5 +1,6 @@
+import asyncio
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 
 @dataclass
@@ -19,8 +20,33 @@ class ExtractedItem:
 
 
 class BaseExtractor:
+    # True quando fetch()/parse_bytes() estão implementados e o parse pode
+    # rodar em outro processo
+    can_offload_parse = False
+
     def supports(self, url: str) -> bool:
         raise NotImplementedError
 
+    def fetch(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """Raw body and declared encoding (None if unknown)."""
+        raise NotImplementedError
+
+    async def fetch_async(self, url: str) -> Tuple[bytes, Optional[str]]:
+        return await asyncio.to_thread(self.fetch, url)
+
+    def parse_bytes(self, url: str, body: bytes, encoding: Optional[str]) -> ExtractedItem:
+        raise NotImplementedError
+
     def extract(self, url: str) -> ExtractedItem:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    async def extract_async(self, url: str) -> ExtractedItem:
+        # extratores só síncronos rodam numa thread no engine async
+        return await asyncio.to_thread(self.extract, url)
+
+    def extract_streaming(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        # sem suporte a streaming: extração normal
+        return self.extract(url)
+
+    async def extract_streaming_async(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        return await self.extract_async(url)
\ No newline at end of file
@@ -1,35 +1,192 @@
-from typing import List, Optional, Dict
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin
 
+import requests
 from bs4 import BeautifulSoup
+from requests.utils import get_encoding_from_headers
 
-from scraper.http_client import get
+from scraper import async_http_client, metrics
+from scraper.http_client import download, get
 from scraper.sites.base import BaseExtractor, ExtractedItem
+from scraper.sites.html_scan import PageScan, ScanFeeder, StreamingScan, joined, scan_html
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def _dedupe(urls: Iterable[str]) -> List[str]:
+    # remove duplicados preservando ordem
+    return list(dict.fromkeys(urls))
+
+
+class _StreamTimer:
+    """Splits a streamed read into network wait ("download") and incremental parsing ("parse")."""
+
+    __slots__ = ("start", "parse_s", "size")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.parse_s = 0.0
+        self.size = 0
+
+    def feed(self, feeder: ScanFeeder, chunk: bytes) -> bool:
+        self.size += len(chunk)
+        t = time.perf_counter()
+        more = feeder.feed(chunk)
+        self.parse_s += time.perf_counter() - t
+        return more
+
+    def done(self) -> None:
+        total = time.perf_counter() - self.start
+        metrics.add("download", total - self.parse_s, self.start)
+        metrics.add("parse", self.parse_s)
+        metrics.count("html_bytes", self.size)
 
 
 class GenericHtmlExtractor(BaseExtractor):
+    can_offload_parse = True
 
-    def __init__(self, max_images: int = 20, max_links: int = 30, text_preview_limit: int = 700):
+    def __init__(self, max_images: int = 20, max_links: int = 30, text_preview_limit: int = 700, parser: str = "lxml"):
         self.max_images = max_images
         self.max_links = max_links
         self.text_preview_limit = text_preview_limit
+        self.parser = parser  # "lxml" (uma passada) ou "html.parser" (BeautifulSoup)
 
     def supports(self, url: str) -> bool:
         return True  # fallback
 
     def extract(self, url: str) -> ExtractedItem:
-        html = get(url).text
+        resp = get(url)
+        metrics.count("html_bytes", len(resp.content))
+        return self.parse(url, resp.text)
+
+    async def extract_async(self, url: str) -> ExtractedItem:
+        resp = await async_http_client.get(url)
+        metrics.count("html_bytes", len(resp.content))
+        return self.parse(url, resp.text)
+
+    def fetch(self, url: str) -> Tuple[bytes, Optional[str]]:
+        resp = get(url)
+        metrics.count("html_bytes", len(resp.content))
+        return resp.content, resp.encoding
+
+    async def fetch_async(self, url: str) -> Tuple[bytes, Optional[str]]:
+        resp = await async_http_client.get(url)
+        metrics.count("html_bytes", len(resp.content))
+        return resp.content, resp.encoding
+
+    def parse_bytes(self, url: str, body: bytes, encoding: Optional[str]) -> ExtractedItem:
+        # mesma decodificação do resp.text (inclusive o palpite quando não há charset)
+        resp = requests.Response()
+        resp._content = body
+        resp.encoding = encoding
+        return self.parse(url, resp.text)
+
+    def extract_streaming(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        """
+        Feed the body into the parser as it arrives and stop reading once
+        the limits are satisfied or max_body_bytes have been read.
+        """
+        scan = self._streaming_scan(url)
+        with download(url) as resp:
+            feeder = ScanFeeder(scan, encoding=resp.encoding, max_bytes=max_body_bytes)
+            timer = _StreamTimer()
+            for chunk in resp.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if chunk and not timer.feed(feeder, chunk):
+                    break
+            timer.done()
+        with metrics.stage("parse"):
+            return self._parse_scan(url, feeder.close())
+
+    async def extract_streaming_async(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        scan = self._streaming_scan(url)
+        async with async_http_client.download(url) as resp:
+            feeder = ScanFeeder(scan, encoding=get_encoding_from_headers(resp.headers), max_bytes=max_body_bytes)
+            timer = _StreamTimer()
+            async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                if chunk and not timer.feed(feeder, chunk):
+                    break
+            timer.done()
+        with metrics.stage("parse"):
+            return self._parse_scan(url, feeder.close())
+
+    def _streaming_scan(self, url: str) -> StreamingScan:
+        return StreamingScan(
+            base_url=url,
+            max_images=self.max_images,
+            max_links=self.max_links,
+            text_limit=self.text_preview_limit,
+        )
+
+    def parse(self, url: str, html: str) -> ExtractedItem:
+        with metrics.stage("parse"):
+            if self.parser == "lxml":
+                return self._parse_scan(url, scan_html(html, text_limit=self.text_preview_limit))
+            return self._parse_soup(url, html)
+
+    def _parse_scan(self, url: str, scan: PageScan) -> ExtractedItem:
+        lap = metrics.Laps("field.")
+        og_title = scan.first_meta.get("og:title")
+        og_description = scan.first_meta.get("og:description")
+        meta_description = scan.first_meta.get("description")
+        og_image = scan.first_meta.get("og:image")
+
+        title = og_title or scan.title or joined(scan.h1_strings, "") or ""
+        lap("title")
+        description = og_description or meta_description or joined(scan.p_strings, "") or ""
+        lap("description")
+
+        image_urls = [urljoin(url, og_image)] if og_image else []
+        image_urls += [urljoin(url, src) for src in scan.img_srcs]
+        image_urls = _dedupe(image_urls)[:self.max_images]
+        lap("images")
+
+        og = {
+            prop: urljoin(url, content) if prop == "og:image" else content
+            for prop, content in scan.og.items()
+        }
+        lap("og")
+        canonical_url = urljoin(url, scan.canonical_href) if scan.canonical_href else ""
+        h1 = joined(scan.h1_strings, " ")
+        lap("canonical_h1")
+        text_preview = scan.text_preview()
+        lap("text_preview")
+        links = _dedupe(urljoin(url, href) for href in scan.hrefs)[:self.max_links]
+        lap("links")
+
+        return ExtractedItem(
+            url=url,
+            title=title.strip(),
+            description=description.strip(),
+            image_urls=image_urls,
+            h1=h1,
+            canonical_url=canonical_url.strip(),
+            og=og,
+            text_preview=text_preview,
+            links=links,
+        )
+
+    def _parse_soup(self, url: str, html: str) -> ExtractedItem:
+        lap = metrics.Laps("field.")
         soup = BeautifulSoup(html, "html.parser")
+        lap("soup")
 
         title = self._get_title(soup) or ""
+        lap("title")
         description = self._get_description(soup) or ""
-        image_urls = self._get_images(soup, base_url=url)
+        lap("description")
+        image_urls = self._get_images(soup, base_url=url, limit=self.max_images)
+        lap("images")
 
         h1 = self._get_h1(soup) or ""
         canonical_url = self._get_canonical(soup, base_url=url) or ""
+        lap("canonical_h1")
         og = self._get_og(soup, base_url=url)
-        text_preview = self._get_text_preview(soup, limit=700)
-        links = self._get_links(soup, base_url=url, limit=30)
+        lap("og")
+        text_preview = self._get_text_preview(soup, limit=self.text_preview_limit)
+        lap("text_preview")
+        links = self._get_links(soup, base_url=url, limit=self.max_links)
+        lap("links")
 
         return ExtractedItem(
             url=url,
@@ -91,7 +248,7 @@ class GenericHtmlExtractor(BaseExtractor):
             out[prop] = content
         return out
 
-    def _get_images(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+    def _get_images(self, soup: BeautifulSoup, base_url: str, limit: int = 20) -> List[str]:
         urls: List[str] = []
 
         og = soup.select_one('meta[property="og:image"]')
@@ -111,7 +268,7 @@ class GenericHtmlExtractor(BaseExtractor):
             if u not in seen:
                 seen.add(u)
                 out.append(u)
-        return out[:20]
+        return out[:limit]
 
     def _get_links(self, soup: BeautifulSoup, base_url: str, limit: int = 10) -> List[str]:
         links: List[str] = []
@@ -0,0 +1,398 @@
+import codecs
+from typing import Dict, List, Optional, Set, Union
+from urllib.parse import urljoin
+
+from lxml import etree
+
+# strings inside these tags are not page text (same as BeautifulSoup.get_text)
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+# libxml2 passes the contents of these through as raw text (markup and entities
+# untouched); html.parser parses them, so the scan re-parses their contents
+_RAW_TEXT_TAGS = {"xmp", "iframe", "noembed", "noframes", "plaintext"}
+_FRAGMENT_WRAPPER = "<html><body><div>"  # texto solto no body viraria um <p> implícito
+_FRAGMENT_DEPTH = 3
+
+# libxml2 reads these as text up to their end tag, or to the end of the document when it is missing
+_RCDATA_TAGS = {"title", "textarea"}
+
+# meta tags where only the first occurrence matters (select_one semantics)
+_FIRST_META_PROPERTIES = ("og:title", "og:description", "og:image")
+
+
+class PageScan:
+    """
+    lxml parser target that collects every field GenericHtmlExtractor needs
+    in a single pass over the parse events, without building a tree.
+
+    Matches the results of the BeautifulSoup(html, "html.parser") queries
+    it replaces: select_one-style fields keep the first matching element,
+    strings inside script/style/template are not treated as text, and the
+    contents of xmp/iframe/noembed/noframes/plaintext (raw text to libxml2)
+    are re-parsed as markup.
+
+    <title> and <textarea> are text up to their end tag for libxml2; when
+    it is missing they would swallow the rest of the document, so an
+    element still open at the end of the input is cut at its first "</"
+    and the rest is re-parsed as markup, as html.parser does. CDATA
+    sections (a bogus comment to libxml2) count as text, as in bs4.
+
+    Known differences, where libxml2 follows the HTML spec (and browsers)
+    and html.parser does not:
+    - <title> and <textarea> are read as text with entities decoded, so
+      markup inside them is kept verbatim ("<b>hi</b>") instead of being
+      stripped. It cannot be re-parsed: a decoded "&lt;b&gt;" would turn
+      into a tag.
+    - A <p> is closed implicitly by the next <p> or block element, so the
+      description fallback is the first paragraph up to there ("one" for
+      <p>one<p>two</p></p>, where html.parser gives "onetwo").
+    """
+
+    def __init__(self, text_limit: int = 700):
+        self.text_limit = text_limit
+
+        self.title: Optional[str] = None
+        self.first_meta: Dict[str, Optional[str]] = {}  # chave -> content do 1º elemento
+        self.canonical_found = False
+        self.canonical_href: Optional[str] = None
+        self.og: Dict[str, str] = {}
+        self.h1_strings: Optional[List[str]] = None
+        self.p_strings: Optional[List[str]] = None
+        self.img_srcs: List[str] = []
+        self.hrefs: List[str] = []
+        self.text_parts: List[str] = []
+        self.text_len = 0
+
+        self._buf: List[str] = []
+        self._depth = 0
+        self._skip_depth = 0
+        self._title_parts: Optional[List[str]] = None
+        self._title_at = 0
+        self._h1_at = 0
+        self._p_at = 0
+        self._raw_at = 0
+        self._rcdata_at = 0
+        # fins de elemento recebidos depois do fim de um title/textarea: só quando vier outro evento
+        # se sabe que o elemento foi fechado de verdade (e não pelo fim do documento)
+        self._held_ends: Optional[List] = None
+
+    # ---- eventos do parser ----
+
+    def start(self, tag, attrib) -> None:
+        self._release()
+        self._flush()
+        self._depth += 1
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+
+        if tag in _RCDATA_TAGS and not self._rcdata_at:
+            self._rcdata_at = self._depth
+
+        if tag in _NON_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag in _RAW_TEXT_TAGS:
+            if not self._raw_at:
+                self._raw_at = self._depth
+        elif tag == "meta":
+            self._meta(attrib)
+        elif tag == "img":
+            src = (attrib.get("src") or "").strip()
+            if src:
+                self.img_srcs.append(src)
+        elif tag == "a":
+            href = attrib.get("href")
+            if href is not None and href.strip():
+                self.hrefs.append(href.strip())
+        elif tag == "link":
+            rel = attrib.get("rel")
+            if not self.canonical_found and rel is not None and " ".join(rel.split()) == "canonical":
+                self.canonical_found = True
+                self.canonical_href = attrib.get("href")
+        elif tag == "title" and self.title is None and self._title_parts is None:
+            self._title_parts = []
+            self._title_at = self._depth
+        elif tag == "h1" and self.h1_strings is None:
+            self.h1_strings = []
+            self._h1_at = self._depth
+        elif tag == "p" and self.p_strings is None:
+            self.p_strings = []
+            self._p_at = self._depth
+
+    def end(self, tag) -> None:
+        if self._held_ends is not None:
+            self._held_ends.append(tag)
+        elif self._depth == self._rcdata_at:
+            self._held_ends = [tag]
+        else:
+            self._end(tag)
+
+    def data(self, text: str) -> None:
+        self._release()
+        self._buf.append(text)
+
+    def comment(self, text: str) -> None:
+        self._release()
+        self._flush()
+        if text.startswith("[CDATA[") and text.endswith("]]"):
+            # <![CDATA[...]]>: html.parser (e bs4) o trata como uma string à parte
+            self._buf.append(text[7:-2])
+            self._flush()
+
+    def pi(self, target: str, data: Optional[str] = None) -> None:
+        self._release()
+        self._flush()
+
+    def doctype(self, *args) -> None:
+        self._release()
+        self._flush()
+
+    def close(self) -> "PageScan":
+        if self._held_ends is not None:
+            self._unclosed_rcdata()
+        self._flush()
+        if self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+        return self
+
+    # ---- helpers ----
+
+    def _end(self, tag) -> None:
+        self._flush()
+        if isinstance(tag, str) and tag.lower() in _NON_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if self._depth == self._title_at:
+            self.title = "".join(self._title_parts or [])
+            self._title_parts = None
+            self._title_at = 0
+        if self._depth == self._h1_at:
+            self._h1_at = 0
+        if self._depth == self._p_at:
+            self._p_at = 0
+        if self._depth == self._raw_at:
+            self._raw_at = 0
+        if self._depth == self._rcdata_at:
+            self._rcdata_at = 0
+        self._depth -= 1
+
+    def _release(self) -> None:
+        # veio outro evento: o title/textarea tinha fim de verdade
+        if self._held_ends is not None:
+            ends, self._held_ends = self._held_ends, None
+            for tag in ends:
+                self._end(tag)
+
+    def _unclosed_rcdata(self) -> None:
+        # title/textarea aberto até o fim do documento: o elemento termina no primeiro "</"
+        # e o resto volta a ser marcação, como no html.parser
+        ends, self._held_ends = self._held_ends, None
+        text = "".join(self._buf)
+        cut = text.find("</")
+        if cut >= 0:
+            self._buf[:] = [text[:cut]]
+            self._end(ends.pop(0))
+            self._reparse(text[cut:])
+        for tag in ends:
+            self._end(tag)
+
+    def _meta(self, attrib) -> None:
+        prop = attrib.get("property")
+        content = attrib.get("content")
+        if prop is not None:
+            if prop in _FIRST_META_PROPERTIES and prop not in self.first_meta:
+                self.first_meta[prop] = content
+            if prop.startswith("og:"):
+                p = prop.strip()
+                c = (content or "").strip()
+                if p and c:
+                    self.og[p] = c
+        if attrib.get("name") == "description" and "description" not in self.first_meta:
+            self.first_meta["description"] = content
+
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        s = "".join(self._buf)
+        self._buf.clear()
+        if self._skip_depth:
+            return
+        if self._raw_at and "<" in s:
+            self._reparse(s)
+            return
+        self._take(s)
+
+    def _reparse(self, markup: str) -> None:
+        # os eventos do fragmento entram nesta mesma varredura, como se a marcação estivesse no documento;
+        # dentro dele o elemento externo já não é texto cru (um iframe aninhado é re-interpretado por sua vez)
+        raw_at, self._raw_at = self._raw_at, 0
+        try:
+            parser = etree.HTMLParser(target=_Fragment(self), recover=True, no_network=True, huge_tree=True)
+            parser.feed(_FRAGMENT_WRAPPER + markup)
+            parser.close()
+        finally:
+            self._raw_at = raw_at
+
+    def _take(self, s: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(s)
+        if self._h1_at:
+            self.h1_strings.append(s)
+        if self._p_at:
+            self.p_strings.append(s)
+
+        if self.text_len <= self.text_limit:
+            norm = " ".join(s.split())
+            if norm:
+                self.text_parts.append(norm)
+                self.text_len += len(norm) + 1
+
+    # ---- resultados ----
+
+    def text_preview(self) -> str:
+        return " ".join(self.text_parts)[:self.text_limit]
+
+
+class _Fragment:
+    """Parser target replaying a re-parsed raw-text element into the enclosing scan, minus the wrapper tags."""
+
+    def __init__(self, scan: PageScan):
+        self.scan = scan
+        self.started = 0
+        # por elemento aberto: se é do wrapper (um "</div>" solto no fragmento pode fechar o wrapper antes)
+        self.open: List[bool] = []
+
+    def start(self, tag, attrib) -> None:
+        wrapper = self.started < _FRAGMENT_DEPTH
+        self.started += 1
+        self.open.append(wrapper)
+        if not wrapper:
+            self.scan.start(tag, attrib)
+
+    def end(self, tag) -> None:
+        if not self.open.pop():
+            self.scan.end(tag)
+
+    def data(self, text: str) -> None:
+        self.scan.data(text)
+
+    def comment(self, text: str) -> None:
+        self.scan.comment(text)
+
+    def close(self) -> None:
+        self.scan._flush()
+
+
+def joined(strings: Optional[List[str]], sep: str) -> str:
+    """get_text(sep, strip=True) over the strings captured for an element."""
+    if not strings:
+        return ""
+    return sep.join(s.strip() for s in strings if s.strip())
+
+
+def scan_html(html: str, text_limit: int = 700) -> PageScan:
+    scan = PageScan(text_limit=text_limit)
+    if not html.strip():
+        return scan
+    parser = etree.HTMLParser(target=scan, recover=True, no_network=True, huge_tree=True)
+    parser.feed(html)
+    return parser.close()
+
+
+class StreamingScan(PageScan):
+    """
+    PageScan that knows the per-page limits and reports when everything
+    the extractor can use has been seen, so the download can stop early:
+    the <head> is over, the image/link/text limits are reached and the
+    first h1 and the description fallback are complete.
+    """
+
+    def __init__(self, base_url: str, max_images: int, max_links: int, text_limit: int):
+        super().__init__(text_limit=text_limit)
+        self.base_url = base_url
+        self.max_images = max_images
+        self.max_links = max_links
+        self.head_done = False
+        self._images: Set[str] = set()
+        self._links: Set[str] = set()
+
+    def start(self, tag, attrib) -> None:
+        n_imgs, n_hrefs = len(self.img_srcs), len(self.hrefs)
+        super().start(tag, attrib)
+        if len(self.img_srcs) > n_imgs:
+            self._images.add(urljoin(self.base_url, self.img_srcs[-1]))
+        elif len(self.hrefs) > n_hrefs:
+            self._links.add(urljoin(self.base_url, self.hrefs[-1]))
+        elif tag == "body":
+            self.head_done = True
+        elif tag == "meta" and self.first_meta.get("og:image"):
+            self._images.add(urljoin(self.base_url, self.first_meta["og:image"]))
+
+    def end(self, tag) -> None:
+        super().end(tag)
+        if tag == "head":
+            self.head_done = True
+
+    @property
+    def done(self) -> bool:
+        description_known = bool(
+            self.first_meta.get("og:description")
+            or self.first_meta.get("description")
+            or (self.p_strings is not None and not self._p_at)
+        )
+        return (
+            self.head_done
+            and len(self._images) >= self.max_images
+            and len(self._links) >= self.max_links
+            and self.text_len > self.text_limit
+            and self.h1_strings is not None and not self._h1_at
+            and description_known
+        )
+
+
+class ScanFeeder:
+    """
+    Feeds raw body chunks into an lxml parser driving a StreamingScan.
+
+    Chunks are decoded incrementally with the response encoding when one is
+    known (same decoding as requests' .text); otherwise bytes are passed
+    through and libxml2 detects the charset. feed() returns False once the
+    scan is done or max_bytes have been read.
+    """
+
+    def __init__(self, scan: StreamingScan, encoding: Optional[str] = None, max_bytes: int = 0):
+        self.scan = scan
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self._decoder = None
+        if encoding:
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            except LookupError:
+                self._decoder = None
+        self._parser = etree.HTMLParser(target=scan, recover=True, no_network=True, huge_tree=True)
+        self._fed = False
+
+    def _feed(self, data: Union[str, bytes]) -> None:
+        if data:
+            self._parser.feed(data)
+            self._fed = True
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.max_bytes and self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        self._feed(self._decoder.decode(chunk) if self._decoder else chunk)
+        return not self.truncated and not self.scan.done
+
+    def close(self) -> StreamingScan:
+        if self._decoder:
+            self._feed(self._decoder.decode(b"", final=True))
+        if not self._fed:
+            return self.scan.close()
+        try:
+            return self._parser.close()
+        except etree.XMLSyntaxError:
+            return self.scan.close()  # documento vazio/só espaços
@@ -1,15 +1,104 @@
-from typing import List
+import threading
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
 from scraper.sites.base import BaseExtractor
 from scraper.sites.generic import GenericHtmlExtractor
-from scraper.sites.generic import GenericHtmlExtractor
+from scraper.scheduler import host_of
+from scraper.sites.rendered import RenderedHtmlExtractor
+from scraper.sites.rules import SiteRule, rule_factory
+
+# fábrica de extrator: chamada com os limites da execução (max_images, max_links, text_preview_limit)
+Factory = Callable[..., BaseExtractor]
+
+
+class _Node:
+    __slots__ = ("children", "factory")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.factory: Optional[Factory] = None
+
+
+class ExtractorRegistry:
+    """
+    Extractor factories indexed by domain in a trie of reversed host labels
+    (shop.example.com -> com / example / shop). A lookup walks one node per
+    label of the URL's host and the deepest registered domain wins, so
+    dispatch cost does not grow with the number of sites; hosts without a
+    registered domain get `default`.
+
+    Extractors are built by their factory with the run's limits and cached
+    per (factory, limits): every URL of a site shares one instance that
+    honours --max-images / --max-links / --text-preview.
+    """
+
+    def __init__(self, default: Factory = GenericHtmlExtractor):
+        self.default = default
+        self._root = _Node()
+        self._instances: Dict[Tuple, BaseExtractor] = {}
+        self._lock = threading.Lock()
+
+    def register(self, domain: str, factory: Factory) -> None:
+        """Use `factory` for `domain` and its subdomains (call at startup)."""
+        node = self._root
+        for label in reversed(domain.lower().strip().strip(".").split(".")):
+            node = node.children.setdefault(label, _Node())
+        node.factory = factory
+
+    def register_rule(self, rule: SiteRule) -> None:
+        factory = rule_factory(rule)
+        for domain in rule.domains:
+            self.register(domain, factory)
 
-EXTRACTORS: List[BaseExtractor] = [
-    # Exemplo futuro: BethaExtractor(),
-    GenericHtmlExtractor(),  # sempre por último como fallback
+    def factory_for(self, host: str) -> Factory:
+        node, found = self._root, self.default
+        for label in reversed(host.rstrip(".").split(".")):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.factory is not None:
+                found = node.factory
+        return found
+
+    def get(self, url: str, **limits) -> BaseExtractor:
+        factory = self.factory_for(host_of(url))
+        key = (factory, tuple(sorted(limits.items())))
+        extractor = self._instances.get(key)
+        if extractor is None:
+            with self._lock:
+                extractor = self._instances.get(key)
+                if extractor is None:
+                    extractor = self._instances[key] = factory(**limits)
+        return extractor
+
+
+REGISTRY = ExtractorRegistry()
+
+# extratores específicos (classes com os limites no __init__), por domínio:
+# Exemplo futuro: REGISTRY.register("betha.com.br", BethaExtractor)
+
+# regras declarativas (XPath compilado uma vez); também carregáveis de JSON com --site-rules
+SITE_RULES: List[SiteRule] = [
+    # Exemplo: SiteRule(domains=("blog.example.com",), title="//h1/text()", images="//article//img/@src", text="//article//p"),
+]
+
+# domínios (e subdomínios) cujo conteúdo só aparece depois do JavaScript:
+# buscados pelo pool de browsers do Playwright em vez do HTTP puro
+RENDERED_DOMAINS: List[str] = [
+    # Exemplo: "app.example.com",
 ]
 
-def pick_extractor(url: str, *, max_images: int = 20, max_links: int = 30, text_preview: int = 700):
-    for ex in EXTRACTORS:
-        if ex.supports(url):
-            return ex
-    return GenericHtmlExtractor(max_images=max_images, max_links=max_links, text_preview=text_preview)
\ No newline at end of file
+
+def register_rendered(domain: str) -> None:
+    REGISTRY.register(domain, partial(RenderedHtmlExtractor, (domain,)))
+
+
+for _rule in SITE_RULES:
+    REGISTRY.register_rule(_rule)
+for _domain in RENDERED_DOMAINS:
+    register_rendered(_domain)
+
+
+def pick_extractor(url: str, *, max_images: int = 20, max_links: int = 30, text_preview_limit: int = 700) -> BaseExtractor:
+    return REGISTRY.get(url, max_images=max_images, max_links=max_links, text_preview_limit=text_preview_limit)
@@ -0,0 +1,58 @@
+from typing import Iterable, Optional, Tuple
+
+from scraper import metrics, playwright_engine
+from scraper.scheduler import host_of
+from scraper.sites.base import ExtractedItem
+from scraper.sites.generic import GenericHtmlExtractor
+from scraper.urls import host_in_domain
+
+
+class RenderedHtmlExtractor(GenericHtmlExtractor):
+    """
+    Generic extraction over the HTML rendered by the shared Playwright
+    browser pool, for sites that build their content with JavaScript.
+    Opt a site in by listing its domain in registry.RENDERED_DOMAINS
+    (or with --render-domain).
+    """
+
+    def __init__(self, domains: Iterable[str] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.domains = tuple(domains)
+
+    def supports(self, url: str) -> bool:
+        host = host_of(url)
+        return any(host_in_domain(host, d) for d in self.domains)
+
+    def extract(self, url: str) -> ExtractedItem:
+        return self.parse(url, self._render(url))
+
+    async def extract_async(self, url: str) -> ExtractedItem:
+        return self.parse(url, await self._render_async(url))
+
+    def fetch(self, url: str) -> Tuple[bytes, Optional[str]]:
+        return self._render(url).encode("utf-8"), "utf-8"
+
+    async def fetch_async(self, url: str) -> Tuple[bytes, Optional[str]]:
+        html = await self._render_async(url)
+        return html.encode("utf-8"), "utf-8"
+
+    @staticmethod
+    def _render(url: str) -> str:
+        with metrics.stage("render"):
+            html = playwright_engine.fetch_rendered_html(url)
+        metrics.count("html_bytes", len(html))
+        return html
+
+    @staticmethod
+    async def _render_async(url: str) -> str:
+        with metrics.stage("render"):
+            html = await playwright_engine.fetch_rendered_html_async(url)
+        metrics.count("html_bytes", len(html))
+        return html
+
+    # o DOM renderizado só existe completo: sem leitura incremental
+    def extract_streaming(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        return self.extract(url)
+
+    async def extract_streaming_async(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        return await self.extract_async(url)
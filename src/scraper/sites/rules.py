@@ -0,0 +1,166 @@
+import json
+from dataclasses import dataclass, fields
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from scraper import metrics
+from scraper.sites.base import ExtractedItem
+from scraper.sites.generic import GenericHtmlExtractor, _dedupe
+from scraper.sites.rendered import RenderedHtmlExtractor
+
+# campos de SiteRule que são XPath (os demais são opções)
+QUERY_FIELDS = ("title", "description", "h1", "canonical", "images", "links", "text")
+
+_OG = etree.XPath('//meta[starts-with(@property, "og:")]')
+
+
+@dataclass(frozen=True)
+class SiteRule:
+    """
+    Declarative extraction for one site: an XPath per field, evaluated on
+    the parsed page. Fields left empty are not extracted at all, so a page
+    only runs the queries its site needs.
+
+    title/description/h1/canonical take the first result; images/links
+    take every result (attribute values are resolved against the page URL)
+    up to the run's limits; text is joined into the text preview. XPaths
+    may select strings (text(), @attr) or elements (their text content).
+    """
+
+    domains: Tuple[str, ...]
+    title: str = ""
+    description: str = ""
+    h1: str = ""
+    canonical: str = ""
+    images: str = ""
+    links: str = ""
+    text: str = ""
+    og: bool = False       # também coletar as meta og:*
+    render: bool = False   # buscar pelo pool de browsers (Playwright)
+
+    def queries(self) -> Dict[str, str]:
+        return {name: getattr(self, name) for name in QUERY_FIELDS if getattr(self, name)}
+
+
+@lru_cache(maxsize=None)
+def compile_rule(rule: SiteRule) -> Dict[str, etree.XPath]:
+    """XPaths of a rule compiled once per process (parse workers compile on first use)."""
+    compiled = {}
+    for name, expr in rule.queries().items():
+        try:
+            compiled[name] = etree.XPath(expr)
+        except etree.XPathSyntaxError as e:
+            raise ValueError(f"{rule.domains[0]}: invalid XPath for {name!r}: {expr!r} ({e})") from e
+    return compiled
+
+
+def rule_from_dict(data: Dict[str, Any]) -> SiteRule:
+    known = {f.name for f in fields(SiteRule)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"unknown site rule keys: {', '.join(sorted(unknown))}")
+    domains = data.get("domains") or []
+    if isinstance(domains, str):
+        domains = [domains]
+    if not domains:
+        raise ValueError("site rule without domains")
+    rule = SiteRule(**{**data, "domains": tuple(d.lower().strip(".") for d in domains)})
+    compile_rule(rule)  # XPath inválido falha ao carregar, não no meio da execução
+    return rule
+
+
+def load_rules(path: Path) -> List[SiteRule]:
+    """Site rules from a JSON file: a list of objects with the SiteRule fields."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a JSON list of site rules")
+    return [rule_from_dict(item) for item in data]
+
+
+def _strings(result: Any) -> List[str]:
+    if not isinstance(result, list):
+        result = [result]
+    out = []
+    for value in result:
+        if isinstance(value, etree._Element):
+            value = value.text_content()
+        value = " ".join(str(value).split())
+        if value:
+            out.append(value)
+    return out
+
+
+class RuleExtractor(GenericHtmlExtractor):
+    """GenericHtmlExtractor's fetch paths with a SiteRule's queries as the parse."""
+
+    def __init__(self, rule: SiteRule, **kwargs):
+        super().__init__(**kwargs)
+        self.rule = rule
+        self.domains = rule.domains
+
+    def parse(self, url: str, html: str) -> ExtractedItem:
+        with metrics.stage("parse"):
+            lap = metrics.Laps("field.")
+            queries = compile_rule(self.rule)
+            try:
+                # bytes + encoding fixo: str com <?xml encoding=...?> seria recusada pelo lxml
+                doc = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+            except etree.ParserError:  # documento vazio
+                doc = None
+            lap("tree")
+
+            def run(name: str) -> List[str]:
+                if doc is None or name not in queries:
+                    return []
+                values = _strings(queries[name](doc))
+                lap(name)
+                return values
+
+            def first(name: str) -> str:
+                values = run(name)
+                return values[0] if values else ""
+
+            og: Dict[str, str] = {}
+            if self.rule.og and doc is not None:
+                for m in _OG(doc):
+                    prop, content = (m.get("property") or "").strip(), (m.get("content") or "").strip()
+                    if prop and content and prop not in og:
+                        og[prop] = urljoin(url, content) if prop == "og:image" else content
+                lap("og")
+
+            canonical = first("canonical")
+            return ExtractedItem(
+                url=url,
+                title=first("title"),
+                description=first("description"),
+                image_urls=_dedupe(urljoin(url, v) for v in run("images"))[:self.max_images],
+                h1=first("h1"),
+                canonical_url=urljoin(url, canonical) if canonical else "",
+                og=og,
+                text_preview=" ".join(run("text"))[:self.text_preview_limit],
+                links=_dedupe(urljoin(url, v) for v in run("links"))[:self.max_links],
+            )
+
+    # as regras rodam sobre a árvore inteira: sem leitura incremental
+    def extract_streaming(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        return self.extract(url)
+
+    async def extract_streaming_async(self, url: str, max_body_bytes: int = 0) -> ExtractedItem:
+        return await self.extract_async(url)
+
+
+class RenderedRuleExtractor(RenderedHtmlExtractor, RuleExtractor):
+    """A SiteRule applied to the HTML rendered by the browser pool (rule.render)."""
+
+    def __init__(self, rule: SiteRule, **kwargs):
+        super().__init__(rule.domains, rule=rule, **kwargs)
+
+
+def rule_factory(rule: SiteRule) -> Callable[..., RuleExtractor]:
+    """Registry factory for a rule: called with the run's limits."""
+    return partial(RenderedRuleExtractor if rule.render else RuleExtractor, rule)
@@ -0,0 +1,22 @@
+import pytest
+
+
+class FakeClock:
+    """Stands in for the `time` module of the code under test: time only moves when advance() is called."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
@@ -0,0 +1,118 @@
+import pytest
+
+from scraper.frontier import CrawlConfig, Frontier
+from scraper.scheduler import IDLE
+
+
+def open_frontier(tmp_path, resume=False, **config):
+    return Frontier(tmp_path / "frontier.sqlite3", CrawlConfig(**config), resume=resume)
+
+
+def queued(frontier):
+    """URLs handed out until the frontier would wait for an in-flight page (none are completed)."""
+    out = []
+    for url in frontier.urls():
+        if url is IDLE:
+            break
+        out.append(url)
+    return out
+
+
+def crawl(frontier, links_of=lambda url: ()):
+    """Pages in the order the frontier hands them out, completing each one with its links."""
+    order = []
+    for url in frontier.urls():
+        if url is IDLE:
+            continue
+        order.append(url)
+        frontier.complete(url, list(links_of(url)))
+    return order
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    f = open_frontier(tmp_path, max_depth=5, max_pages_per_host=3)
+    yield f
+    f.close()
+
+
+def test_per_host_budget_counts_the_seed(frontier):
+    frontier.add_seeds(["https://a.example/"])
+    links = [f"https://a.example/{i}" for i in range(5)] + ["https://b.a.example/x"]
+    order = crawl(frontier, lambda url: links if url.endswith(".example/") else ())
+    assert order == ["https://a.example/", "https://a.example/0", "https://a.example/1", "https://b.a.example/x"]
+    assert frontier.stats["over_budget"] == 3
+    assert frontier.stats["queued"] == 4
+
+
+def test_depth_limit(tmp_path):
+    f = open_frontier(tmp_path, max_depth=1)
+    f.add_seeds(["https://a.example/"])
+    order = crawl(f, lambda url: [url.rstrip("/") + "/next"])
+    f.close()
+    assert order == ["https://a.example/", "https://a.example/next"]
+    assert f.stats["too_deep"] == 1
+
+
+@pytest.mark.parametrize("scope, allow, expected", [
+    ("host", (), ["https://www.a.example/"]),
+    ("domain", (), ["https://www.a.example/", "https://blog.a.example/"]),
+    ("domain", ("b.example",), ["https://www.a.example/", "https://blog.a.example/", "https://b.example/"]),
+    ("any", (), ["https://www.a.example/", "https://blog.a.example/", "https://b.example/", "https://evil-a.example/"]),
+])
+def test_scope(tmp_path, scope, allow, expected):
+    links = [
+        "https://www.a.example/", "https://blog.a.example/", "https://b.example/", "https://evil-a.example/",
+        "mailto:x@a.example",
+    ]
+    f = open_frontier(tmp_path, scope=scope, allow=allow)
+    f.add_seeds(["https://a.example/"])
+    f.complete(next(f.urls()), links)
+    got = queued(f)
+    f.close()
+    assert got == expected
+    assert f.stats["out_of_scope"] == 4 - len(expected)
+
+
+def test_known_urls_are_queued_once(frontier):
+    frontier.add_seeds(["https://a.example/", "https://a.example/?utm_source=x"])
+    order = crawl(frontier, lambda url: ["https://a.example/#top", "https://A.example:443/"])
+    assert order == ["https://a.example/"]
+
+
+def test_canonical_is_marked_done_as_an_alias(frontier):
+    frontier.add_seeds(["https://a.example/?id=1", "https://a.example/item"])
+    url = next(frontier.urls())
+    frontier.complete(url, canonical="https://a.example/item")
+    assert queued(frontier) == []
+
+
+def test_resume_requeues_pages_in_flight(tmp_path):
+    f = open_frontier(tmp_path)
+    f.add_seeds(["https://a.example/1", "https://a.example/2"])
+    it = f.urls()
+    f.complete(next(it))
+    next(it)  # em andamento quando a execução para
+    f.close()
+
+    f = open_frontier(tmp_path, resume=True)
+    assert crawl(f) == ["https://a.example/2"]
+    f.close()
+
+
+@pytest.mark.parametrize("kwargs, expected", [
+    ({}, []),
+    ({"retry_errors": True}, ["https://a.example/fail"]),
+    ({"recrawl_after_s": 0}, ["https://a.example/ok"]),
+])
+def test_resume_requeues_failed_and_stale_pages_on_request(tmp_path, kwargs, expected):
+    f = open_frontier(tmp_path)
+    f.add_seeds(["https://a.example/ok", "https://a.example/fail"])
+    it = f.urls()
+    f.complete(next(it))
+    f.complete(next(it), ok=False)
+    f.close()
+
+    f = Frontier(tmp_path / "frontier.sqlite3", CrawlConfig(), resume=True, **kwargs)
+    assert queued(f) == expected
+    f.close()
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from scraper.http_cache import CacheEntry, HttpCache
+
+STORED_AT = 1_700_000_000.0
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(tmp_path / "cache")
+
+
+def entry(**headers):
+    return CacheEntry(key="k", url="https://example.com/", headers=headers, stored_at=STORED_AT, body_path=Path("unused"))
+
+
+@pytest.mark.parametrize("age_s, fresh", [(0, True), (59, True), (60, False), (3600, False)])
+def test_max_age(cache, age_s, fresh):
+    assert cache.is_fresh(entry(**{"Cache-Control": "public, max-age=60"}), now=STORED_AT + age_s) is fresh
+
+
+def test_age_header_counts_against_the_lifetime(cache):
+    e = entry(**{"Cache-Control": "max-age=60", "Age": "50"})
+    assert cache.is_fresh(e, now=STORED_AT + 5)
+    assert not cache.is_fresh(e, now=STORED_AT + 10)
+
+
+def test_expires_relative_to_date(cache):
+    e = entry(Date="Tue, 14 Nov 2023 22:00:00 GMT", Expires="Tue, 14 Nov 2023 22:02:00 GMT")
+    assert cache.is_fresh(e, now=STORED_AT + 119)
+    assert not cache.is_fresh(e, now=STORED_AT + 120)
+
+
+def test_max_age_wins_over_expires(cache):
+    e = entry(**{"Cache-Control": "max-age=10", "Expires": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert not cache.is_fresh(e, now=STORED_AT + 11)
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"ETag": '"v1"'},
+    {"Cache-Control": "no-cache, max-age=600"},
+    {"Cache-Control": "no-store"},
+    {"Expires": "0"},
+])
+def test_stale_without_a_usable_lifetime(cache, headers):
+    assert not cache.is_fresh(entry(**headers), now=STORED_AT)
+
+
+def test_stored_entry_round_trip(cache):
+    url = "https://example.com/page"
+    cache.store(url, {"ETag": '"v1"', "Content-Length": "5"}, b"hello")
+    e = cache.lookup(url)
+    assert e is not None
+    assert e.body_path.read_bytes() == b"hello"
+    assert "Content-Length" not in e.headers  # o corpo guardado já está decodificado
+    assert cache.validators(e) == {"If-None-Match": '"v1"'}
+    assert cache.lookup("https://example.com/other") is None
@@ -0,0 +1,88 @@
+import gzip
+
+import pytest
+
+from scraper.pack import PackReader, PackStore, PackWriter, blob_name
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\rIHDR" + (3).to_bytes(4, "big") + (2).to_bytes(4, "big") + b"\x08\x06\x00\x00\x00"
+
+
+@pytest.fixture(params=["warc", "tar"])
+def fmt(request):
+    return request.param
+
+
+def write_pack(root, fmt, **kwargs):
+    writer = PackWriter(root, fmt, **kwargs)
+    blob = root.parent / "blob.tmp"
+    blob.write_bytes(PNG * 100)
+    writer.add_blob("sha-png", "https://cdn.example/a.png", blob, blob.stat().st_size)
+    writer.add_image_url("https://cdn.example/a.png", "sha-png")
+    for i in range(3):
+        writer.add_item(f"https://example.com/{i}", f"item-{i}/data.json", {"url": f"https://example.com/{i}", "n": i})
+    return writer
+
+
+def test_reader_finds_every_record(tmp_path, fmt):
+    write_pack(tmp_path / "pack", fmt).close()
+    reader = PackReader(tmp_path / "pack")
+    assert reader.item("https://example.com/1") == {"url": "https://example.com/1", "n": 1}
+    assert reader.item("https://EXAMPLE.com/1#x") == {"url": "https://example.com/1", "n": 1}  # forma canônica
+    assert reader.item("https://example.com/9") is None
+    assert reader.blob("sha-png") == PNG * 100
+    assert reader.image("https://cdn.example/a.png") == PNG * 100
+    assert [item["n"] for item in reader.items()] == [0, 1, 2]
+    reader.close()
+
+
+def test_index_offsets_point_at_the_records(tmp_path, fmt):
+    write_pack(tmp_path / "pack", fmt).close()
+    reader = PackReader(tmp_path / "pack")
+    rows = reader._db.execute("SELECT shard, offset, length FROM items ORDER BY offset").fetchall()
+    for shard, offset, length in rows:
+        with (tmp_path / "pack" / shard).open("rb") as f:
+            f.seek(offset)
+            raw = f.read(length)
+        if fmt == "warc":
+            # cada registro é um membro gzip completo, legível sozinho
+            assert gzip.decompress(raw).startswith(b"WARC/1.1\r\n")
+        else:
+            assert raw.startswith(b"{")
+    reader.close()
+
+
+def test_shards_roll_over_and_offsets_stay_valid(tmp_path, fmt):
+    writer = write_pack(tmp_path / "pack", fmt, shard_bytes=1)
+    writer.close()
+    assert writer.stats["shards"] == 4
+    reader = PackReader(tmp_path / "pack")
+    assert len({shard for (shard,) in reader._db.execute("SELECT shard FROM items")}) == 3
+    assert [item["n"] for item in reader.items()] == [0, 1, 2]
+    reader.close()
+
+
+def test_only_synced_records_are_indexed(tmp_path, fmt):
+    writer = write_pack(tmp_path / "pack", fmt)
+    assert writer.has_item("https://example.com/0")  # pendente nesta execução
+    reader = PackReader(tmp_path / "pack")
+    assert reader.item("https://example.com/0") is None
+    reader.close()
+    writer.close()
+
+
+def test_store_reads_image_heads_back_from_the_shards(tmp_path, fmt):
+    writer = PackWriter(tmp_path / "pack", fmt)
+    store = PackStore(writer)
+    sha = store.get_or_fetch("https://cdn.example/b.png", lambda w: w.write(PNG))
+    assert store.head(sha, 8) == PNG[:8]  # ainda no shard aberto
+    assert store.link(sha, tmp_path / "unused.png") == blob_name(sha)
+    assert not (tmp_path / "unused.png").exists()
+    assert not list((tmp_path / "pack").rglob("*.part"))
+    writer.close()
+
+    writer = PackWriter(tmp_path / "pack", fmt)  # execução seguinte: vem do índice
+    store = PackStore(writer, load_index=True)
+    assert store.get_or_fetch("https://cdn.example/b.png", lambda w: pytest.fail("downloaded again")) == sha
+    assert store.head(sha, 1000) == PNG
+    assert store.head("missing", 8) == b""
+    writer.close()
@@ -0,0 +1,75 @@
+import pytest
+
+from scraper import rate_limiter
+from scraper.rate_limiter import MIN_RATE, RateLimiter
+
+HOST = "api.example"
+URL = f"https://{HOST}/items"
+
+
+@pytest.fixture
+def limiter(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return RateLimiter(min_interval_s=1.0, burst=1, increase=0.1)
+
+
+def rate(limiter):
+    return limiter.host_stats(HOST)["rate"]
+
+
+def test_token_bucket_spaces_requests(limiter, clock):
+    assert limiter.reserve(HOST) == 0
+    assert limiter.reserve(HOST) == pytest.approx(1.0)
+    assert limiter.reserve(HOST) == pytest.approx(2.0)  # a fila acumula
+    clock.advance(3)
+    assert limiter.reserve(HOST) == 0
+
+
+def test_throttling_halves_the_rate_once_per_interval(limiter, clock):
+    limiter.reserve(HOST)
+    limiter.feedback(URL, 429)
+    assert rate(limiter) == 0.5
+    limiter.feedback(URL, 503)  # mesma rajada
+    assert rate(limiter) == 0.5
+    clock.advance(2)
+    limiter.feedback(URL, None)  # timeout
+    assert rate(limiter) == 0.25
+
+
+def test_healthy_responses_add_back_up_to_the_starting_rate(limiter, clock):
+    limiter.feedback(URL, 429)
+    for _ in range(3):
+        limiter.feedback(URL, 200)
+    assert rate(limiter) == pytest.approx(0.8)
+    for _ in range(10):
+        limiter.feedback(URL, 200)
+    assert rate(limiter) == 1.0
+
+
+def test_rate_never_drops_below_the_floor(limiter, clock):
+    for _ in range(20):
+        limiter.feedback(URL, 429)
+        clock.advance(1 / MIN_RATE)
+    assert rate(limiter) == round(MIN_RATE, 3)  # host_stats arredonda
+
+
+def test_latency_spike_cuts_gently(limiter):
+    limiter.feedback(URL, 200, latency_s=1.0)
+    limiter.feedback(URL, 200, latency_s=5.0)
+    assert rate(limiter) == pytest.approx(0.8)
+    assert limiter.host_stats(HOST)["slow"] == 1
+
+
+def test_retry_after_blocks_the_host(limiter, clock):
+    limiter.feedback(URL, 503, retry_after="30")
+    assert limiter.reserve(HOST, consume=False) == pytest.approx(30)
+    clock.advance(30)
+    assert limiter.reserve(HOST, consume=False) == 0
+
+
+def test_crawl_delay_caps_the_rate(limiter):
+    limiter.set_crawl_delay(HOST, 4.0)
+    assert rate(limiter) == 0.25
+    for _ in range(5):
+        limiter.feedback(URL, 200)
+    assert rate(limiter) == 0.25
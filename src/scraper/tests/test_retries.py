@@ -0,0 +1,89 @@
+import pytest
+
+from scraper import retries
+from scraper.retries import CircuitBreaker, HostUnavailable
+
+URL = "https://down.example/page"
+
+
+@pytest.fixture
+def breaker(clock, monkeypatch):
+    monkeypatch.setattr(retries, "time", clock)
+    return CircuitBreaker(threshold=2, cooldown_s=10)
+
+
+def open_circuit(breaker):
+    breaker.record(URL, ok=False)
+    breaker.record(URL, ok=False)
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    breaker.record(URL, ok=False)
+    assert breaker.check(URL) == 0
+    breaker.record(URL, ok=False)
+    with pytest.raises(HostUnavailable) as e:
+        breaker.check(URL)
+    assert e.value.retry_in == pytest.approx(10)
+    assert breaker.open_hosts() == ["down.example"]
+    assert breaker.check("https://up.example/") == 0
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record(URL, ok=False)
+    breaker.record(URL, ok=True)
+    breaker.record(URL, ok=False)
+    assert breaker.check(URL) == 0
+
+
+def test_half_open_lets_a_single_probe_through(breaker, clock):
+    open_circuit(breaker)
+    clock.advance(10)
+    probe = breaker.check(URL)
+    assert probe
+    with pytest.raises(HostUnavailable):
+        breaker.check(URL)  # a sonda ainda não voltou
+
+
+def test_successful_probe_closes_the_circuit(breaker, clock):
+    open_circuit(breaker)
+    clock.advance(10)
+    probe = breaker.check(URL)
+    breaker.record(URL, ok=True)
+    breaker.release(URL, probe)
+    assert breaker.check(URL) == 0
+    assert breaker.open_hosts() == []
+
+
+def test_failed_probe_reopens_with_twice_the_cooldown(breaker, clock):
+    open_circuit(breaker)
+    clock.advance(10)
+    probe = breaker.check(URL)
+    breaker.record(URL, ok=False)
+    breaker.release(URL, probe)
+    clock.advance(19)
+    with pytest.raises(HostUnavailable):
+        breaker.check(URL)
+    clock.advance(1)
+    assert breaker.check(URL)
+
+
+def test_released_probe_without_outcome_lets_the_next_request_probe(breaker, clock):
+    open_circuit(breaker)
+    clock.advance(10)
+    first = breaker.check(URL)
+    breaker.release(URL, first)
+    second = breaker.check(URL)
+    assert second and second != first
+    breaker.release(URL, first)  # ficha velha: não solta a sonda atual
+    with pytest.raises(HostUnavailable):
+        breaker.check(URL)
+
+
+def test_status_feedback(breaker):
+    breaker.record_status(URL, 503, retry_after="30")  # manutenção anunciada não conta como queda
+    breaker.record_status(URL, 503, retry_after="30")
+    assert breaker.check(URL) == 0
+    breaker.record_status(URL, None)
+    breaker.record_status(URL, 502)
+    with pytest.raises(HostUnavailable):
+        breaker.check(URL)
@@ -0,0 +1,41 @@
+import pytest
+
+from scraper.robots import parse_crawl_delay
+
+
+def test_crawl_delay_of_the_wildcard_group():
+    assert parse_crawl_delay("User-agent: *\nCrawl-delay: 2.5\n") == 2.5
+
+
+def test_our_group_wins_over_wildcard():
+    text = "User-agent: *\nCrawl-delay: 10\n\nUser-agent: WebScraper\nCrawl-delay: 1\n"
+    assert parse_crawl_delay(text) == 1.0
+
+
+def test_group_matching_is_a_case_insensitive_prefix_of_our_token():
+    assert parse_crawl_delay("User-agent: webscraperdownloader/2.0\nCrawl-delay: 3\n") is None
+    assert parse_crawl_delay("User-agent: WEBSCRAPER\nCrawl-delay: 3\n") == 3.0
+
+
+def test_other_agents_are_ignored():
+    assert parse_crawl_delay("User-agent: Googlebot\nCrawl-delay: 5\n") is None
+
+
+def test_consecutive_agent_lines_share_a_group():
+    text = "User-agent: Googlebot\nUser-agent: webscraperdownloader\nCrawl-delay: 4\n"
+    assert parse_crawl_delay(text) == 4.0
+
+
+@pytest.mark.parametrize("rate, expected", [("1/5", 5.0), ("2/10s", 5.0), ("1/1m", 60.0), ("6/1h", 600.0)])
+def test_request_rate(rate, expected):
+    assert parse_crawl_delay(f"User-agent: *\nRequest-rate: {rate}\n") == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "Crawl-delay: 5\n",  # fora de um grupo
+    "User-agent: *\nCrawl-delay: soon\n",
+    "User-agent: *\nRequest-rate: 0/5\n",
+])
+def test_missing_or_invalid_delay(text):
+    assert parse_crawl_delay(text) is None
@@ -0,0 +1,112 @@
+import csv
+import json
+
+import pytest
+
+from scraper import resume_index
+from scraper.exporter import DATA_CSV_HEADERS
+from scraper.report import REPORT_HEADERS
+from scraper.resume_index import ResumeIndex
+from scraper.shards import Shard, find_shard_dirs, merge_outputs, shard_of
+
+A, B, C = "https://a.example/", "https://b.example/", "https://c.example/"
+
+
+def test_shard_of_is_stable_across_processes():
+    # blake2b, não hash(): o mesmo host cai no mesmo shard em qualquer máquina
+    hosts = ["example.com", "a.example", "b.example", "c.example", "d.example", "e.example"]
+    assert [shard_of(h, 4) for h in hosts] == [2, 2, 3, 2, 0, 2]
+
+
+def test_shard_of_spreads_hosts_over_every_shard():
+    counts = [0] * 8
+    for i in range(4000):
+        counts[shard_of(f"host{i}.example", 8)] += 1
+    assert all(400 < n < 600 for n in counts)
+
+
+def test_every_url_of_a_host_goes_to_one_shard():
+    shards = [Shard(i, 3) for i in range(3)]
+    for url in ("https://a.example/", "https://a.example/x?y=1", "http://A.example:8080/z"):
+        assert [s.owns(url) for s in shards].count(True) == 1
+    assert [s.owns("https://a.example/") for s in shards] == [s.owns("https://a.example/other") for s in shards]
+
+
+@pytest.mark.parametrize("spec, expected", [("0/1", Shard(0, 1)), ("2/3", Shard(2, 3))])
+def test_parse(spec, expected):
+    assert Shard.parse(spec) == expected
+    assert expected.dirname == f"shard-{expected.index}-of-{expected.count}"
+
+
+@pytest.mark.parametrize("spec", ["3/3", "-1/2", "0/0", "1", "a/b", "1/2/3"])
+def test_parse_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        Shard.parse(spec)
+
+
+def test_find_shard_dirs(tmp_path):
+    for i in (0, 2):
+        (tmp_path / f"shard-{i}-of-3").mkdir()
+    (tmp_path / "other").mkdir()
+    assert find_shard_dirs(tmp_path) == ([tmp_path / "shard-0-of-3", tmp_path / "shard-2-of-3"], [1])
+    (tmp_path / "shard-0-of-2").mkdir()
+    with pytest.raises(ValueError):
+        find_shard_dirs(tmp_path)
+
+
+def write_shard(shard_dir, report, data, index_rows):
+    shard_dir.mkdir()
+    for name, headers, rows in (("report.csv", REPORT_HEADERS, report), ("data.csv", DATA_CSV_HEADERS, data)):
+        with (shard_dir / name).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=headers, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+    with (shard_dir / "data.jsonl").open("w", encoding="utf-8") as f:
+        for row in data:
+            f.write(json.dumps(row) + "\n")
+        f.write('{"url": "https://trunc')  # última linha cortada por um crash
+    index = ResumeIndex(shard_dir / "resume.sqlite3")
+    for url, status in index_rows:
+        index.record(url, status)
+    index.close()
+
+
+@pytest.fixture
+def shard_dirs(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(resume_index, "time", clock)
+    first, second = tmp_path / "shard-0-of-2", tmp_path / "shard-1-of-2"
+    write_shard(
+        first,
+        report=[{"url": A, "status": "ok"}, {"url": B, "status": "error"}, {"url": C, "status": "skipped"}],
+        data=[{"url": A, "title": "a"}, {"url": B, "title": "b (old)"}],
+        index_rows=[(A, "ok"), (B, "error")],
+    )
+    clock.advance(60)  # o shard 1 tentou B depois (ex.: nova execução com outro N)
+    write_shard(
+        second,
+        report=[{"url": B, "status": "ok"}, {"url": A + "?utm_source=x", "status": "duplicate"}],
+        data=[{"url": B, "title": "b"}],
+        index_rows=[(B, "ok")],
+    )
+    return [first, second]
+
+
+def read_csv(path):
+    with path.open(encoding="utf-8", newline="") as f:
+        return [(row["url"], row.get("status") or row.get("title")) for row in csv.DictReader(f)]
+
+
+def test_merge_keeps_the_latest_attempt_per_url(tmp_path, shard_dirs):
+    out = tmp_path / "merged"
+    stats = merge_outputs(out, shard_dirs)
+
+    assert read_csv(out / "report.csv") == [(A, "ok"), (B, "ok"), (C, "skipped")]
+    assert read_csv(out / "data.csv") == [(A, "a"), (B, "b")]
+    with (out / "data.jsonl").open(encoding="utf-8") as f:
+        assert [json.loads(line)["title"] for line in f] == ["a", "b"]
+    assert stats == {"shards": 2, "report_rows": 3, "data_rows": 2, "jsonl_rows": 2, "dropped_rows": 3}
+
+    index = ResumeIndex(out / "resume.sqlite3")
+    assert index.lookup(B).status == "ok"
+    assert not index.should_process(A) and index.should_process(C)
+    index.close()
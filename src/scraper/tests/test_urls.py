@@ -0,0 +1,28 @@
+import pytest
+
+from scraper.urls import canonical_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://Example.COM:80/a/b/", "http://example.com/a/b"),
+    ("https://example.com:443", "https://example.com/"),
+    ("https://example.com:8443/", "https://example.com:8443/"),
+    ("https://example.com/a/./b/../c#frag", "https://example.com/a/c"),
+    ("https://example.com/%7euser/%2f", "https://example.com/~user/%2F"),
+    ("https://example.com/p?b=2&a=1", "https://example.com/p?a=1&b=2"),
+    ("https://example.com/p?utm_source=x&id=3&gclid=y&fbclid=z", "https://example.com/p?id=3"),
+    ("https://example.com/p?UTM_Medium=x", "https://example.com/p"),
+    ("https://example.com/p?empty=", "https://example.com/p?empty="),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_canonical_url_is_idempotent():
+    url = "https://Example.com/a/../b/?utm_campaign=c&z=1&a=2#top"
+    assert canonical_url(canonical_url(url)) == canonical_url(url)
+
+
+def test_canonical_url_keeps_distinct_pages_apart():
+    assert canonical_url("https://example.com/a") != canonical_url("https://example.com/a?page=2")
+    assert canonical_url("http://example.com/") != canonical_url("https://example.com/")
@@ -0,0 +1,80 @@
+import posixpath
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# parâmetros de rastreamento que não mudam o conteúdo da página
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_PCT_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Lowercase scheme and host, no default port, no fragment and "/" for an
+    empty path. Conservative: never changes which resource is fetched.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def _normalize_escapes(s: str) -> str:
+    # %7e -> ~ (não reservado) e %2f -> %2F: mesma URL, mesma grafia
+    def fix(m: "re.Match[str]") -> str:
+        ch = chr(int(m.group(0)[1:], 16))
+        return ch if ch in _UNRESERVED else m.group(0).upper()
+    return _PCT_ESCAPE.sub(fix, s)
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Identity of a page for deduplication, resume and output folders:
+    normalize_url plus resolved dot segments, no trailing slash (except the
+    root), normalized percent-escapes, tracking parameters (utm_*, gclid,
+    fbclid, ...) removed and the remaining query parameters sorted.
+    """
+    parts = urlsplit(normalize_url(url))
+    path = _normalize_escapes(parts.path)
+    if path != "/":
+        # resolve ./.. e remove a barra final ("/a/" e "/a" são a mesma página)
+        path = "/" + posixpath.normpath(path).lstrip("/")
+    query = ""
+    if parts.query:
+        params = [
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not _is_tracking(k)
+        ]
+        query = urlencode(sorted(params))
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
+
+
+def host_in_domain(host: str, domain: str) -> bool:
+    """host is the domain itself or one of its subdomains (label boundary, not substring)."""
+    host = host.lower().rstrip(".")
+    domain = domain.lower().strip().strip(".")
+    return bool(domain) and (host == domain or host.endswith("." + domain))